@@ -4,45 +4,296 @@ Caching utilities for CitySense.
 Implements caching strategies for:
 - Weather data (expensive API calls, slow changes)
 - City suggestions (static data, high query frequency)
+
+The default cache is two-tiered (apps.core.cache_backends.TwoTierCache):
+each worker keeps recent entries in memory in front of a store shared by
+all workers, so a value fetched by one worker is a hit for the others
+and invalidations below apply to every process.
+
+Every helper is built on CacheNamespace, which adds to plain
+get/compute/set:
+- Key namespaces and versions (bump `version` when the cached format changes)
+- Single-flight recomputation: concurrent misses for a key wait for the
+  one caller computing it instead of all calling the upstream
+- Jittered timeouts, so entries written together don't expire together
+- Negative caching: failures (and values matched by `is_negative`) are
+  remembered for a short `negative_timeout`
+- Hit/miss, timing and size counters (apps.ai_engine.cache_metrics)
 """
 
-from django.core.cache import cache
 from django.conf import settings
+from django.core.cache import caches
+from functools import wraps
+from apps.core.cache_backends import CompressedSerializer
+from .cache_metrics import metrics
 import hashlib
+import itertools
 import logging
+import random
+import threading
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+# Marker stored in place of a value whose computation failed
+_FAILURE_KEY = "__cache_failure__"
+
+# Every CacheNamespace by name, for reporting
+namespaces = {}
+
+# Sizes values for caches that don't expose their serializer
+_size_serializer = CompressedSerializer()
+
+
+class CachedFailure(Exception):
+    """Raised on a hit for a computation that recently failed."""
+
+
+class CacheNamespace:
+    """
+    A named group of cache entries computed by the same function.
+
+    Args:
+        name (str): Key prefix; also looks up CACHE_TIMEOUTS[name] and
+            CACHE_NEGATIVE_TIMEOUTS[name]
+        version (int): Cache version for the namespace's keys
+        timeout (int): Seconds to keep values (default CACHE_TIMEOUTS[name])
+        negative_timeout (int): Seconds to remember failures and negative
+            values; None disables negative caching
+        is_negative (callable): Returns True for values to keep only for
+            negative_timeout (default: None results)
+        jitter (float): Fraction by which timeouts are randomly shortened
+        hash_keys (bool): Use an MD5 digest of the key parts as the key
+        cache_alias (str): Cache to store values in
+    """
+
+    def __init__(self, name, version=1, timeout=None, negative_timeout=_MISSING,
+                 is_negative=None, jitter=None, hash_keys=False, cache_alias="default"):
+        self.name = name
+        self.version = version
+        self.timeout = timeout if timeout is not None else settings.CACHE_TIMEOUTS.get(name, 300)
+        if negative_timeout is _MISSING:
+            negative_timeout = getattr(settings, "CACHE_NEGATIVE_TIMEOUTS", {}).get(name)
+        self.negative_timeout = negative_timeout
+        self.is_negative = is_negative or (lambda value: value is None)
+        self.jitter = jitter if jitter is not None else getattr(settings, "CACHE_TTL_JITTER", 0.1)
+        self.hash_keys = hash_keys
+        self.cache_alias = cache_alias
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+        self._stores = itertools.count()
+        namespaces[name] = self
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def lock_cache(self):
+        # Locks are short-lived and deleted often: keep them in the shared
+        # tier so releasing one doesn't invalidate in-process copies
+        return caches["shared"] if "shared" in settings.CACHES else self.cache
+
+    def make_key(self, *parts):
+        """Build the cache key for the given key parts."""
+        raw = ":".join(str(part) for part in parts)
+        if self.hash_keys or len(raw) > 200 or not raw.isprintable() or " " in raw:
+            raw = hashlib.md5(raw.encode()).hexdigest()
+        return f"{self.name}:{raw}"
+
+    def jittered(self, timeout):
+        """Shorten a timeout by a random fraction of up to `jitter`."""
+        if not timeout or not self.jitter:
+            return timeout
+        return max(1, int(timeout * (1 - random.random() * self.jitter)))
+
+    def get(self, *parts, default=None):
+        """Cached value for the key parts, or `default` on a miss."""
+        value = self.cache.get(self.make_key(*parts), _MISSING, version=self.version)
+        if value is _MISSING:
+            return default
+        return self._unwrap(value)
+
+    def get_many(self, parts_list):
+        """
+        Cached values for several keys in one cache round trip.
+
+        Args:
+            parts_list (list): Key parts tuples
+
+        Returns:
+            dict: {parts: value} for the keys that were cached
+        """
+        keys = {self.make_key(*parts): parts for parts in parts_list}
+        found = self.cache.get_many(list(keys), version=self.version)
+        return {keys[key]: self._unwrap(value) for key, value in found.items()}
+
+    def set(self, parts, value, timeout=None):
+        """Store a value, using the negative timeout for negative values."""
+        if self.negative_timeout is not None and self.is_negative(value):
+            timeout = self.negative_timeout
+        elif timeout is None:
+            timeout = self.timeout
+        self.cache.set(self.make_key(*parts), value, self.jittered(timeout), version=self.version)
+        # Encoding again only to measure is sampled to keep stores cheap
+        sample_every = getattr(settings, "CACHE_METRICS_SIZE_SAMPLE_EVERY", 20)
+        if sample_every and next(self._stores) % sample_every == 0:
+            metrics.record(self.name, stores=1, sized_stores=1, stored_bytes=self._encoded_size(value))
+        else:
+            metrics.record(self.name, stores=1)
+
+    def invalidate(self, *parts):
+        """Remove the cached value for the key parts."""
+        self.cache.delete(self.make_key(*parts), version=self.version)
+
+    def get_or_compute(self, parts, compute, timeout=None):
+        """
+        Return the cached value for `parts`, computing it on a miss.
+
+        Only one caller per key computes at a time: other threads wait on
+        an in-process lock and other processes on a lock entry in the
+        shared cache, then read the value the first caller stored.
+
+        Args:
+            parts (tuple): Key parts
+            compute (callable): Called without arguments on a miss
+            timeout (int): Overrides the namespace timeout
+
+        Raises:
+            CachedFailure: If computing the value failed within the
+                negative timeout
+            Exception: Whatever `compute` raises
+        """
+        key = self.make_key(*parts)
+        started = time.perf_counter()
+        value = self.cache.get(key, _MISSING, version=self.version)
+        lookup_us = int((time.perf_counter() - started) * 1e6)
+        if value is not _MISSING:
+            logger.debug(f"Cache hit: {key}")
+            return self._hit(value, lookup_us=lookup_us)
+
+        with self._local_lock(key):
+            # Another thread may have stored it while we waited
+            value = self.cache.get(key, _MISSING, version=self.version)
+            if value is not _MISSING:
+                return self._hit(value, coalesced=True, lookup_us=lookup_us)
+
+            lock_key = f"lock:{key}"
+            lock_timeout = getattr(settings, "CACHE_LOCK_TIMEOUT", 30)
+            locked = self.lock_cache.add(lock_key, 1, lock_timeout, version=self.version)
+            if not locked:
+                value = self._wait_for(key, lock_key, lock_timeout)
+                if value is not _MISSING:
+                    return self._hit(value, coalesced=True, lookup_us=lookup_us)
+                logger.warning(f"Gave up waiting for {key}; computing it again")
+
+            logger.debug(f"Cache miss: {key}")
+            started = time.perf_counter()
+            try:
+                value = compute()
+            except Exception as e:
+                metrics.record(self.name, misses=1, errors=1, lookup_us=lookup_us)
+                if self.negative_timeout is not None:
+                    failure = {_FAILURE_KEY: f"{type(e).__name__}: {e}"}
+                    self.cache.set(key, failure, self.negative_timeout, version=self.version)
+                raise
+            finally:
+                if locked:
+                    self.lock_cache.delete(lock_key, version=self.version)
+            compute_us = int((time.perf_counter() - started) * 1e6)
+            metrics.record(self.name, misses=1, lookup_us=lookup_us, compute_us=compute_us)
+            self.set(parts, value, timeout)
+            return value
+
+    def memoize(self, func):
+        """
+        Decorator caching a function's result in this namespace.
+
+        Positional arguments form the key. The wrapper gets an
+        `invalidate(*args)` attribute removing a cached result.
+        """
+        @wraps(func)
+        def wrapper(*args):
+            return self.get_or_compute(args, lambda: func(*args))
+
+        wrapper.invalidate = self.invalidate
+        wrapper.namespace = self
+        return wrapper
+
+    def _encoded_size(self, value):
+        # Measured with the serializer the cache stores values with
+        serializer = getattr(self.cache, "serializer", None) or _size_serializer
+        try:
+            encoded = serializer.dumps(value)
+        except Exception:
+            return 0
+        return len(str(encoded)) if type(encoded) is int else len(encoded)
+
+    def _local_lock(self, key):
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+        return lock
+
+    def _wait_for(self, key, lock_key, lock_timeout):
+        # Poll until the computing process stores the value or drops its lock
+        deadline = time.monotonic() + lock_timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            value = self.cache.get(key, _MISSING, version=self.version)
+            if value is not _MISSING:
+                return value
+            if not self.lock_cache.has_key(lock_key, version=self.version):
+                break
+            delay = min(delay * 2, 0.25)
+        return self.cache.get(key, _MISSING, version=self.version)
+
+    def _hit(self, value, coalesced=False, lookup_us=0):
+        # Waiting for another caller's computation counts as a miss
+        negative = (
+            isinstance(value, dict) and _FAILURE_KEY in value
+            or self.negative_timeout is not None and self.is_negative(value)
+        )
+        metrics.record(
+            self.name, lookup_us=lookup_us, negative_hits=int(negative),
+            **({"misses": 1, "coalesced": 1} if coalesced else {"hits": 1}),
+        )
+        return self._unwrap(value)
+
+    @staticmethod
+    def _unwrap(value):
+        if isinstance(value, dict) and _FAILURE_KEY in value:
+            raise CachedFailure(value[_FAILURE_KEY])
+        return value
+
+
+weather_cache = CacheNamespace("weather")
+city_suggestions_cache = CacheNamespace("city_suggestions", hash_keys=True)
+
+
+def _normalize_query(query):
+    return query.lower().strip()
+
 
 def cache_weather(lat, lon, get_function):
     """
     Cache weather data for a specific location.
-    
+
     Args:
         lat (float): Latitude
         lon (float): Longitude
         get_function (callable): Function to call if cache miss
-    
+
     Returns:
         dict: Weather data
     """
-    # Create cache key from coordinates
-    cache_key = f"weather:{lat}:{lon}"
-    timeout = settings.CACHE_TIMEOUTS.get("weather", 3600)
-    
-    # Try to get from cache
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        logger.debug(f"Weather cache hit for ({lat}, {lon})")
-        return cached_data
-    
-    logger.debug(f"Weather cache miss for ({lat}, {lon})")
     try:
-        # Call the actual function
-        data = get_function(lat, lon)
-        # Store in cache
-        cache.set(cache_key, data, timeout)
-        return data
+        return weather_cache.get_or_compute((lat, lon), lambda: get_function(lat, lon))
     except Exception as e:
         logger.error(f"Weather fetch error: {str(e)}")
         raise
@@ -51,33 +302,18 @@ def cache_weather(lat, lon, get_function):
 def cache_city_suggestions(query, get_function):
     """
     Cache city suggestion results.
-    
+
     Args:
         query (str): City search query
         get_function (callable): Function to call if cache miss
-    
+
     Returns:
         list: City suggestion results
     """
-    # Create cache key from query (normalized)
-    query_normalized = query.lower().strip()
-    query_hash = hashlib.md5(query_normalized.encode()).hexdigest()
-    cache_key = f"cities:{query_hash}"
-    timeout = settings.CACHE_TIMEOUTS.get("city_suggestions", 86400)
-    
-    # Try to get from cache
-    cached_results = cache.get(cache_key)
-    if cached_results is not None:
-        logger.debug(f"City suggestions cache hit for '{query}'")
-        return cached_results
-    
-    logger.debug(f"City suggestions cache miss for '{query}'")
     try:
-        # Call the actual function
-        results = get_function(query)
-        # Store in cache
-        cache.set(cache_key, results, timeout)
-        return results
+        return city_suggestions_cache.get_or_compute(
+            (_normalize_query(query),), lambda: get_function(query)
+        )
     except Exception as e:
         logger.error(f"City suggestions error: {str(e)}")
         raise
@@ -86,31 +322,41 @@ def cache_city_suggestions(query, get_function):
 def invalidate_weather_cache(lat, lon):
     """
     Invalidate weather cache for a specific location.
-    
+
     Args:
         lat (float): Latitude
         lon (float): Longitude
     """
-    cache_key = f"weather:{lat}:{lon}"
-    cache.delete(cache_key)
+    weather_cache.invalidate(lat, lon)
     logger.debug(f"Weather cache invalidated for ({lat}, {lon})")
 
 
 def invalidate_city_suggestions_cache(query):
     """
     Invalidate city suggestions cache for a query.
-    
+
     Args:
         query (str): City search query
     """
-    query_normalized = query.lower().strip()
-    query_hash = hashlib.md5(query_normalized.encode()).hexdigest()
-    cache_key = f"cities:{query_hash}"
-    cache.delete(cache_key)
+    city_suggestions_cache.invalidate(_normalize_query(query))
     logger.debug(f"City suggestions cache invalidated for '{query}'")
 
 
+def cache_report():
+    """
+    Counters for every cache namespace and the backends' own stats.
+
+    Returns:
+        dict: {"namespaces": {name: counters}, "backends": {alias: stats}}
+    """
+    backends = {}
+    for alias in settings.CACHES:
+        stats = getattr(caches[alias], "stats", None)
+        backends[alias] = stats() if stats else None
+    return {"namespaces": metrics.totals(sorted(namespaces)), "backends": backends}
+
+
 def clear_all_cache():
     """Clear all application cache."""
-    cache.clear()
+    caches["default"].clear()
     logger.warning("All application cache cleared")
@@ -0,0 +1,147 @@
+"""
+Hit/miss and timing counters for the cache namespaces in apps.ai_engine.cache.
+
+Counters are added up in process memory and pushed to the shared cache
+with atomic incr() at most every CACHE_METRICS_FLUSH_INTERVAL seconds,
+so recording costs a dict update per lookup and the totals cover every
+worker process.
+
+Counters per namespace:
+- hits, misses: lookups served from the cache / computed
+- negative_hits: hits on a remembered failure or negative value
+- coalesced: misses served by waiting for another caller's computation
+- errors: computations that raised
+- lookup_us, compute_us: total time in cache reads and computations
+- stores: values written
+- sized_stores, stored_bytes: the sampled stores (one in
+  CACHE_METRICS_SIZE_SAMPLE_EVERY) and their size as the cache encodes them
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from collections import defaultdict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    "hits", "misses", "negative_hits", "coalesced", "errors",
+    "lookup_us", "compute_us", "stores", "sized_stores", "stored_bytes",
+)
+
+_KEY_PREFIX = "cache-metrics"
+
+
+class CacheMetrics:
+    """
+    Collects counters locally and flushes them to a cache.
+
+    Args:
+        cache_alias (str): Cache holding the totals (default "shared"
+            when configured, else "default")
+        flush_interval (float): Seconds between flushes (default
+            CACHE_METRICS_FLUSH_INTERVAL)
+    """
+
+    def __init__(self, cache_alias=None, flush_interval=None):
+        self.cache_alias = cache_alias
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def cache(self):
+        alias = self.cache_alias or ("shared" if "shared" in settings.CACHES else "default")
+        return caches[alias]
+
+    def _interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, "CACHE_METRICS_FLUSH_INTERVAL", 5)
+
+    def record(self, namespace, **counts):
+        """Add to a namespace's counters, flushing if the interval passed."""
+        if not getattr(settings, "CACHE_METRICS_ENABLED", True):
+            return
+        with self._lock:
+            pending = self._pending[namespace]
+            for name, value in counts.items():
+                pending[name] += value
+        if time.monotonic() - self._last_flush >= self._interval():
+            self.flush()
+
+    def flush(self):
+        """Push counters recorded in this process to the cache."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            self._last_flush = time.monotonic()
+        cache = self.cache
+        try:
+            for namespace, counts in pending.items():
+                for name, value in counts.items():
+                    if value:
+                        self._incr(cache, f"{_KEY_PREFIX}:{namespace}:{name}", value)
+        except Exception as e:
+            # Metrics must never break the request that recorded them
+            logger.warning(f"Could not flush cache metrics: {str(e)}")
+
+    @staticmethod
+    def _incr(cache, key, value):
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            if not cache.add(key, value, None):
+                cache.incr(key, value)
+
+    def totals(self, namespaces):
+        """
+        Counters and derived figures for each namespace, all processes included.
+
+        Args:
+            namespaces (iterable): Namespace names
+
+        Returns:
+            dict: {namespace: {counter: value, ..., "hit_ratio": ...}}
+        """
+        self.flush()
+        namespaces = list(namespaces)
+        keys = [f"{_KEY_PREFIX}:{ns}:{name}" for ns in namespaces for name in COUNTERS]
+        stored = self.cache.get_many(keys)
+        return {
+            ns: derive({name: stored.get(f"{_KEY_PREFIX}:{ns}:{name}", 0) for name in COUNTERS})
+            for ns in namespaces
+        }
+
+    def reset(self, namespaces):
+        """Zero the counters of the given namespaces."""
+        with self._lock:
+            self._pending.clear()
+        self.cache.delete_many([f"{_KEY_PREFIX}:{ns}:{name}" for ns in namespaces for name in COUNTERS])
+
+
+def derive(counts):
+    """
+    Add ratios and averages to raw counters.
+
+    Adds hit_ratio, avg_lookup_ms, avg_compute_ms, avg_value_bytes and
+    time_saved_s (hits times the average computation time).
+    """
+    lookups = counts["hits"] + counts["misses"]
+    computed = counts["misses"] - counts["coalesced"]
+    avg_compute_us = counts["compute_us"] / computed if computed > 0 else 0
+    return {
+        **counts,
+        "hit_ratio": round(counts["hits"] / lookups, 4) if lookups else None,
+        "avg_lookup_ms": round(counts["lookup_us"] / lookups / 1000, 3) if lookups else None,
+        "avg_compute_ms": round(avg_compute_us / 1000, 3) if computed > 0 else None,
+        "avg_value_bytes": (
+            round(counts["stored_bytes"] / counts["sized_stores"]) if counts["sized_stores"] else None
+        ),
+        "time_saved_s": round(counts["hits"] * avg_compute_us / 1e6, 3),
+    }
+
+
+metrics = CacheMetrics()
@@ -0,0 +1,96 @@
+"""
+Run local stand-ins for Nominatim, Open-Meteo and Groq.
+
+Example:
+    python manage.py run_mock_upstreams --port 8765 --latency 40 \\
+        --latency groq=900 --jitter 20 --error-rate 0.01 --rate-limit nominatim=1
+
+Then start the app with MOCK_UPSTREAMS_URL=http://127.0.0.1:8765.
+
+Behaviour options accept either a plain value (applied to every upstream)
+or NAME=VALUE to override a single upstream, and may be repeated.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.ai_engine.mock_upstreams import (
+    UPSTREAMS,
+    MockUpstreamServer,
+    UpstreamBehaviour,
+)
+
+
+def parse_behaviour_values(values, option):
+    """
+    Turn ["50", "groq=800"] into {"nominatim": 50, "open_meteo": 50, "groq": 800}.
+    """
+    result = {}
+    for value in values or []:
+        name, sep, number = value.rpartition("=")
+        try:
+            number = float(number)
+        except ValueError:
+            raise CommandError(f"Invalid value for --{option}: {value}")
+        if not sep:
+            result.update({upstream: number for upstream in UPSTREAMS})
+        elif name in UPSTREAMS:
+            result[name] = number
+        else:
+            raise CommandError(
+                f"Unknown upstream '{name}' for --{option} "
+                f"(choose from {', '.join(UPSTREAMS)})"
+            )
+    return result
+
+
+class Command(BaseCommand):
+    help = "Serve deterministic mock Nominatim, Open-Meteo and Groq APIs for offline testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--seed", type=int, default=None,
+                            help="Seed for jitter and injected errors")
+        parser.add_argument("--latency", action="append", metavar="[NAME=]MS",
+                            help="Fixed response delay in milliseconds")
+        parser.add_argument("--jitter", action="append", metavar="[NAME=]MS",
+                            help="Extra random delay up to this many milliseconds")
+        parser.add_argument("--error-rate", action="append", metavar="[NAME=]RATE",
+                            help="Fraction of requests answered with HTTP 503 (0-1)")
+        parser.add_argument("--rate-limit", action="append", metavar="[NAME=]RPS",
+                            help="Requests per second before HTTP 429 (0 = unlimited)")
+
+    def handle(self, *args, **options):
+        latency = parse_behaviour_values(options["latency"], "latency")
+        jitter = parse_behaviour_values(options["jitter"], "jitter")
+        error_rate = parse_behaviour_values(options["error_rate"], "error-rate")
+        rate_limit = parse_behaviour_values(options["rate_limit"], "rate-limit")
+
+        behaviours = {
+            name: UpstreamBehaviour(
+                latency_ms=latency.get(name, 0),
+                jitter_ms=jitter.get(name, 0),
+                error_rate=error_rate.get(name, 0),
+                rate_limit=rate_limit.get(name, 0),
+            )
+            for name in UPSTREAMS
+        }
+
+        server = MockUpstreamServer(
+            (options["host"], options["port"]), behaviours, options["seed"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Mock upstreams listening on {server.url}"))
+        for name, behaviour in behaviours.items():
+            self.stdout.write(
+                f"  {name}: latency={behaviour.latency_ms:g}ms "
+                f"jitter={behaviour.jitter_ms:g}ms "
+                f"error_rate={behaviour.error_rate:g} "
+                f"rate_limit={behaviour.rate_limit:g}/s"
+            )
+        self.stdout.write(f"Set MOCK_UPSTREAMS_URL={server.url} to use them.")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,300 @@
+"""
+Local stand-in servers for the AI engine's upstream APIs.
+
+Serves deterministic Nominatim, Open-Meteo and Groq responses from a
+single HTTP server so `analyze_view` can be exercised and load-tested
+without network access. Each upstream is mounted under its own path
+prefix (see apps.ai_engine.services.upstream):
+
+- /nominatim/search
+- /open_meteo/v1/forecast
+- /groq/openai/v1/chat/completions
+
+Latency, error rate and rate limiting are configurable globally or per
+upstream.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPSTREAMS = ("nominatim", "open_meteo", "groq")
+
+
+def _seed(*parts):
+    """Stable integer seed derived from request parameters."""
+    digest = hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest()
+    return int(digest[:12], 16)
+
+
+# ==============================
+# RESPONSE GENERATORS
+# ==============================
+
+def nominatim_search(params):
+    """Fake Nominatim /search response: one stable point per query."""
+    query = params.get("q", "").strip().lower()
+    if not query:
+        return []
+
+    rng = random.Random(_seed("nominatim", query))
+    return [{
+        "lat": f"{rng.uniform(-55, 70):.7f}",
+        "lon": f"{rng.uniform(-180, 180):.7f}",
+        "display_name": params.get("q"),
+        "type": "city",
+    }]
+
+
+def open_meteo_forecast(params):
+    """Fake Open-Meteo /v1/forecast response with full-length series."""
+    lat = float(params.get("latitude", 0))
+    lon = float(params.get("longitude", 0))
+    days = int(params.get("forecast_days", 14))
+    hours = days * 24
+    rng = random.Random(_seed("open_meteo", round(lat, 4), round(lon, 4)))
+
+    # Colder towards the poles
+    base_temp = 28 - abs(lat) * 0.45
+
+    def series(count, center, spread, low=None):
+        values = [round(center + rng.uniform(-spread, spread), 1) for _ in range(count)]
+        return [max(v, low) for v in values] if low is not None else values
+
+    snow = [round(max(0.0, rng.uniform(-4, 2)), 1) if base_temp < 2 else 0.0 for _ in range(days)]
+
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": "UTC",
+        "current": {
+            "temperature_2m": round(base_temp, 1),
+            "relative_humidity_2m": rng.randint(30, 90),
+            "apparent_temperature": round(base_temp - rng.uniform(0, 4), 1),
+            "precipitation": 0.0,
+            "rain": 0.0,
+            "snowfall": 0.0,
+            "weather_code": rng.choice([0, 1, 2, 3, 61]),
+            "cloud_cover": rng.randint(0, 100),
+            "wind_speed_10m": round(rng.uniform(2, 30), 1),
+            "wind_gusts_10m": round(rng.uniform(5, 50), 1),
+            "pressure_msl": round(rng.uniform(995, 1030), 1),
+            "visibility": 10000.0,
+            "is_day": 1,
+        },
+        "hourly": {
+            "temperature_2m": series(hours, base_temp, 6),
+            "apparent_temperature": series(hours, base_temp - 2, 6),
+            "relative_humidity_2m": series(hours, 60, 25, low=0),
+            "freezing_level_height": series(hours, 2500 + base_temp * 80, 400, low=0),
+            "visibility": series(hours, 18000, 8000, low=200),
+            "wind_gusts_10m": series(hours, 25, 20, low=0),
+            "pressure_msl": series(hours, 1013, 12),
+        },
+        "daily": {
+            "temperature_2m_max": series(days, base_temp + 4, 3),
+            "temperature_2m_min": series(days, base_temp - 4, 3),
+            "snowfall_sum": snow,
+            "snow_depth_max": [round(sum(snow[:i + 1]) * 0.5, 1) for i in range(days)],
+        },
+    }
+
+
+def groq_chat_completion(body):
+    """Fake OpenAI-compatible chat completion containing an analysis JSON."""
+    messages = body.get("messages") or []
+    prompt = messages[-1].get("content", "") if messages else ""
+    match = re.search(r"Address:\s*(.+)", prompt)
+    address = match.group(1).strip() if match else "Unknown"
+    rng = random.Random(_seed("groq", address.lower()))
+
+    analysis = {
+        "city_name": address,
+        "overview": f"{address} is a mid-sized urban area with mixed residential and commercial districts.",
+        "historical_landmarks": [f"{address} Old Town", f"{address} Cathedral"],
+        "top_attractions": [f"{address} Central Park", f"{address} City Museum"],
+        "cultural_notes": "Local markets and seasonal festivals shape daily life.",
+        "tourism_score": rng.randint(40, 90),
+        "safety_score": round(rng.uniform(4, 9), 1),
+        "noise_level": rng.choice(["Low", "Medium", "High"]),
+        "rent_level": rng.choice(["Low", "Medium", "High"]),
+        "water_quality": rng.choice(["Poor", "Average", "Good"]),
+        "ai_score": rng.randint(45, 92),
+        "summary": f"{address} offers a balanced quality of life for most residents.",
+    }
+    content = json.dumps(analysis)
+
+    return {
+        "id": f"chatcmpl-mock-{_seed(address, time.time_ns()):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+            "logprobs": None,
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        },
+    }
+
+
+# ==============================
+# BEHAVIOUR CONFIGURATION
+# ==============================
+
+class UpstreamBehaviour:
+    """
+    Latency, failure and rate-limit settings for one upstream.
+
+    Args:
+        latency_ms (float): Base delay added to every response
+        jitter_ms (float): Extra uniformly random delay (0..jitter_ms)
+        error_rate (float): Fraction of requests answered with HTTP 503
+        rate_limit (float): Requests per second before HTTP 429 (0 = unlimited)
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit=0):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.rate_limit = float(rate_limit)
+        self._tokens = self.rate_limit
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take_token(self):
+        """Token-bucket rate limiter. Returns False if the request is throttled."""
+        if self.rate_limit <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.rate_limit,
+                self._tokens + (now - self._refilled_at) * self.rate_limit
+            )
+            self._refilled_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def delay(self, rng):
+        """Seconds to wait before responding."""
+        return (self.latency_ms + rng.uniform(0, self.jitter_ms)) / 1000
+
+
+class MockUpstreamServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server hosting all upstream stand-ins.
+
+    Args:
+        address (tuple): (host, port) to bind; port 0 picks a free port
+        behaviours (dict): Upstream name -> UpstreamBehaviour
+        seed (int): Seed for latency jitter and injected errors
+    """
+    daemon_threads = True
+
+    def __init__(self, address, behaviours=None, seed=None):
+        super().__init__(address, MockUpstreamHandler)
+        behaviours = behaviours or {}
+        self.behaviours = {
+            name: behaviours.get(name) or UpstreamBehaviour()
+            for name in UPSTREAMS
+        }
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    """Routes requests to the matching upstream generator."""
+
+    server_version = "CitySenseMock/1.0"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        routes = {
+            ("GET", "/nominatim/search"): ("nominatim", nominatim_search),
+            ("GET", "/open_meteo/v1/forecast"): ("open_meteo", open_meteo_forecast),
+            ("POST", "/groq/openai/v1/chat/completions"): ("groq", self._groq),
+        }
+        route = routes.get((method, parts.path.rstrip("/")))
+        if route is None:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        name, handler = route
+        behaviour = self.server.behaviours[name]
+
+        if not behaviour.take_token():
+            self._send_json(429, {"error": "rate limited"}, {"Retry-After": "1"})
+            return
+
+        with self.server.rng_lock:
+            delay = behaviour.delay(self.server.rng)
+            fail = self.server.rng.random() < behaviour.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self._send_json(503, {"error": "injected failure"})
+            return
+
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        try:
+            self._send_json(200, handler(params))
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": str(e)})
+
+    def _groq(self, params):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        return groq_chat_completion(body)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("mock upstream: " + format, *args)
+
+
+def start_mock_upstreams(host="127.0.0.1", port=0, behaviours=None, seed=None):
+    """
+    Start the mock server in a background thread.
+
+    Returns:
+        MockUpstreamServer: Running server; call shutdown() to stop it
+    """
+    server = MockUpstreamServer((host, port), behaviours, seed)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
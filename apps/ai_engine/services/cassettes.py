@@ -0,0 +1,138 @@
+"""
+Record/replay of upstream responses.
+
+In record mode, responses from the geocoding, weather and Groq clients are
+stored in an on-disk cassette store (one gzip-compressed JSON file per
+distinct request). In replay mode they are served from the store without
+touching the network, optionally with the recorded response time.
+
+Controlled by settings:
+- UPSTREAM_CASSETTE_MODE: "off", "record", "replay" or "auto"
+  (replay when recorded, otherwise record)
+- UPSTREAM_CASSETTE_DIR: directory of the cassette store
+- UPSTREAM_REPLAY_TIMING: sleep for the recorded duration on replay
+"""
+
+from django.conf import settings
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay", "auto")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when no recording matches a request."""
+
+
+class CassetteStore:
+    """
+    Directory-backed store of recorded upstream interactions.
+
+    Interactions are keyed by a hash of the service name and the canonical
+    JSON form of the request, and laid out as <dir>/<service>/<key>.json.gz.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def key(self, service, request):
+        canonical = json.dumps([service, request], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(canonical.encode()).hexdigest()
+
+    def _file(self, service, request):
+        return os.path.join(self.path, service, f"{self.key(service, request)}.json.gz")
+
+    def load(self, service, request):
+        """
+        Load a recorded interaction.
+
+        Returns:
+            dict: {"response": ..., "elapsed": seconds}, or None if not recorded
+        """
+        try:
+            with gzip.open(self._file(service, request), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def entries(self, service):
+        """Iterate over all recorded interactions of a service."""
+        directory = os.path.join(self.path, service)
+        if not os.path.isdir(directory):
+            return
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json.gz"):
+                with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+                    yield json.load(f)
+
+    def save(self, service, request, response, elapsed):
+        """Record an interaction, replacing any previous recording."""
+        path = self._file(service, request)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "service": service,
+            "request": request,
+            "response": response,
+            "elapsed": round(elapsed, 4),
+            "recorded_at": time.time(),
+        }
+        # Write to a temp file first so concurrent readers never see partial data
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+
+def get_cassette_mode():
+    mode = getattr(settings, "UPSTREAM_CASSETTE_MODE", "off") or "off"
+    if mode not in MODES:
+        raise ValueError(f"Invalid UPSTREAM_CASSETTE_MODE: {mode}")
+    return mode
+
+
+def get_cassette_store():
+    return CassetteStore(settings.UPSTREAM_CASSETTE_DIR)
+
+
+def through_cassette(service, request, fetch):
+    """
+    Run an upstream call through the cassette store.
+
+    Args:
+        service (str): Upstream name, used to group recordings
+        request (dict): JSON-serializable description of the request
+        fetch (callable): Performs the real call and returns a JSON-serializable result
+
+    Returns:
+        The live or recorded response
+
+    Raises:
+        CassetteMiss: In replay mode, if the request was never recorded
+    """
+    mode = get_cassette_mode()
+    if mode == "off":
+        return fetch()
+
+    store = get_cassette_store()
+    if mode in ("replay", "auto"):
+        entry = store.load(service, request)
+        if entry is not None:
+            if getattr(settings, "UPSTREAM_REPLAY_TIMING", False):
+                time.sleep(entry["elapsed"])
+            logger.debug(f"Replayed {service} response from cassette")
+            return entry["response"]
+        if mode == "replay":
+            raise CassetteMiss(f"No recorded {service} response for {request}")
+
+    start = time.perf_counter()
+    response = fetch()
+    store.save(service, request, response, time.perf_counter() - start)
+    logger.debug(f"Recorded {service} response to cassette")
+    return response
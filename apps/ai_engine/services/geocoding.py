@@ -5,6 +5,8 @@ Converts addresses to latitude/longitude coordinates.
 """
 
 import requests
+from .upstream import get_upstream_url
+from .cassettes import through_cassette
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,9 +24,10 @@ def geocode_address(address):
     
     Raises:
         requests.RequestException: If API call fails
+        CassetteMiss: If replaying and the address was never recorded
     """
     try:
-        url = "https://nominatim.openstreetmap.org/search"
+        url = f"{get_upstream_url('nominatim')}/search"
         params = {
             "q": address,
             "format": "json",
@@ -34,9 +37,12 @@ def geocode_address(address):
             "User-Agent": "CitySense-App"
         }
 
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        def fetch():
+            response = requests.get(url, params=params, headers=headers, timeout=15)
+            response.raise_for_status()
+            return response.json()
+
+        data = through_cassette("nominatim", params, fetch)
 
         if not data:
             logger.warning(f"No geocoding results for: {address}")
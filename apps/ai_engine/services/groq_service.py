@@ -2,16 +2,16 @@
 Groq AI service for location analysis.
 
 Uses Groq's LLaMA model to generate structured analysis of locations
-with JSON schema validation.
+with JSON schema validation. JSON mode is requested from the API so the
+model returns a bare JSON object.
 """
 
 from groq import Groq
 from django.conf import settings
-import json
-import re
-from jsonschema import validate
 from .prompt import SYSTEM_PROMPT
-from .schema import analysis_schema
+from .parsing import parse_analysis_response
+from .upstream import get_upstream_url, using_mock_upstreams
+from .cassettes import through_cassette
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +24,11 @@ def get_groq_client():
     global _client
     if _client is None:
         try:
-            _client = Groq(api_key=settings.GROQ_API_KEY)
+            api_key = settings.GROQ_API_KEY
+            if using_mock_upstreams():
+                # The mock server accepts any key
+                api_key = api_key or "mock"
+            _client = Groq(api_key=api_key, base_url=get_upstream_url("groq"))
         except Exception as e:
             logger.error(f"Failed to initialize Groq client: {e}")
             raise
@@ -48,14 +52,15 @@ def analyze_location_ai(address, lat, lng):
     
     Raises:
         ValueError: If AI response doesn't contain valid JSON
+        json.JSONDecodeError: If the JSON is invalid and can't be repaired
         jsonschema.ValidationError: If JSON doesn't match schema
         groq.APIError: If API call fails
+        CassetteMiss: If replaying and the request was never recorded
     """
     try:
-        client = get_groq_client()
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
+        request = {
+            "model": "llama-3.1-8b-instant",
+            "messages": [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {
                     "role": "user",
@@ -67,21 +72,23 @@ def analyze_location_ai(address, lat, lng):
                     )
                 }
             ],
-            temperature=0.3
-        )
+            "temperature": 0.3,
+        }
+        if getattr(settings, "GROQ_JSON_MODE", True):
+            request["response_format"] = {"type": "json_object"}
 
-        raw = response.choices[0].message.content.strip()
+        def fetch():
+            response = get_groq_client().chat.completions.create(**request)
+            return response.choices[0].message.content
 
-        # Extract JSON from response
-        match = re.search(r"\{.*\}", raw, re.DOTALL)
-        if not match:
-            logger.error(f"AI response invalid JSON for {address}: {raw[:200]}")
-            raise ValueError("AI response does not contain valid JSON")
-
-        data = json.loads(match.group())
+        raw = through_cassette("groq", request, fetch).strip()
 
-        # Validate against schema
-        validate(instance=data, schema=analysis_schema)
+        # Extract, repair and validate JSON from response
+        try:
+            data = parse_analysis_response(raw)
+        except ValueError:
+            logger.error(f"AI response invalid JSON for {address}: {raw[:200]}")
+            raise
 
         logger.info(f"Successfully analyzed location: {address}")
         return data
@@ -0,0 +1,156 @@
+"""
+Parsing of raw AI responses into validated analysis data.
+
+Responses are decoded straight from the first JSON object in the text,
+with a cheap repair step for output that was cut off mid-object, then
+checked against the precompiled analysis validator.
+"""
+
+import json
+import logging
+from .schema import ENUM_FIELDS, analysis_validator
+
+logger = logging.getLogger(__name__)
+
+_decoder = json.JSONDecoder()
+
+# Maximum number of trailing members dropped while repairing truncated JSON
+MAX_REPAIR_ATTEMPTS = 8
+
+_ENUM_LOOKUP = {
+    field: {choice.lower(): choice for choice in choices}
+    for field, choices in ENUM_FIELDS.items()
+}
+
+
+def repair_truncated_json(fragment):
+    """
+    Close a JSON object that was cut off before its end.
+
+    Open strings, arrays and objects are closed. If the result still does
+    not parse, trailing members are dropped one at a time (back to the
+    previous comma) until it does.
+
+    Args:
+        fragment (str): Text starting at the opening brace of the object
+
+    Returns:
+        object: Decoded JSON value, or None if the fragment can't be repaired
+    """
+    stack = []
+    commas = []
+    in_string = False
+    escaped = False
+
+    for index, ch in enumerate(fragment):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            stack.append("}")
+        elif ch == "[":
+            stack.append("]")
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                return None
+            stack.pop()
+            if not stack:
+                # Object is complete, so it wasn't truncated
+                return None
+        elif ch == ",":
+            commas.append((index, tuple(stack)))
+
+    if not stack:
+        return None
+
+    text = fragment[:-1] if escaped else fragment
+    if in_string:
+        text += '"'
+    candidates = [(text, tuple(stack))]
+    candidates += [
+        (fragment[:index], closers)
+        for index, closers in reversed(commas[-MAX_REPAIR_ATTEMPTS:])
+    ]
+
+    for text, closers in candidates:
+        try:
+            return json.loads(text.rstrip() + "".join(reversed(closers)))
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def extract_json(raw):
+    """
+    Extract the first JSON object from an AI response.
+
+    Args:
+        raw (str): Raw response text
+
+    Returns:
+        object: Decoded JSON value
+
+    Raises:
+        ValueError: If the response contains no JSON object
+        json.JSONDecodeError: If the JSON is invalid and can't be repaired
+    """
+    start = raw.find("{")
+    if start == -1:
+        raise ValueError("AI response does not contain valid JSON")
+
+    try:
+        data, _ = _decoder.raw_decode(raw, start)
+        return data
+    except json.JSONDecodeError as e:
+        error = e
+
+    # Braces in leading prose: fall back to the outermost brace pair
+    end = raw.rfind("}")
+    if end > start:
+        try:
+            return json.loads(raw[start:end + 1])
+        except json.JSONDecodeError:
+            pass
+
+    data = repair_truncated_json(raw[start:])
+    if data is None:
+        raise error
+    logger.warning("Repaired truncated AI response JSON")
+    return data
+
+
+def normalize_enums(data):
+    """Map case variants like "medium" onto the canonical enum choices."""
+    for field, lookup in _ENUM_LOOKUP.items():
+        value = data.get(field)
+        if isinstance(value, str):
+            data[field] = lookup.get(value.strip().lower(), value)
+    return data
+
+
+def parse_analysis_response(raw):
+    """
+    Parse and validate a raw AI analysis response.
+
+    Args:
+        raw (str): Raw response text from the model
+
+    Returns:
+        dict: Analysis data matching analysis_schema
+
+    Raises:
+        ValueError: If the response contains no JSON object
+        json.JSONDecodeError: If the JSON is invalid and can't be repaired
+        jsonschema.ValidationError: If the data doesn't match the schema
+    """
+    data = extract_json(raw)
+    if isinstance(data, dict):
+        normalize_enums(data)
+    analysis_validator.validate(data)
+    return data
@@ -1,11 +1,31 @@
+"""
+JSON schema for AI location analysis responses.
+
+The validator is compiled once at import time so each response is checked
+against a ready-made instance instead of rebuilding one per call.
+"""
+
+from jsonschema import Draft7Validator
+
+LEVEL_CHOICES = ["Low", "Medium", "High"]
+WATER_QUALITY_CHOICES = ["Poor", "Average", "Good"]
+
+# Fields whose values must match the AnalysisResult model choices
+ENUM_FIELDS = {
+    "noise_level": LEVEL_CHOICES,
+    "rent_level": LEVEL_CHOICES,
+    "water_quality": WATER_QUALITY_CHOICES,
+}
+
 analysis_schema = {
     "type": "object",
     "properties": {
-        "safety_score": {"type": "number"},
-        "noise_level": {"type": "string"},
-        "rent_level": {"type": "string"},
-        "water_quality": {"type": "string"},
-        "ai_score": {"type": "number"},
+        "safety_score": {"type": "number", "minimum": 0, "maximum": 10},
+        "noise_level": {"type": "string", "enum": LEVEL_CHOICES},
+        "rent_level": {"type": "string", "enum": LEVEL_CHOICES},
+        "water_quality": {"type": "string", "enum": WATER_QUALITY_CHOICES},
+        "ai_score": {"type": "number", "minimum": 0, "maximum": 100},
+        "tourism_score": {"type": "number", "minimum": 0, "maximum": 100},
         "summary": {"type": "string"},
     },
     "required": [
@@ -16,4 +36,7 @@ analysis_schema = {
         "ai_score",
         "summary",
     ]
-}
\ No newline at end of file
+}
+
+Draft7Validator.check_schema(analysis_schema)
+analysis_validator = Draft7Validator(analysis_schema)
@@ -0,0 +1,39 @@
+"""
+Upstream service endpoints.
+
+Resolves the base URL of each external API used by the AI engine.
+When MOCK_UPSTREAMS_URL is set, all traffic goes to the local stand-in
+servers started with `manage.py run_mock_upstreams` instead.
+"""
+
+from django.conf import settings
+
+# Upstream name -> public base URL
+DEFAULT_UPSTREAM_URLS = {
+    "nominatim": "https://nominatim.openstreetmap.org",
+    "open_meteo": "https://api.open-meteo.com",
+    "groq": "https://api.groq.com",
+}
+
+
+def get_upstream_url(name):
+    """
+    Get the base URL for an upstream service.
+
+    Args:
+        name (str): Upstream name ('nominatim', 'open_meteo' or 'groq')
+
+    Returns:
+        str: Base URL without a trailing slash
+    """
+    mock_url = getattr(settings, "MOCK_UPSTREAMS_URL", "")
+    if mock_url:
+        return f"{mock_url.rstrip('/')}/{name}"
+
+    urls = getattr(settings, "UPSTREAM_URLS", {})
+    return urls.get(name, DEFAULT_UPSTREAM_URLS[name]).rstrip("/")
+
+
+def using_mock_upstreams():
+    """Return True if upstream traffic is redirected to the mock servers."""
+    return bool(getattr(settings, "MOCK_UPSTREAMS_URL", ""))
@@ -7,19 +7,45 @@ Tests cover:
 - Groq AI service
 - Prompt validation
 - Schema validation
+- Response parsing and repair
+- Mock upstream servers
+- Record/replay cassettes
+- Cache namespaces, single-flight recomputation and negative caching
+- Cache metrics and the monitoring views
 """
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 import json
 from unittest.mock import patch, MagicMock
 from apps.ai_engine.services.geocoding import geocode_address
 from apps.ai_engine.services.weather import get_weather_intelligence
 from apps.ai_engine.services.groq_service import analyze_location_ai
 from apps.ai_engine.services.schema import analysis_schema
+from apps.ai_engine.services.parsing import parse_analysis_response
+from apps.ai_engine.services import groq_service
+from apps.ai_engine.mock_upstreams import start_mock_upstreams, UpstreamBehaviour
+from apps.ai_engine.services.cassettes import CassetteMiss
+from apps.ai_engine.cache import CacheNamespace, CachedFailure, cache_weather, cache_report
+from apps.ai_engine.cache_metrics import metrics
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+import requests
+import tempfile
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+VALID_ANALYSIS = {
+    "safety_score": 7.5,
+    "noise_level": "Medium",
+    "rent_level": "High",
+    "water_quality": "Good",
+    "ai_score": 78,
+    "summary": "Test summary"
+}
+
 
 class GeocodingServiceTests(TestCase):
     """Tests for geocoding service (Nominatim API)."""
@@ -151,9 +177,10 @@ class WeatherServiceTests(TestCase):
 class GroqServiceTests(TestCase):
     """Tests for Groq AI service."""
 
-    @patch('apps.ai_engine.services.groq_service.client.chat.completions.create')
-    def test_analyze_location_valid_response(self, mock_create):
+    @patch('apps.ai_engine.services.groq_service.get_groq_client')
+    def test_analyze_location_valid_response(self, mock_get_client):
         """Test Groq service with valid response."""
+        mock_create = mock_get_client.return_value.chat.completions.create
         mock_response = MagicMock()
         mock_response.choices = [MagicMock()]
         mock_response.choices[0].message.content = json.dumps({
@@ -172,9 +199,10 @@ class GroqServiceTests(TestCase):
         self.assertEqual(result["ai_score"], 78)
         self.assertIn("summary", result)
 
-    @patch('apps.ai_engine.services.groq_service.client.chat.completions.create')
-    def test_analyze_location_schema_validation(self, mock_create):
+    @patch('apps.ai_engine.services.groq_service.get_groq_client')
+    def test_analyze_location_schema_validation(self, mock_get_client):
         """Test that response schema is validated."""
+        mock_create = mock_get_client.return_value.chat.completions.create
         mock_response = MagicMock()
         # Missing required fields
         mock_response.choices = [MagicMock()]
@@ -188,9 +216,10 @@ class GroqServiceTests(TestCase):
             # Should fail schema validation
             analyze_location_ai("New York", 40.7128, -74.0060)
 
-    @patch('apps.ai_engine.services.groq_service.client.chat.completions.create')
-    def test_analyze_location_json_decode_error(self, mock_create):
+    @patch('apps.ai_engine.services.groq_service.get_groq_client')
+    def test_analyze_location_json_decode_error(self, mock_get_client):
         """Test Groq service handles invalid JSON."""
+        mock_create = mock_get_client.return_value.chat.completions.create
         mock_response = MagicMock()
         mock_response.choices = [MagicMock()]
         mock_response.choices[0].message.content = "Invalid JSON {{"
@@ -199,6 +228,72 @@ class GroqServiceTests(TestCase):
         with self.assertRaises(json.JSONDecodeError):
             analyze_location_ai("New York", 40.7128, -74.0060)
 
+    @patch('apps.ai_engine.services.groq_service.get_groq_client')
+    def test_analyze_location_requests_json_mode(self, mock_get_client):
+        """Test that JSON mode is requested from the API."""
+        mock_create = mock_get_client.return_value.chat.completions.create
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = json.dumps(VALID_ANALYSIS)
+        mock_create.return_value = mock_response
+
+        analyze_location_ai("New York", 40.7128, -74.0060)
+
+        self.assertEqual(
+            mock_create.call_args[1]["response_format"],
+            {"type": "json_object"}
+        )
+
+
+class ResponseParsingTests(TestCase):
+    """Tests for AI response extraction, repair and validation."""
+
+    def test_parse_bare_json(self):
+        """Test parsing a response that is only a JSON object."""
+        result = parse_analysis_response(json.dumps(VALID_ANALYSIS))
+        self.assertEqual(result, VALID_ANALYSIS)
+
+    def test_parse_json_with_surrounding_text(self):
+        """Test extracting JSON wrapped in prose or markdown."""
+        raw = "Here is the analysis:\n```json\n" + json.dumps(VALID_ANALYSIS) + "\n```"
+        result = parse_analysis_response(raw)
+        self.assertEqual(result["ai_score"], 78)
+
+    def test_repair_truncated_json(self):
+        """Test that output cut off mid-field is repaired."""
+        data = dict(VALID_ANALYSIS, top_attractions=["Museum", "Park"])
+        raw = json.dumps(data)
+        truncated = raw[:raw.index('"Park"') + 4]
+        result = parse_analysis_response(truncated)
+        self.assertEqual(result["summary"], "Test summary")
+        self.assertEqual(result["top_attractions"], ["Museum", "Par"])
+
+    def test_repair_drops_incomplete_member(self):
+        """Test that a dangling key without a value is dropped."""
+        raw = json.dumps(VALID_ANALYSIS)[:-1] + ', "cultural_no'
+        result = parse_analysis_response(raw)
+        self.assertNotIn("cultural_no", result)
+        self.assertEqual(result["water_quality"], "Good")
+
+    def test_enum_case_is_normalized(self):
+        """Test that enum values are matched case-insensitively."""
+        data = dict(VALID_ANALYSIS, noise_level="medium", rent_level="HIGH")
+        result = parse_analysis_response(json.dumps(data))
+        self.assertEqual(result["noise_level"], "Medium")
+        self.assertEqual(result["rent_level"], "High")
+
+    def test_no_json_raises_value_error(self):
+        """Test that a response without JSON raises ValueError."""
+        with self.assertRaises(ValueError):
+            parse_analysis_response("I cannot analyze this location.")
+
+    def test_out_of_range_score_rejected(self):
+        """Test that scores outside their range fail validation."""
+        from jsonschema import ValidationError
+
+        with self.assertRaises(ValidationError):
+            parse_analysis_response(json.dumps(dict(VALID_ANALYSIS, safety_score=42)))
+
 
 class SchemaTests(TestCase):
     """Tests for analysis schema validation."""
@@ -231,6 +326,15 @@ class SchemaTests(TestCase):
         with self.assertRaises(ValidationError):
             validate(instance=invalid_data, schema=analysis_schema)
 
+    def test_invalid_analysis_data_unknown_level(self):
+        """Test schema rejects levels outside the model choices."""
+        from jsonschema import ValidationError, validate
+
+        invalid_data = dict(VALID_ANALYSIS, noise_level="Deafening")
+
+        with self.assertRaises(ValidationError):
+            validate(instance=invalid_data, schema=analysis_schema)
+
     def test_invalid_analysis_data_wrong_type(self):
         """Test schema rejects wrong data types."""
         from jsonschema import ValidationError, validate
@@ -247,3 +351,278 @@ class SchemaTests(TestCase):
         with self.assertRaises(ValidationError):
             validate(instance=invalid_data, schema=analysis_schema)
 
+
+class MockUpstreamTests(TestCase):
+    """Tests for the local stand-in upstream servers."""
+
+    def setUp(self):
+        """Start a mock server on a free port."""
+        self.server = start_mock_upstreams(seed=1)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_geocode_and_weather_use_mock(self):
+        """Test geocoding and weather go to the mock when configured."""
+        with override_settings(MOCK_UPSTREAMS_URL=self.server.url):
+            geo = geocode_address("Springfield")
+            weather = get_weather_intelligence(geo["lat"], geo["lng"])
+            repeat = geocode_address("Springfield")
+
+        self.assertEqual(geo, repeat)  # Responses are deterministic
+        self.assertIn("human_feeling_index", weather)
+        self.assertEqual(weather["location"]["latitude"], geo["lat"])
+
+    def test_groq_uses_mock(self):
+        """Test the Groq client is pointed at the mock and returns valid analysis."""
+        self.addCleanup(setattr, groq_service, "_client", None)
+        groq_service._client = None
+
+        with override_settings(MOCK_UPSTREAMS_URL=self.server.url):
+            result = analyze_location_ai("Springfield", 10.0, 20.0)
+
+        self.assertEqual(result["city_name"], "Springfield")
+        self.assertIn(result["noise_level"], ["Low", "Medium", "High"])
+
+    def test_injected_errors(self):
+        """Test that an error rate of 1 fails every request."""
+        self.server.behaviours["nominatim"] = UpstreamBehaviour(error_rate=1)
+
+        with override_settings(MOCK_UPSTREAMS_URL=self.server.url):
+            with self.assertRaises(requests.HTTPError):
+                geocode_address("Springfield")
+
+    def test_rate_limit(self):
+        """Test that requests over the rate limit get HTTP 429."""
+        self.server.behaviours["open_meteo"] = UpstreamBehaviour(rate_limit=2)
+        url = f"{self.server.url}/open_meteo/v1/forecast?latitude=1&longitude=2"
+
+        statuses = [requests.get(url, timeout=5).status_code for _ in range(4)]
+
+        self.assertEqual(statuses[:2], [200, 200])
+        self.assertIn(429, statuses[2:])
+
+
+class CassetteTests(TestCase):
+    """Tests for upstream record/replay."""
+
+    def setUp(self):
+        """Use a temporary cassette directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cassette_dir = tmp.name
+
+    def cassette_settings(self, mode):
+        return override_settings(
+            UPSTREAM_CASSETTE_MODE=mode,
+            UPSTREAM_CASSETTE_DIR=self.cassette_dir,
+        )
+
+    @patch('apps.ai_engine.services.geocoding.requests.get')
+    def test_record_then_replay(self, mock_get):
+        """Test that recorded responses are replayed without network calls."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = [{"lat": "30.0444", "lon": "31.2357"}]
+        mock_get.return_value = mock_response
+
+        with self.cassette_settings("record"):
+            recorded = geocode_address("Cairo")
+
+        mock_get.side_effect = AssertionError("network used during replay")
+        with self.cassette_settings("replay"):
+            replayed = geocode_address("Cairo")
+
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_replay_miss_raises(self):
+        """Test that replaying an unrecorded request raises CassetteMiss."""
+        with self.cassette_settings("replay"):
+            with self.assertRaises(CassetteMiss):
+                geocode_address("Nowhere")
+
+    @patch('apps.ai_engine.services.groq_service.get_groq_client')
+    def test_groq_replay_needs_no_client(self, mock_get_client):
+        """Test Groq responses replay without creating an API client."""
+        mock_create = mock_get_client.return_value.chat.completions.create
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = json.dumps(VALID_ANALYSIS)
+        mock_create.return_value = mock_response
+
+        with self.cassette_settings("auto"):
+            first = analyze_location_ai("Cairo", 30.0444, 31.2357)
+            second = analyze_location_ai("Cairo", 30.0444, 31.2357)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get_client.call_count, 1)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "cache-namespace-tests"},
+})
+class CacheNamespaceTests(TestCase):
+    """Tests for the memoization helpers in apps.ai_engine.cache."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_falsy_values_are_cached(self):
+        """Test empty results are cache hits instead of recomputed each time."""
+        compute = MagicMock(return_value={})
+        namespace = CacheNamespace("test", timeout=60)
+        self.assertEqual(namespace.get_or_compute(("a",), compute), {})
+        self.assertEqual(namespace.get_or_compute(("a",), compute), {})
+        self.assertEqual(compute.call_count, 1)
+
+    def test_versions_and_invalidation(self):
+        """Test versions keep entries apart and invalidate removes one key."""
+        v1 = CacheNamespace("test", version=1, timeout=60)
+        v2 = CacheNamespace("test", version=2, timeout=60)
+        v1.set(("a",), "old")
+        self.assertIsNone(v2.get("a"))
+        self.assertEqual(v1.get("a"), "old")
+
+        v1.invalidate("a")
+        self.assertIsNone(v1.get("a"))
+
+    def test_memoize_decorator(self):
+        """Test the decorator keys results by positional arguments."""
+        calls = []
+        namespace = CacheNamespace("square", timeout=60)
+
+        @namespace.memoize
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        self.assertEqual([square(3), square(3), square(4)], [9, 9, 16])
+        square.invalidate(3)
+        square(3)
+        self.assertEqual(calls, [3, 4, 3])
+
+    def test_failures_are_negatively_cached(self):
+        """Test a failed computation is not retried within the negative timeout."""
+        compute = MagicMock(side_effect=requests.Timeout("upstream down"))
+        namespace = CacheNamespace("test", timeout=60, negative_timeout=30)
+        with self.assertRaises(requests.Timeout):
+            namespace.get_or_compute(("a",), compute)
+        with self.assertRaises(CachedFailure):
+            namespace.get_or_compute(("a",), compute)
+        self.assertEqual(compute.call_count, 1)
+
+        no_negative = CacheNamespace("other", timeout=60, negative_timeout=None)
+        for _ in range(2):
+            with self.assertRaises(requests.Timeout):
+                no_negative.get_or_compute(("a",), compute)
+        self.assertEqual(compute.call_count, 3)
+
+    def test_concurrent_misses_compute_once(self):
+        """Test only one of several concurrent callers computes a missing key."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"temp": 20}
+
+        namespace = CacheNamespace("test", timeout=60)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(namespace.get_or_compute(("a",), compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"temp": 20}] * 5)
+
+    def test_jittered_timeouts(self):
+        """Test timeouts are shortened by at most the jitter fraction."""
+        namespace = CacheNamespace("test", timeout=1000, jitter=0.1)
+        timeouts = {namespace.jittered(1000) for _ in range(50)}
+        self.assertTrue(all(900 <= t <= 1000 for t in timeouts))
+        self.assertGreater(len(timeouts), 1)
+        self.assertIsNone(namespace.jittered(None))
+
+    def test_cache_weather_uses_namespace(self):
+        """Test cache_weather only calls the upstream once per location."""
+        get_weather = MagicMock(return_value={"temperature": 21})
+        self.assertEqual(cache_weather(30.0, 31.0, get_weather), {"temperature": 21})
+        self.assertEqual(cache_weather(30.0, 31.0, get_weather), {"temperature": 21})
+        get_weather.assert_called_once_with(30.0, 31.0)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "cache-metrics-tests"},
+    },
+    CACHE_METRICS_FLUSH_INTERVAL=0,
+    CACHE_METRICS_SIZE_SAMPLE_EVERY=2,
+    CACHE_METRICS_TOKEN="scrape-me",
+)
+class CacheMetricsTests(TestCase):
+    """Tests for cache counters and the views exposing them."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.namespace = CacheNamespace("metrics-test", timeout=60, negative_timeout=30)
+
+    def test_counters_per_namespace(self):
+        """Test hits, misses, errors and stored sizes are counted."""
+        self.namespace.get_or_compute(("a",), lambda: {"temp": 20})
+        self.namespace.get_or_compute(("a",), lambda: {"temp": 21})
+        self.namespace.get_or_compute(("a",), lambda: {"temp": 22})
+        with self.assertRaises(ValueError):
+            self.namespace.get_or_compute(("b",), MagicMock(side_effect=ValueError("bad")))
+        with self.assertRaises(CachedFailure):
+            self.namespace.get_or_compute(("b",), MagicMock())
+
+        counts = cache_report()["namespaces"]["metrics-test"]
+        self.assertEqual(counts["hits"], 3)
+        self.assertEqual(counts["misses"], 2)
+        self.assertEqual(counts["errors"], 1)
+        self.assertEqual(counts["negative_hits"], 1)
+        self.assertEqual(counts["stores"], 1)
+        # Sized as the default (compressed JSON) serializer stores it
+        self.assertEqual(counts["stored_bytes"], len(b'j{"temp":20}'))
+        self.assertEqual(counts["hit_ratio"], 0.6)
+
+    def test_value_sizes_are_sampled(self):
+        """Test only one in CACHE_METRICS_SIZE_SAMPLE_EVERY stores is encoded to size it."""
+        for i in range(4):
+            self.namespace.set((i,), {"n": i})
+        counts = cache_report()["namespaces"]["metrics-test"]
+        self.assertEqual((counts["stores"], counts["sized_stores"]), (4, 2))
+        self.assertEqual(counts["avg_value_bytes"], len(b'j{"n":0}'))
+
+    def test_metrics_endpoint_requires_staff_or_token(self):
+        """Test the metrics endpoint rejects anonymous callers and accepts the token."""
+        url = reverse("ai_engine:cache-metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+
+        self.namespace.get_or_compute(("a",), lambda: 1)
+        response = self.client.get(url, {"format": "prometheus"}, HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('citysense_cache_misses_total{namespace="metrics-test"} 1', response.content.decode())
+
+    def test_admin_page_for_staff(self):
+        """Test staff users see the cache statistics page and JSON metrics."""
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="testpass123", is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get(reverse("ai_engine:cache-stats"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "metrics-test")
+
+        data = self.client.get(reverse("ai_engine:cache-metrics")).json()
+        self.assertIn("metrics-test", data["namespaces"])
+
+    def tearDown(self):
+        metrics.reset(["metrics-test"])
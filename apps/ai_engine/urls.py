@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import cache_stats, cache_metrics
+app_name = "ai_engine"
+urlpatterns = [
+    path("", cache_stats, name="cache-stats"),
+    path("metrics/", cache_metrics, name="cache-metrics"),
+]
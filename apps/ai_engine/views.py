@@ -1,3 +1,81 @@
+"""
+Cache monitoring views.
+
+Staff can see per-namespace hit ratios, timings and sizes on an admin
+page. The same figures are served as JSON or Prometheus text for
+scrapers, which authenticate with CACHE_METRICS_TOKEN.
+"""
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from apps.core.jsonlib import JsonResponse
+from .cache import cache_report
+from .cache_metrics import COUNTERS
+
+
+def _has_metrics_token(request):
+    token = getattr(settings, "CACHE_METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    return bool(token) and constant_time_compare(header, f"Bearer {token}")
+
+
+def _flatten(stats, prefix=""):
+    for name, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{name}_")
+        elif value is not None:
+            yield f"{prefix}{name}", value
+
+
+def prometheus_text(report):
+    """Render a cache_report() as Prometheus exposition text."""
+    lines = []
+    for name in COUNTERS:
+        metric = f"citysense_cache_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for namespace, counts in report["namespaces"].items():
+            lines.append(f'{metric}{{namespace="{namespace}"}} {counts[name]}')
+    for alias, stats in report["backends"].items():
+        for name, value in _flatten(stats or {}):
+            lines.append(f'citysense_cache_backend_{name}{{cache="{alias}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+@require_GET
+@never_cache
+def cache_metrics(request):
+    """
+    Cache counters for monitoring.
+
+    Query params:
+    - format: "json" (default) or "prometheus"
+
+    Requires a staff session or an `Authorization: Bearer <CACHE_METRICS_TOKEN>` header.
+    """
+    if not (request.user.is_active and request.user.is_staff) and not _has_metrics_token(request):
+        raise PermissionDenied
+
+    report = cache_report()
+    if request.GET.get("format") == "prometheus":
+        return HttpResponse(prometheus_text(report), content_type="text/plain; version=0.0.4")
+    return JsonResponse(report)
+
 
-# Create your views here.
+@staff_member_required
+@never_cache
+def cache_stats(request):
+    """Admin page with cache effectiveness per namespace."""
+    report = cache_report()
+    return render(request, "admin/ai_engine/cache_stats.html", {
+        **admin.site.each_context(request),
+        "title": "Cache statistics",
+        "namespaces": report["namespaces"],
+        "backends": report["backends"],
+    })
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Max, Q, Sum
+
+
+def backfill_location_aggregates(apps, schema_editor):
+    AnalysisResult = apps.get_model('analysis', 'AnalysisResult')
+    LocationAggregate = apps.get_model('analysis', 'LocationAggregate')
+
+    totals = {
+        'analysis_count': Count('id'),
+        'ai_score_sum': Sum('ai_score', output_field=FloatField()),
+        'safety_score_sum': Sum('safety_score'),
+        'latest_created_at': Max('created_at'),
+    }
+    for field in ('noise', 'rent'):
+        for level in ('Low', 'Medium', 'High'):
+            totals[f'{field}_{level.lower()}'] = Count('id', filter=Q(**{f'{field}_level': level}))
+
+    rows = AnalysisResult.objects.order_by().values('location_id').annotate(**totals)
+    LocationAggregate.objects.bulk_create(
+        [LocationAggregate(**row) for row in rows.iterator()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0005_alter_analysisresult_options_alter_location_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationAggregate',
+            fields=[
+                ('location', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aggregate', serialize=False, to='analysis.location')),
+                ('analysis_count', models.PositiveIntegerField(default=0)),
+                ('ai_score_sum', models.FloatField(default=0)),
+                ('safety_score_sum', models.FloatField(default=0)),
+                ('noise_low', models.PositiveIntegerField(default=0)),
+                ('noise_medium', models.PositiveIntegerField(default=0)),
+                ('noise_high', models.PositiveIntegerField(default=0)),
+                ('rent_low', models.PositiveIntegerField(default=0)),
+                ('rent_medium', models.PositiveIntegerField(default=0)),
+                ('rent_high', models.PositiveIntegerField(default=0)),
+                ('latest_created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Location Aggregates',
+            },
+        ),
+        migrations.RunPython(backfill_location_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0006_locationaggregate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='locationaggregate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0007_locationaggregate_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='feedback_updated_at',
+            field=models.DateTimeField(blank=True, help_text='When feedback on this report last changed; versions cached copies of the report page', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0008_analysisresult_feedback_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='feedback_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of feedback entries'),
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='feedback_rating_sum',
+            field=models.PositiveIntegerField(default=0, help_text='Sum of accuracy + usefulness + clarity over all feedback'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0009_analysisresult_feedback_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_id', models.BigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Location Tombstones',
+            },
+        ),
+    ]
@@ -63,10 +63,25 @@ class AnalysisResult(models.Model):
     ai_score = models.IntegerField(help_text="0-100 overall livability score")
     
     # User Feedback Metrics
+    # Running totals kept by apps.community.services; the average is
+    # derived from them in the same UPDATE
     avg_feedback_score = models.FloatField(
         default=0,
         help_text="Average score from user feedback (0-5)"
     )
+    feedback_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of feedback entries"
+    )
+    feedback_rating_sum = models.PositiveIntegerField(
+        default=0,
+        help_text="Sum of accuracy + usefulness + clarity over all feedback"
+    )
+    feedback_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When feedback on this report last changed; versions cached copies of the report page"
+    )
     
     # Weather Data (from Open-Meteo)
     temperature = models.FloatField(null=True, blank=True, help_text="Apparent temperature in Celsius")
@@ -84,4 +99,65 @@ class AnalysisResult(models.Model):
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['location', '-created_at']),
-        ]
\ No newline at end of file
+        ]
+
+class LocationAggregate(models.Model):
+    """
+    Running totals of a location's analysis results for the map layers.
+    
+    Kept up to date by the AnalysisResult signals in apps.analysis.signals,
+    so heatmap reads scan one row per location instead of every analysis.
+    Sums are stored rather than means so new results can be added with a
+    single atomic UPDATE. Rows are kept at a count of zero when every
+    analysis of a location is deleted.
+    """
+    location = models.OneToOneField(
+        Location, on_delete=models.CASCADE, primary_key=True, related_name="aggregate"
+    )
+    analysis_count = models.PositiveIntegerField(default=0)
+    ai_score_sum = models.FloatField(default=0)
+    safety_score_sum = models.FloatField(default=0)
+
+    # Level distributions
+    noise_low = models.PositiveIntegerField(default=0)
+    noise_medium = models.PositiveIntegerField(default=0)
+    noise_high = models.PositiveIntegerField(default=0)
+    rent_low = models.PositiveIntegerField(default=0)
+    rent_medium = models.PositiveIntegerField(default=0)
+    rent_high = models.PositiveIntegerField(default=0)
+
+    latest_created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.location} - {self.analysis_count} analyses"
+
+    @property
+    def mean_ai_score(self):
+        return self.ai_score_sum / self.analysis_count if self.analysis_count else None
+
+    @property
+    def mean_safety_score(self):
+        return self.safety_score_sum / self.analysis_count if self.analysis_count else None
+
+    class Meta:
+        verbose_name_plural = "Location Aggregates"
+
+
+class LocationTombstone(models.Model):
+    """
+    A deleted location, remembered for heatmap deltas.
+
+    Deleting a Location cascades to its LocationAggregate, the rows deltas
+    otherwise report removals from. Tombstones are recorded by the
+    Location post_delete signal and pruned after HEATMAP_DELTA_MAX_AGE,
+    since older cursors get a full snapshot anyway.
+    """
+    location_id = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Location {self.location_id} deleted at {self.deleted_at}"
+
+    class Meta:
+        verbose_name_plural = "Location Tombstones"
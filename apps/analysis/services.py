@@ -2,11 +2,18 @@
 Analysis service layer for location analysis.
 
 Provides city suggestion and fuzzy matching functionality using
-the GeoNames database.
+the GeoNames database, and heatmap aggregation for the map layers.
 """
 
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Floor, Greatest
+from django.utils import timezone
 from apps.ai_engine.services.analyze import analyze_location
+from .models import AnalysisResult, LocationAggregate, LocationTombstone
+from datetime import datetime, timedelta, timezone as dt_timezone
 import geonamescache 
+import hashlib
 from rapidfuzz import process
 import logging
 
@@ -41,6 +48,8 @@ ALL_CITIES = [
     for c in cities.values()
 ]
 CITY_BY_NAME = {c["name"]: c for c in ALL_CITIES}
+# Suggestions only change when the GeoNames data does
+CITY_DATA_VERSION = getattr(geonamescache, "__version__", "0")
 
 
 def suggest_city_fuzzy(query, limit=10):
@@ -72,4 +81,365 @@ def suggest_city_fuzzy(query, limit=10):
         return results
     except Exception as e:
         logger.error(f"Error suggesting cities for '{query}': {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+
+def city_suggestions_etag(query):
+    """Validator for the suggestions of a query (normalized as for caching)."""
+    normalized = query.lower().strip()
+    return hashlib.sha1(f"{CITY_DATA_VERSION}:{normalized}".encode()).hexdigest()
+
+
+# ==============================
+# LOCATION AGGREGATES
+# ==============================
+
+LEVELS = ("Low", "Medium", "High")
+
+# AnalysisResult fields that feed LocationAggregate
+AGGREGATED_FIELDS = {
+    "location", "location_id", "ai_score", "safety_score",
+    "noise_level", "rent_level", "created_at",
+}
+
+
+def _aggregate_totals():
+    """Aggregate expressions computing LocationAggregate columns from results."""
+    totals = {
+        "analysis_count": Count("id"),
+        "ai_score_sum": Coalesce(Sum("ai_score", output_field=FloatField()), 0.0),
+        "safety_score_sum": Coalesce(Sum("safety_score"), 0.0),
+        "latest_created_at": Max("created_at"),
+    }
+    for field in ("noise", "rent"):
+        for level in LEVELS:
+            totals[f"{field}_{level.lower()}"] = Count("id", filter=Q(**{f"{field}_level": level}))
+    return totals
+
+
+def record_analysis_added(result):
+    """
+    Add a newly created analysis to its location's aggregate.
+
+    Uses a single UPDATE with F() expressions, so concurrent analyses of
+    the same location don't lose increments. The aggregate row is created
+    on the location's first analysis.
+
+    Args:
+        result (AnalysisResult): The saved analysis
+    """
+    changes = {
+        "analysis_count": F("analysis_count") + 1,
+        "ai_score_sum": F("ai_score_sum") + result.ai_score,
+        "safety_score_sum": F("safety_score_sum") + result.safety_score,
+        # Greatest() is NULL on SQLite if either side is NULL
+        "latest_created_at": Coalesce(
+            Greatest(F("latest_created_at"), Value(result.created_at)), Value(result.created_at)
+        ),
+        "updated_at": timezone.now(),
+    }
+    for field in ("noise", "rent"):
+        level = getattr(result, f"{field}_level")
+        if level in LEVELS:
+            column = f"{field}_{level.lower()}"
+            changes[column] = F(column) + 1
+
+    rows = LocationAggregate.objects.filter(location_id=result.location_id)
+    if not rows.update(**changes):
+        LocationAggregate.objects.get_or_create(location_id=result.location_id)
+        rows.update(**changes)
+
+
+def refresh_location_aggregate(location_id):
+    """
+    Recompute a location's aggregate from its analyses.
+
+    Used when analyses are edited or deleted, where the running totals
+    can't be adjusted incrementally (e.g. the latest created_at).
+
+    Args:
+        location_id (int): Location primary key
+    """
+    totals = AnalysisResult.objects.filter(location_id=location_id).order_by().aggregate(
+        **_aggregate_totals()
+    )
+    rows = LocationAggregate.objects.filter(location_id=location_id)
+    if not rows.update(**totals, updated_at=timezone.now()) and totals["analysis_count"]:
+        LocationAggregate.objects.update_or_create(location_id=location_id, defaults=totals)
+
+
+# ==============================
+# HEATMAP LAYERS
+# ==============================
+
+
+def _level_weight(field):
+    # High=30, anything else=15, summed over the location's analyses
+    high = F(f"{field}_high")
+    return ExpressionWrapper(
+        Value(30.0) * high + Value(15.0) * (F("analysis_count") - high),
+        output_field=FloatField(),
+    )
+
+
+# Layer name -> SQL expression for the summed weight of a location's
+# analyses, computed from LocationAggregate columns
+HEATMAP_LAYERS = {
+    "ai_score": F("ai_score_sum"),
+    "safety": F("safety_score_sum"),
+    "noise": _level_weight("noise"),
+    "rent": _level_weight("rent"),
+}
+DEFAULT_HEATMAP_LAYER = "ai_score"
+
+
+# Approximate on-screen size of one cluster cell, in pixels
+HEATMAP_CELL_PX = 32
+# From this zoom level on, points are returned per location
+HEATMAP_CLUSTER_MAX_ZOOM = 16
+
+# Column order of heatmap rows, per location and per cluster cell
+HEATMAP_FIELDS = ("lat", "lng", "weight")
+HEATMAP_CLUSTER_FIELDS = ("lat", "lng", "weight", "count")
+# Rows fetched from the database per round trip when streaming
+HEATMAP_CHUNK_SIZE = 2000
+
+
+def parse_bbox(value):
+    """
+    Parse a Leaflet bounding box string "west,south,east,north".
+
+    Longitudes outside -180..180 (maps panned across the antimeridian)
+    are wrapped back into range.
+
+    Returns:
+        tuple: (west, south, east, north) floats
+
+    Raises:
+        ValueError: If the string is malformed or latitudes are out of range
+    """
+    try:
+        west, south, east, north = (float(v) for v in value.split(","))
+    except (AttributeError, ValueError):
+        raise ValueError("bbox must be 'west,south,east,north'")
+
+    if not (-90 <= south <= north <= 90):
+        raise ValueError("bbox latitudes must satisfy -90 <= south <= north <= 90")
+    if east - west >= 360:
+        west, east = -180.0, 180.0
+    else:
+        west = (west + 180) % 360 - 180
+        east = (east + 180) % 360 - 180
+    return west, south, east, north
+
+
+def grid_cell_size(zoom):
+    """Cluster cell size in degrees for a Web Mercator zoom level."""
+    return 360 / (256 / HEATMAP_CELL_PX) / 2 ** zoom
+
+
+def viewport_filter(bbox):
+    """Q object matching rows whose related location lies inside bbox."""
+    west, south, east, north = bbox
+    inside = Q(location__latitude__gte=south, location__latitude__lte=north)
+    if west <= east:
+        return inside & Q(location__longitude__gte=west, location__longitude__lte=east)
+    # Viewport crosses the antimeridian
+    return inside & (Q(location__longitude__gte=west) | Q(location__longitude__lte=east))
+
+
+def iter_heatmap_rows(layer=DEFAULT_HEATMAP_LAYER, bbox=None, zoom=None):
+    """
+    Lazily build weighted heatmap rows from the per-location aggregates.
+
+    Each location's weight is the mean over its analyses, read from
+    LocationAggregate, so the query scans one row per location no matter
+    how many analyses it has.
+
+    With a zoom level below HEATMAP_CLUSTER_MAX_ZOOM, locations are
+    further grouped into square grid cells of about HEATMAP_CELL_PX
+    screen pixels; each cell becomes one row at the centroid of its
+    analyses, with a count. The number of points is then bounded by
+    the viewport's size in pixels rather than by the table size.
+
+    Args:
+        layer (str): 'ai_score' (default), 'safety', 'noise' or 'rent';
+            unknown layers fall back to 'ai_score'
+        bbox (tuple): Optional (west, south, east, north) viewport from parse_bbox
+        zoom (int): Optional map zoom level
+
+    Rows are fetched in chunks of HEATMAP_CHUNK_SIZE (server-side
+    cursors on PostgreSQL) as the returned iterator is consumed.
+
+    Returns:
+        tuple: (fields, rows) where fields is HEATMAP_FIELDS or
+        HEATMAP_CLUSTER_FIELDS and rows is an iterator of tuples in that order
+    """
+    weight_sum = HEATMAP_LAYERS.get(layer, HEATMAP_LAYERS[DEFAULT_HEATMAP_LAYER])
+    aggregates = LocationAggregate.objects.filter(analysis_count__gt=0)
+    if bbox is not None:
+        aggregates = aggregates.filter(viewport_filter(bbox))
+
+    if zoom is None or zoom >= HEATMAP_CLUSTER_MAX_ZOOM:
+        rows = aggregates.values_list(
+            "location__latitude", "location__longitude", "analysis_count"
+        ).annotate(weight_sum=weight_sum)
+        return HEATMAP_FIELDS, (
+            (lat, lng, round(total / count, 2))
+            for lat, lng, count, total in rows.iterator(chunk_size=HEATMAP_CHUNK_SIZE)
+        )
+
+    size = grid_cell_size(zoom)
+    count = F("analysis_count")
+    rows = (
+        aggregates
+        .annotate(
+            cell_x=Floor(F("location__longitude") / size),
+            cell_y=Floor(F("location__latitude") / size),
+        )
+        .values("cell_x", "cell_y")
+        .annotate(
+            lat_sum=Sum(F("location__latitude") * count),
+            lng_sum=Sum(F("location__longitude") * count),
+            weight_sum=Sum(weight_sum),
+            count=Sum(count),
+        )
+        .values_list("lat_sum", "lng_sum", "weight_sum", "count")
+    )
+    return HEATMAP_CLUSTER_FIELDS, (
+        (round(lat / count, 6), round(lng / count, 6), round(total / count, 2), count)
+        for lat, lng, total, count in rows.iterator(chunk_size=HEATMAP_CHUNK_SIZE)
+    )
+
+
+def heatmap_rows(layer=DEFAULT_HEATMAP_LAYER, bbox=None, zoom=None):
+    """
+    Heatmap rows as a list of tuples. See iter_heatmap_rows.
+    """
+    fields, rows = iter_heatmap_rows(layer, bbox=bbox, zoom=zoom)
+    return fields, list(rows)
+
+
+def heatmap_points(layer=DEFAULT_HEATMAP_LAYER, bbox=None, zoom=None):
+    """
+    Heatmap rows as a list of dicts with 'lat', 'lng' and 'weight' keys
+    (plus 'count' when clustered). See iter_heatmap_rows for the arguments.
+    """
+    fields, rows = iter_heatmap_rows(layer, bbox=bbox, zoom=zoom)
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def heatmap_version():
+    """
+    Cheap version stamp of the map data.
+
+    Returns:
+        tuple: (latest LocationAggregate.updated_at or None, aggregate row
+        count); the count catches locations deleted outright
+    """
+    version = LocationAggregate.objects.aggregate(latest=Max("updated_at"), count=Count("pk"))
+    return version["latest"], version["count"]
+
+
+# ==============================
+# HEATMAP DELTAS
+# ==============================
+
+# Column order of delta rows
+HEATMAP_DELTA_FIELDS = ("id", "lat", "lng", "weight")
+# Re-send changes this far behind the cursor, so aggregates updated by
+# transactions that committed after a cursor was issued aren't missed
+HEATMAP_DELTA_OVERLAP = timedelta(seconds=5)
+
+
+def encode_cursor(moment):
+    """Encode an updated_at timestamp as an opaque delta cursor string."""
+    return str(int(moment.timestamp() * 1_000_000)) if moment else "0"
+
+
+def decode_cursor(value):
+    """
+    Decode a delta cursor string.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        return datetime.fromtimestamp(int(value) / 1_000_000, tz=dt_timezone.utc)
+    except (OverflowError, OSError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def record_location_deleted(location_id):
+    """
+    Remember a deleted location for heatmap deltas.
+
+    Also prunes tombstones older than HEATMAP_DELTA_MAX_AGE, which no
+    delta can ask for any more.
+
+    Args:
+        location_id (int): Primary key of the deleted Location
+    """
+    max_age = timedelta(seconds=getattr(settings, "HEATMAP_DELTA_MAX_AGE", 7 * 24 * 3600))
+    LocationTombstone.objects.filter(deleted_at__lt=timezone.now() - max_age).delete()
+    LocationTombstone.objects.create(location_id=location_id)
+
+
+def heatmap_delta(layer=DEFAULT_HEATMAP_LAYER, since=None):
+    """
+    Per-location heatmap changes since a cursor.
+
+    Rows are keyed by location id so the client can upsert them into the
+    points it kept from earlier responses. Locations whose analyses were
+    all deleted, or which were deleted outright (LocationTombstone), are
+    listed in 'removed'. A full snapshot is returned
+    instead when there is no cursor, when it is older than
+    HEATMAP_DELTA_MAX_AGE, or when more than HEATMAP_DELTA_MAX_CHANGES
+    locations changed; the client then replaces everything it kept.
+
+    Args:
+        layer (str): Heatmap layer, as for heatmap_rows
+        since (datetime): Decoded cursor from a previous response
+
+    Returns:
+        dict: 'full' (bool), 'cursor' (str), 'fields' (HEATMAP_DELTA_FIELDS),
+        'points' (list of row lists) and 'removed' (list of location ids)
+    """
+    weight_sum = HEATMAP_LAYERS.get(layer, HEATMAP_LAYERS[DEFAULT_HEATMAP_LAYER])
+    max_age = timedelta(seconds=getattr(settings, "HEATMAP_DELTA_MAX_AGE", 7 * 24 * 3600))
+    max_changes = getattr(settings, "HEATMAP_DELTA_MAX_CHANGES", 5000)
+
+    # Taken first: anything updated while we read is re-sent next time
+    latest = LocationAggregate.objects.aggregate(latest=Max("updated_at"))["latest"]
+    deleted = LocationTombstone.objects.aggregate(latest=Max("deleted_at"))["latest"]
+    if deleted and (latest is None or deleted > latest):
+        latest = deleted
+    rows = LocationAggregate.objects.values_list(
+        "location_id", "location__latitude", "location__longitude", "analysis_count"
+    ).annotate(weight_sum=weight_sum)
+
+    full = since is None or since < timezone.now() - max_age
+    if not full:
+        changed = list(rows.filter(updated_at__gt=since - HEATMAP_DELTA_OVERLAP)[:max_changes + 1])
+        full = len(changed) > max_changes
+    if full:
+        changed = rows.filter(analysis_count__gt=0).iterator()
+
+    points, removed = [], []
+    for location_id, lat, lng, count, total in changed:
+        if count:
+            points.append([location_id, lat, lng, round(total / count, 2)])
+        else:
+            removed.append(location_id)
+    if not full:
+        removed += LocationTombstone.objects.filter(
+            deleted_at__gt=since - HEATMAP_DELTA_OVERLAP
+        ).values_list("location_id", flat=True)
+
+    return {
+        "full": full,
+        "cursor": encode_cursor(latest) if latest else encode_cursor(since),
+        "fields": HEATMAP_DELTA_FIELDS,
+        "points": points,
+        "removed": removed,
+    }
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import AnalysisResult, Location
+from .services import (
+    AGGREGATED_FIELDS, record_analysis_added, record_location_deleted, refresh_location_aggregate,
+)
+
+
+@receiver(post_save, sender=AnalysisResult)
+def update_location_aggregate(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        record_analysis_added(instance)
+    elif update_fields is None or AGGREGATED_FIELDS.intersection(update_fields):
+        refresh_location_aggregate(instance.location_id)
+
+
+@receiver(post_delete, sender=AnalysisResult)
+def remove_from_location_aggregate(sender, instance, **kwargs):
+    refresh_location_aggregate(instance.location_id)
+
+
+@receiver(post_delete, sender=Location)
+def remember_deleted_location(sender, instance, **kwargs):
+    record_location_deleted(instance.pk)
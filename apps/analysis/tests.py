@@ -4,14 +4,23 @@ Tests for the analysis application.
 Tests cover:
 - Models (Location, AnalysisResult)
 - Views (analyze, report, heatmap, suggestions)
+- Report page caching (ETag/304, fragment cache)
 - Services (geocoding, city suggestions)
 """
 
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Location, AnalysisResult
-from .services import suggest_city_fuzzy
+from django.db import OperationalError, connection
+from django.db.models.query import QuerySet
+from django.test.utils import CaptureQueriesContext
+from .models import Location, AnalysisResult, LocationAggregate
+from .services import suggest_city_fuzzy, encode_cursor, heatmap_points
+from django.http import JsonResponse
+from django.utils import timezone
+from datetime import timedelta
+from unittest.mock import patch
+from array import array
 import json
 
 User = get_user_model()
@@ -92,6 +101,75 @@ class AnalysisResultModelTests(TestCase):
         self.assertIn("78", str(result))
 
 
+class LocationAggregateTests(TestCase):
+    """Tests for incremental maintenance of per-location aggregates."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            username="testuser",
+            password="testpass123"
+        )
+        self.location = Location.objects.create(
+            address="Test City",
+            latitude=40.7128,
+            longitude=-74.0060
+        )
+
+    def _create(self, ai_score, noise_level="Low"):
+        return AnalysisResult.objects.create(
+            user=self.user,
+            location=self.location,
+            safety_score=ai_score / 10,
+            noise_level=noise_level,
+            rent_level="Medium",
+            water_quality="Good",
+            ai_summary="Test",
+            ai_score=ai_score
+        )
+
+    def test_created_results_are_added(self):
+        """Test new analyses update count, sums, distributions and latest time."""
+        self._create(80)
+        second = self._create(60, noise_level="High")
+
+        aggregate = LocationAggregate.objects.get(location=self.location)
+        self.assertEqual(aggregate.analysis_count, 2)
+        self.assertEqual(aggregate.mean_ai_score, 70)
+        self.assertAlmostEqual(aggregate.mean_safety_score, 7.0)
+        self.assertEqual((aggregate.noise_low, aggregate.noise_high), (1, 1))
+        self.assertEqual(aggregate.rent_medium, 2)
+        self.assertEqual(aggregate.latest_created_at, second.created_at)
+
+    def test_edited_and_deleted_results_are_recomputed(self):
+        """Test edits and deletions recompute the totals, keeping empty rows."""
+        first = self._create(80)
+        second = self._create(60, noise_level="High")
+
+        first.ai_score = 90
+        first.save()
+        aggregate = LocationAggregate.objects.get(location=self.location)
+        self.assertEqual(aggregate.ai_score_sum, 150)
+
+        second.delete()
+        aggregate.refresh_from_db()
+        self.assertEqual(aggregate.analysis_count, 1)
+        self.assertEqual(aggregate.noise_high, 0)
+        self.assertEqual(aggregate.latest_created_at, first.created_at)
+
+        first.delete()
+        aggregate.refresh_from_db()
+        self.assertEqual(aggregate.analysis_count, 0)
+        self.assertIsNone(aggregate.latest_created_at)
+
+    def test_location_delete_cascades(self):
+        """Test deleting a location removes its aggregate."""
+        self._create(80)
+        self.location.delete()
+        self.assertFalse(LocationAggregate.objects.exists())
+
+
 class AnalyzeViewTests(TestCase):
     """Tests for analyze view."""
 
@@ -182,6 +260,52 @@ class ReportViewTests(TestCase):
         # Should return 404 (no matching report for this user)
         self.assertEqual(response.status_code, 404)
 
+    def test_report_view_conditional_get(self):
+        """Test repeat views get 304 until the report's feedback changes."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:report", args=[self.result.id])
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        AnalysisResult.objects.filter(pk=self.result.pk).update(feedback_updated_at=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_report_view_renders_from_fragment_cache(self):
+        """Test the report body is cached per feedback version."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:report", args=[self.result.id])
+        self.client.get(url)
+        AnalysisResult.objects.filter(pk=self.result.pk).update(ai_summary="Changed summary")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, "Test summary")
+        self.assertFalse([q for q in queries if "ai_summary" in q["sql"]])
+
+        AnalysisResult.objects.filter(pk=self.result.pk).update(feedback_updated_at=timezone.now())
+        self.assertContains(self.client.get(url), "Changed summary")
+
+    def test_report_fragment_not_reused_for_recreated_pk(self):
+        """Test a report reusing a deleted report's pk doesn't get its cached page."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:report", args=[self.result.id])
+        self.assertContains(self.client.get(url), "Test summary")
+
+        pk = self.result.pk
+        self.result.delete()
+        AnalysisResult.objects.create(
+            pk=pk, user=self.user, location=self.location, safety_score=7.0, noise_level="Low",
+            rent_level="Medium", water_quality="Good", ai_summary="Other summary", ai_score=75,
+        )
+        self.assertContains(self.client.get(url), "Other summary")
+
 
 class CityStuggestionsTests(TestCase):
     """Tests for city suggestions AJAX endpoint."""
@@ -210,6 +334,26 @@ class CityStuggestionsTests(TestCase):
         # Should return a list (maybe empty if GeoNames isn't loaded)
         self.assertIsInstance(data, list)
 
+    def test_suggestions_conditional_get(self):
+        """Test suggestions are publicly cacheable and revalidate with 304."""
+        url = reverse("analysis:city_suggestions")
+        response = self.client.get(url, {"q": "Cairo"})
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=86400", response["Cache-Control"])
+
+        with patch("apps.analysis.views.cache_city_suggestions") as mock_suggest:
+            response = self.client.get(url, {"q": "cairo "}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        mock_suggest.assert_not_called()
+
+    def test_suggestions_error_not_cached(self):
+        """Test a failed lookup returns an empty list that caches won't store."""
+        url = reverse("analysis:city_suggestions")
+        with patch("apps.analysis.views.cache_city_suggestions", side_effect=RuntimeError("down")):
+            response = self.client.get(url, {"q": "cairo"})
+        self.assertEqual(json.loads(response.content), [])
+        self.assertIn("no-store", response["Cache-Control"])
+
 
 class CityFuzzySuggestionsTests(TestCase):
     """Tests for fuzzy city matching service."""
@@ -265,12 +409,38 @@ class HeatmapDataTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response["Content-Type"], "application/json")
 
+    def test_heatmap_streams_in_chunks(self):
+        """Test the JSON body is streamed and matches the buffered encoding."""
+        self._add_analysis(51.5, -0.12, 50)
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            json.loads(response.getvalue()),
+            json.loads(JsonResponse(heatmap_points(), safe=False).content),
+        )
+
+    def test_heatmap_query_error_is_not_streamed(self):
+        """Test a query failing while rows are read returns the no-store fallback."""
+        def failing_rows(*args, **kwargs):
+            raise OperationalError("database is locked")
+            yield
+
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+        with patch.object(QuerySet, "iterator", failing_rows):
+            response = self.client.get(url)
+        self.assertFalse(response.streaming)
+        self.assertEqual(json.loads(response.content), [])
+        self.assertIn("no-store", response["Cache-Control"])
+
     def test_heatmap_default_layer(self):
         """Test heatmap with default layer."""
         self.client.login(email="test@example.com", password="testpass123")
         url = reverse("analysis:heatmap-data")
         response = self.client.get(url)
-        data = json.loads(response.content)
+        data = json.loads(response.getvalue())
         self.assertIsInstance(data, list)
         if data:
             self.assertIn("lat", data[0])
@@ -282,7 +452,7 @@ class HeatmapDataTests(TestCase):
         self.client.login(email="test@example.com", password="testpass123")
         url = reverse("analysis:heatmap-data")
         response = self.client.get(url, {"layer": "safety"})
-        data = json.loads(response.content)
+        data = json.loads(response.getvalue())
         # For safety layer, weight should be the safety_score
         if data:
             self.assertEqual(data[0]["weight"], self.result.safety_score)
@@ -292,7 +462,201 @@ class HeatmapDataTests(TestCase):
         self.client.login(email="test@example.com", password="testpass123")
         url = reverse("analysis:heatmap-data")
         response = self.client.get(url, {"layer": "noise"})
-        data = json.loads(response.content)
+        data = json.loads(response.getvalue())
         # For noise "Low", weight should be 15
         if data:
             self.assertEqual(data[0]["weight"], 15)
+
+    def test_heatmap_groups_analyses_per_location(self):
+        """Test repeated analyses of one location become one averaged point."""
+        AnalysisResult.objects.create(
+            user=self.user,
+            location=self.location,
+            safety_score=6.0,
+            noise_level="High",
+            rent_level="High",
+            water_quality="Good",
+            ai_summary="Test",
+            ai_score=60
+        )
+        other = Location.objects.create(address="Other City", latitude=1.0, longitude=2.0)
+        AnalysisResult.objects.create(
+            user=self.user,
+            location=other,
+            safety_score=5.0,
+            noise_level="Low",
+            rent_level="Low",
+            water_quality="Good",
+            ai_summary="Test",
+            ai_score=50
+        )
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+
+        data = json.loads(self.client.get(url).getvalue())
+        points = {(p["lat"], p["lng"]): p["weight"] for p in data}
+        self.assertEqual(points, {(40.7128, -74.0060): 70, (1.0, 2.0): 50})
+
+        data = json.loads(self.client.get(url, {"layer": "noise"}).getvalue())
+        points = {(p["lat"], p["lng"]): p["weight"] for p in data}
+        self.assertEqual(points[(40.7128, -74.0060)], 22.5)
+
+    def _add_analysis(self, latitude, longitude, ai_score):
+        location = Location.objects.create(
+            address=f"Place {latitude},{longitude}", latitude=latitude, longitude=longitude
+        )
+        return AnalysisResult.objects.create(
+            user=self.user,
+            location=location,
+            safety_score=5.0,
+            noise_level="Low",
+            rent_level="Low",
+            water_quality="Good",
+            ai_summary="Test",
+            ai_score=ai_score
+        )
+
+    def test_heatmap_bbox_filters_viewport(self):
+        """Test only points inside the bounding box are returned."""
+        self._add_analysis(40.75, -73.98, 60)
+        self._add_analysis(51.5, -0.12, 50)
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+
+        data = json.loads(self.client.get(url, {"bbox": "-75,40,-73,41"}).getvalue())
+        self.assertEqual({p["lat"] for p in data}, {40.7128, 40.75})
+
+        # Viewport crossing the antimeridian
+        self._add_analysis(-17.7, 178.0, 40)
+        data = json.loads(self.client.get(url, {"bbox": "170,-20,190,0"}).getvalue())
+        self.assertEqual([p["lng"] for p in data], [178.0])
+
+    def test_heatmap_zoom_clusters_points(self):
+        """Test points are merged into grid cells at low zoom."""
+        self._add_analysis(40.75, -73.98, 60)
+        self._add_analysis(51.5, -0.12, 50)
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+
+        data = json.loads(self.client.get(url, {"zoom": 4}).getvalue())
+        self.assertEqual(len(data), 2)
+        new_york = next(p for p in data if p["count"] == 2)
+        self.assertEqual(new_york["weight"], 70)
+        self.assertAlmostEqual(new_york["lat"], (40.7128 + 40.75) / 2, places=5)
+
+        # Close enough zoom returns every location
+        data = json.loads(self.client.get(url, {"zoom": 17}).getvalue())
+        self.assertEqual(len(data), 3)
+
+    def test_heatmap_compact_formats(self):
+        """Test columnar JSON and packed float32 encodings."""
+        self._add_analysis(51.5, -0.12, 50)
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+        expected = json.loads(self.client.get(url).getvalue())
+
+        data = json.loads(self.client.get(url, {"format": "columnar"}).getvalue())
+        self.assertEqual(list(zip(data["lat"], data["lng"], data["weight"])),
+                         [(p["lat"], p["lng"], p["weight"]) for p in expected])
+
+        response = self.client.get(url, HTTP_ACCEPT="application/octet-stream")
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        self.assertEqual(response["X-Heatmap-Fields"], "lat,lng,weight")
+        self.assertIn("Accept", response["Vary"])
+        values = array("f")
+        values.frombytes(response.getvalue())
+        self.assertEqual(len(values), 3 * len(expected))
+        for i, point in enumerate(expected):
+            self.assertAlmostEqual(values[3 * i], point["lat"], places=4)
+            self.assertAlmostEqual(values[3 * i + 2], point["weight"], places=4)
+
+        response = self.client.get(url, {"format": "f32", "zoom": 2})
+        self.assertEqual(response["X-Heatmap-Fields"], "lat,lng,weight,count")
+
+    def test_heatmap_delta(self):
+        """Test deltas send only changed locations and removals since the cursor."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data-delta")
+
+        snapshot = json.loads(self.client.get(url).content)
+        self.assertTrue(snapshot["full"])
+        self.assertEqual(snapshot["points"], [[self.location.id, 40.7128, -74.0060, 80]])
+
+        # Age existing rows past the overlap window, then change one location
+        LocationAggregate.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        cursor = encode_cursor(timezone.now() - timedelta(minutes=1))
+        added = self._add_analysis(51.5, -0.12, 50)
+        data = json.loads(self.client.get(url, {"since": cursor}).content)
+        self.assertFalse(data["full"])
+        self.assertEqual(data["points"], [[added.location_id, 51.5, -0.12, 50]])
+        self.assertEqual(data["removed"], [])
+        self.assertGreater(int(data["cursor"]), int(cursor))
+
+        added.delete()
+        data = json.loads(self.client.get(url, {"since": cursor}).content)
+        self.assertEqual((data["points"], data["removed"]), ([], [added.location_id]))
+
+    def test_heatmap_delta_reports_deleted_location(self):
+        """Test deleting a Location outright lists it as removed."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data-delta")
+        cursor = encode_cursor(timezone.now() - timedelta(minutes=1))
+        added = self._add_analysis(51.5, -0.12, 50)
+        LocationAggregate.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+        added.location.delete()
+        self.assertFalse(LocationAggregate.objects.filter(location_id=added.location_id).exists())
+        data = json.loads(self.client.get(url, {"since": cursor}).content)
+        self.assertFalse(data["full"])
+        self.assertEqual((data["points"], data["removed"]), ([], [added.location_id]))
+        self.assertGreater(int(data["cursor"]), int(cursor))
+
+    def test_heatmap_delta_full_snapshot_fallback(self):
+        """Test stale or oversized deltas fall back to a full snapshot."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data-delta")
+        self._add_analysis(51.5, -0.12, 50)
+
+        old = encode_cursor(timezone.now() - timedelta(days=30))
+        self.assertTrue(json.loads(self.client.get(url, {"since": old}).content)["full"])
+
+        recent = encode_cursor(timezone.now() - timedelta(minutes=1))
+        with self.settings(HEATMAP_DELTA_MAX_CHANGES=1):
+            data = json.loads(self.client.get(url, {"since": recent}).content)
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["points"]), 2)
+
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}).status_code, 400)
+
+    def test_heatmap_conditional_get(self):
+        """Test heatmap validators yield 304 until the map data changes."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+        response = self.client.get(url, {"layer": "safety"})
+        etag = response["ETag"]
+        self.assertIn("private", response["Cache-Control"])
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        with patch("apps.analysis.views.iter_heatmap_rows") as mock_rows:
+            response = self.client.get(url, {"layer": "safety"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        mock_rows.assert_not_called()
+
+        # Other parameters or encodings are separate representations
+        response = self.client.get(url, {"layer": "noise"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, {"layer": "safety", "format": "f32"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        self._add_analysis(51.5, -0.12, 50)
+        response = self.client.get(url, {"layer": "safety"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_heatmap_invalid_viewport(self):
+        """Test malformed bbox or zoom parameters are rejected."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:heatmap-data")
+        for params in ({"bbox": "1,2,3"}, {"bbox": "0,50,10,40"}, {"zoom": "far"}, {"zoom": 40},
+                       {"format": "xml"}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
@@ -5,19 +5,34 @@ Handles user location searches, AI analysis, weather data,
 and report viewing.
 """
 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from .forms import AnalysisForm
 from .models import Location, AnalysisResult
 from apps.ai_engine.services.analyze import analyze_location
 from apps.ai_engine.services.geocoding import geocode_address
-from django.http import JsonResponse, Http404
+from django.http import StreamingHttpResponse, Http404
 from apps.ai_engine.services.groq_service import analyze_location_ai
 from apps.ai_engine.services.weather import get_weather_intelligence
 from apps.ai_engine.cache import cache_weather, cache_city_suggestions
+from apps.core.jsonlib import JsonResponse
+from apps.core.responses import DEFAULT_CHUNK_SIZE, StreamingJsonResponse, chunked
+from apps.reports.view_counts import record_view
 from django.contrib import messages
-from .services import suggest_city_fuzzy
-from django.views.decorators.http import require_GET
+from .services import (
+    suggest_city_fuzzy, city_suggestions_etag, iter_heatmap_rows, heatmap_delta,
+    heatmap_version, parse_bbox, decode_cursor,
+)
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from array import array
+from itertools import chain, islice
+import hashlib
+import sys
 import logging
 
 logger = logging.getLogger(__name__)
@@ -110,6 +125,45 @@ def analyze_view(request):
     return render(request, "analysis/analyze.html", {"form": form})
 
 
+def _report_version(request, pk):
+    # Shared by the ETag and Last-Modified functions: one query per request
+    if not hasattr(request, "_report_version"):
+        request._report_version = (
+            AnalysisResult.objects.filter(pk=pk, user=request.user)
+            .values_list("created_at", "feedback_updated_at").first()
+        )
+    return request._report_version
+
+
+def report_cache_key(pk, created_at, feedback_updated_at):
+    """
+    Version of a report page: reports only change when their feedback does.
+
+    created_at tells apart reports that reuse a pk after the database was
+    reset or restored, since the cache can outlive it.
+    """
+    changed = feedback_updated_at.timestamp() if feedback_updated_at else 0
+    return f"{getattr(settings, 'REPORT_CACHE_VERSION', 1)}:{pk}:{created_at.timestamp()}:{changed}"
+
+
+def _report_etag(request, pk):
+    version = _report_version(request, pk)
+    if version is None:
+        return None
+    # The page header carries the user's CSRF token, which changes on
+    # login; get_token() creates it now if this is the first page rendered
+    get_token(request)
+    key = f"{report_cache_key(pk, *version)}:{request.user.pk}:{request.META['CSRF_COOKIE']}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _report_last_modified(request, pk):
+    version = _report_version(request, pk)
+    if version is None:
+        return None
+    return max(filter(None, version))
+
+
 @login_required
 def report_view(request, pk):
     """
@@ -117,14 +171,120 @@ def report_view(request, pk):
     
     Only shows reports belonging to the authenticated user.
     Returns 404 if report not found or belongs to different user.
+    The view is counted in the cache (apps.reports.view_counts), not the
+    database.
+
+    Reports don't change after creation except for their feedback score,
+    so the page is served with an ETag/Last-Modified from the report and
+    its feedback version (304 for repeat views), and the report body is
+    rendered from a fragment cache keyed on the same version.
     """
-    report = get_object_or_404(AnalysisResult, pk=pk, user=request.user)
+    if _report_version(request, pk) is None:
+        raise Http404("No AnalysisResult matches the given query.")
+    record_view(pk)
     logger.info(f"Report viewed: {pk} by user: {request.user.id}")
-    return render(request, "analysis/report.html", {"report": report})
+    return _render_report(request, pk)
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_report_etag, last_modified_func=_report_last_modified)
+def _render_report(request, pk):
+    # Only loaded when the cached fragment is missing
+    report = SimpleLazyObject(
+        lambda: AnalysisResult.objects.select_related("location").get(pk=pk)
+    )
+    return render(request, "analysis/report.html", {
+        "report": report,
+        "report_cache_key": report_cache_key(pk, *_report_version(request, pk)),
+        "report_cache_timeout": getattr(settings, "REPORT_FRAGMENT_CACHE_TIMEOUT", 86400),
+    })
+
+
+HEATMAP_FORMATS = ("json", "columnar", "f32")
+HEATMAP_BINARY_CONTENT_TYPE = "application/octet-stream"
+
+
+def heatmap_format(request):
+    """
+    Pick the heatmap encoding from ?format=, falling back to the Accept
+    header (an explicit application/octet-stream selects "f32").
+    """
+    if "format" in request.GET:
+        return request.GET["format"]
+    if HEATMAP_BINARY_CONTENT_TYPE in request.headers.get("Accept", ""):
+        return "f32"
+    return "json"
+
+
+def iter_f32_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encode rows as little-endian float32 values, one chunk at a time."""
+    for chunk in chunked(rows, chunk_size):
+        values = array("f", chain.from_iterable(chunk))
+        if sys.byteorder == "big":
+            values.byteswap()
+        yield values.tobytes()
+
+
+def heatmap_response(fields, rows, fmt="json"):
+    """
+    Serialize heatmap rows into the response body.
+    
+    Formats:
+    - json: list of {"lat", "lng", "weight"} objects
+    - columnar: {"lat": [...], "lng": [...], "weight": [...]}
+    - f32: little-endian float32 values, one group per row in the order
+      given by the X-Heatmap-Fields header (e.g. "lat,lng,weight")
+    
+    The json and f32 bodies are streamed while `rows` is consumed, so
+    memory use doesn't grow with the number of points. Columnar output
+    needs every row before the first column ends and is built in memory.
+    
+    Args:
+        fields (tuple): Column names of each row
+        rows (iterable): Row tuples from iter_heatmap_rows
+        fmt (str): One of HEATMAP_FORMATS
+    """
+    if fmt == "columnar":
+        columns = list(zip(*rows)) or [()] * len(fields)
+        return JsonResponse({name: column for name, column in zip(fields, columns)})
+
+    if fmt == "f32":
+        response = StreamingHttpResponse(
+            iter_f32_chunks(rows), content_type=HEATMAP_BINARY_CONTENT_TYPE
+        )
+        response["X-Heatmap-Fields"] = ",".join(fields)
+        return response
+
+    return StreamingJsonResponse(dict(zip(fields, row)) for row in rows)
+
+
+def _heatmap_version(request):
+    # Shared by the ETag and Last-Modified functions: one query per request
+    if not hasattr(request, "_heatmap_version"):
+        request._heatmap_version = heatmap_version()
+    return request._heatmap_version
+
+
+def _heatmap_etag(request):
+    latest, count = _heatmap_version(request)
+    params = sorted((k, v) for k, v in request.GET.items() if k != "format")
+    key = f"{latest}:{count}:{params}:{heatmap_format(request)}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _heatmap_last_modified(request):
+    return _heatmap_version(request)[0]
+
+
+HEATMAP_CACHE_CONTROL = cache_control(
+    private=True, max_age=getattr(settings, "HEATMAP_CACHE_MAX_AGE", 60)
+)
 
 
 @login_required
 @require_GET
+@HEATMAP_CACHE_CONTROL
+@condition(etag_func=_heatmap_etag, last_modified_func=_heatmap_last_modified)
 def heatmap_data(request):
     """
     AJAX endpoint providing heatmap data for Leaflet map visualization.
@@ -135,46 +295,106 @@ def heatmap_data(request):
     - noise: Noise level (High=30, Other=15)
     - rent: Rent level (High=30, Other=15)
     
-    Returns: JSON list with lat, lng, weight properties
+    Weights are computed and averaged per location in the database,
+    so repeated analyses of one place become a single point.
+    
+    Optional viewport parameters:
+    - bbox: "west,south,east,north" (Leaflet's toBBoxString());
+      only points inside it are returned
+    - zoom: map zoom level; points are clustered into grid cells
+      sized to the zoom, each with a 'count' of analyses
+    
+    The encoding is chosen with ?format=json|columnar|f32 or the Accept
+    header (see heatmap_response); static/js/analysis/heatmap.js decodes
+    all three.
+    
+    Responses carry an ETag and Last-Modified derived from the latest
+    aggregate update, so revalidations return 304 without querying the
+    points or serializing them.
+    
+    Returns: JSON list with lat, lng, weight properties by default
+    (400 with an error message for malformed bbox/zoom/format)
     Requires authentication (login_required).
     """
     layer = request.GET.get("layer", "ai_score")
 
     try:
-        data = []
-        reports = AnalysisResult.objects.select_related("location")
-
-        for r in reports:
-            if layer == "safety":
-                weight = r.safety_score
-            elif layer == "noise":
-                weight = 30 if r.noise_level == "High" else 15
-            elif layer == "rent":
-                weight = 30 if r.rent_level == "High" else 15
-            else:
-                weight = r.ai_score
-
-            data.append({
-                "lat": r.location.latitude,
-                "lng": r.location.longitude,
-                "weight": weight
-            })
+        bbox = parse_bbox(request.GET["bbox"]) if "bbox" in request.GET else None
+        zoom = int(request.GET["zoom"]) if "zoom" in request.GET else None
+        if zoom is not None and not 0 <= zoom <= 24:
+            raise ValueError("zoom must be between 0 and 24")
+        fmt = heatmap_format(request)
+        if fmt not in HEATMAP_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(HEATMAP_FORMATS)}")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-        logger.debug(f"Heatmap data: {len(data)} points on layer: {layer}")
-        return JsonResponse(data, safe=False)
+    try:
+        fields, rows = iter_heatmap_rows(layer, bbox=bbox, zoom=zoom)
+        # The body streams after this view returns: run the query now so
+        # database errors get the fallback below rather than a truncated 200
+        rows = iter(rows)
+        first = list(islice(rows, 1))
+        logger.debug(f"Heatmap data on layer: {layer} as {fmt}")
+        response = heatmap_response(fields, chain(first, rows), fmt)
+        patch_vary_headers(response, ["Accept"])
+        return response
     except Exception as e:
         logger.error(f"Heatmap data error: {str(e)}")
-        return JsonResponse([], safe=False)
+        response = JsonResponse([], safe=False)
+        # Don't let the validators pin an error response in browser caches
+        patch_cache_control(response, no_store=True)
+        return response
+
+
+@login_required
+@require_GET
+@HEATMAP_CACHE_CONTROL
+@condition(etag_func=_heatmap_etag, last_modified_func=_heatmap_last_modified)
+def heatmap_data_delta(request):
+    """
+    AJAX endpoint returning heatmap changes since a cursor.
+    
+    Query parameters:
+    - layer: as for heatmap_data
+    - since: cursor from the previous response (omit for a full snapshot)
+    
+    Returns: JSON with 'full', 'cursor', 'fields', 'points' (rows of
+    id, lat, lng, weight) and 'removed' (location ids). When 'full' is
+    true the client replaces its retained points instead of merging.
+    Requires authentication (login_required).
+    """
+    layer = request.GET.get("layer", "ai_score")
+
+    try:
+        since = decode_cursor(request.GET["since"]) if request.GET.get("since") else None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    delta = heatmap_delta(layer, since=since)
+    logger.debug(
+        f"Heatmap delta on layer {layer}: {len(delta['points'])} points, "
+        f"{len(delta['removed'])} removed, full={delta['full']}"
+    )
+    return JsonResponse(delta)
+
+
+def _city_suggestions_etag(request):
+    return city_suggestions_etag(request.GET.get("q", ""))
 
 
 @require_GET
+@cache_control(public=True, max_age=settings.CACHE_TIMEOUTS.get("city_suggestions", 86400))
+@condition(etag_func=_city_suggestions_etag)
 def city_suggestions(request):
     """
     AJAX endpoint for city autocomplete suggestions.
     
     Requires minimum 2 characters to reduce noise.
     Returns fuzzy-matched city names with coordinates.
-    Results are cached for 24 hours to optimize performance.
+    Results are cached for 24 hours to optimize performance, and the
+    response is public with an ETag of the normalized query so browsers
+    and proxies can reuse it.
     
     Query params:
     - q: Search query (minimum 2 chars)
@@ -192,5 +412,8 @@ def city_suggestions(request):
         return JsonResponse(results, safe=False)
     except Exception as e:
         logger.error(f"City suggestions error for '{query}': {str(e)}")
-        return JsonResponse([], safe=False)
+        response = JsonResponse([], safe=False)
+        # Don't let browsers and proxies keep the failure for a day
+        patch_cache_control(response, no_store=True)
+        return response
 
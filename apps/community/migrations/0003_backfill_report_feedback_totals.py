@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:58
+
+from django.db import migrations
+from django.db.models import Count, F, Sum
+
+
+def backfill_feedback_totals(apps, schema_editor):
+    AnalysisResult = apps.get_model('analysis', 'AnalysisResult')
+    ReportFeedback = apps.get_model('community', 'ReportFeedback')
+
+    rows = ReportFeedback.objects.order_by().values('report_id').annotate(
+        feedback_count=Count('id'),
+        feedback_rating_sum=Sum(F('accuracy') + F('usefulness') + F('clarity')),
+    )
+    for row in rows.iterator():
+        AnalysisResult.objects.filter(pk=row['report_id']).update(
+            feedback_count=row['feedback_count'],
+            feedback_rating_sum=row['feedback_rating_sum'],
+            avg_feedback_score=round(row['feedback_rating_sum'] / (row['feedback_count'] * 3), 2),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0009_analysisresult_feedback_totals'),
+        ('community', '0002_alter_reportfeedback_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_feedback_totals, migrations.RunPython.noop),
+    ]
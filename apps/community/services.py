@@ -0,0 +1,79 @@
+"""
+Feedback totals for analysis reports.
+
+Each AnalysisResult keeps a running feedback_count and
+feedback_rating_sum (accuracy + usefulness + clarity over all of its
+feedback), and avg_feedback_score is derived from them in the same
+UPDATE. New feedback is added with F() expressions, so rating a report
+costs the same however much feedback it already has and concurrent
+submissions can't overwrite each other's totals. Edits and deletions
+recompute the totals with subqueries, also in a single UPDATE.
+"""
+
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+from apps.analysis.models import AnalysisResult
+from .models import ReportFeedback
+
+RATING_FIELDS = ("accuracy", "usefulness", "clarity")
+
+# ReportFeedback fields that feed the report's totals
+SCORED_FIELDS = {"report", "report_id", *RATING_FIELDS}
+
+
+def feedback_average(rating_sum, count):
+    """
+    Expression for avg_feedback_score: the mean quality score (0-5),
+    rounded to 2 decimals, or 0 without feedback.
+    """
+    per_rating = NullIf(count * len(RATING_FIELDS), Value(0))
+    return Coalesce(
+        Round(Cast(rating_sum, FloatField()) / per_rating, 2), Value(0.0), output_field=FloatField()
+    )
+
+
+def record_feedback_added(feedback):
+    """
+    Add newly created feedback to its report's totals.
+
+    Args:
+        feedback (ReportFeedback): The saved feedback
+    """
+    rating = sum(getattr(feedback, field) for field in RATING_FIELDS)
+    # Every right-hand side sees the row as it was before the UPDATE
+    count = F("feedback_count") + 1
+    rating_sum = F("feedback_rating_sum") + rating
+    AnalysisResult.objects.filter(pk=feedback.report_id).update(
+        feedback_count=count,
+        feedback_rating_sum=rating_sum,
+        avg_feedback_score=feedback_average(rating_sum, count),
+        feedback_updated_at=timezone.now(),
+    )
+
+
+def refresh_feedback_totals(report_id):
+    """
+    Recompute a report's feedback totals from its feedback.
+
+    Used when feedback is edited or deleted, where the previous ratings
+    aren't known.
+
+    Args:
+        report_id (int): AnalysisResult primary key
+    """
+    feedback = ReportFeedback.objects.filter(report=OuterRef("pk")).order_by().values("report")
+    count = Coalesce(
+        Subquery(feedback.annotate(n=Count("pk")).values("n")), 0, output_field=IntegerField()
+    )
+    rating_sum = Coalesce(
+        Subquery(feedback.annotate(total=Sum(sum(F(field) for field in RATING_FIELDS))).values("total")),
+        0,
+        output_field=IntegerField(),
+    )
+    AnalysisResult.objects.filter(pk=report_id).update(
+        feedback_count=count,
+        feedback_rating_sum=rating_sum,
+        avg_feedback_score=feedback_average(rating_sum, count),
+        feedback_updated_at=timezone.now(),
+    )
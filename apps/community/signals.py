@@ -1,13 +1,18 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import ReportFeedback
+from .services import SCORED_FIELDS, record_feedback_added, refresh_feedback_totals
 
 @receiver(post_save, sender=ReportFeedback)
-def update_report_score(sender, instance, **kwargs):
-    report = instance.report
-    feedbacks = ReportFeedback.objects.filter(report=report)
+def update_report_score(sender, instance, created=False, update_fields=None, **kwargs):
+    # Also moves the report's feedback_updated_at, which versions cached
+    # copies of the report page
+    if created:
+        record_feedback_added(instance)
+    elif update_fields is None or SCORED_FIELDS.intersection(update_fields):
+        refresh_feedback_totals(instance.report_id)
 
-    report.avg_feedback_score = round(
-        sum(f.quality_score() for f in feedbacks) / feedbacks.count(), 2
-    )
-    report.save()
\ No newline at end of file
+
+@receiver(post_delete, sender=ReportFeedback)
+def remove_report_score(sender, instance, **kwargs):
+    refresh_feedback_totals(instance.report_id)
@@ -5,11 +5,14 @@ Tests cover:
 - Report feedback submission
 - Feedback quality scoring
 - Authorization
+- Running feedback totals on reports
 """
 
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from apps.analysis.models import Location, AnalysisResult
 from .models import ReportFeedback
 
@@ -158,3 +161,64 @@ class FeedbackViewTests(TestCase):
         url = reverse("community:feedback", args=[9999])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 404)
+
+
+class FeedbackTotalsTests(TestCase):
+    """Tests for the running feedback totals on reports."""
+
+    def setUp(self):
+        """Create a report and users to rate it."""
+        self.users = [
+            User.objects.create_user(
+                email=f"user{i}@example.com", username=f"user{i}", password="testpass123"
+            )
+            for i in range(3)
+        ]
+        location = Location.objects.create(address="Test City", latitude=0.0, longitude=0.0)
+        self.report = AnalysisResult.objects.create(
+            user=self.users[0], location=location, safety_score=7.0, noise_level="Medium",
+            rent_level="Medium", water_quality="Good", ai_summary="Test", ai_score=75
+        )
+
+    def rate(self, user, accuracy, usefulness, clarity):
+        return ReportFeedback.objects.create(
+            report=self.report, user=user, accuracy=accuracy, usefulness=usefulness, clarity=clarity
+        )
+
+    def test_new_feedback_is_one_update(self):
+        """Test adding feedback updates the totals without reading other feedback."""
+        self.rate(self.users[0], 5, 4, 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.rate(self.users[1], 2, 2, 2)
+        self.assertEqual(len(queries), 2)  # INSERT + UPDATE
+
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.feedback_count, 2)
+        self.assertEqual(self.report.feedback_rating_sum, 18)
+        self.assertEqual(self.report.avg_feedback_score, 3.0)
+        self.assertIsNotNone(self.report.feedback_updated_at)
+
+    def test_edit_and_delete_recompute(self):
+        """Test edited and deleted feedback are reflected in the totals."""
+        first = self.rate(self.users[0], 5, 5, 5)
+        second = self.rate(self.users[1], 1, 1, 2)
+        second.clarity = 1
+        second.save()
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.feedback_rating_sum, 18)
+        self.assertEqual(self.report.avg_feedback_score, 3.0)
+
+        first.delete()
+        self.report.refresh_from_db()
+        self.assertEqual((self.report.feedback_count, self.report.avg_feedback_score), (1, 1.0))
+        second.delete()
+        self.report.refresh_from_db()
+        self.assertEqual((self.report.feedback_count, self.report.avg_feedback_score), (0, 0.0))
+
+    def test_average_is_rounded(self):
+        """Test the derived average is rounded to 2 decimals."""
+        self.rate(self.users[0], 5, 4, 4)
+        self.rate(self.users[1], 3, 3, 3)
+        self.rate(self.users[2], 1, 1, 1)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.avg_feedback_score, 2.78)
@@ -8,7 +8,6 @@ improve AI accuracy and insights.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from .forms import FeedbackForm
-from .models import ReportFeedback
 from apps.analysis.models import AnalysisResult
 import logging
 
@@ -37,15 +36,9 @@ def feedback_view(request, report_id):
         feedback = form.save(commit=False)
         feedback.user = request.user
         feedback.report = report
+        # The post_save signal adds it to the report's feedback totals
         feedback.save()
         
-        # Update report's average feedback score
-        feedbacks = ReportFeedback.objects.filter(report=report)
-        if feedbacks.exists():
-            avg_score = sum(f.quality_score() for f in feedbacks) / feedbacks.count()
-            report.avg_feedback_score = avg_score
-            report.save()
-        
         logger.info(f"Feedback submitted: user={request.user.id}, report={report_id}")
         return redirect("analysis:report", report.id)
 
@@ -0,0 +1,6 @@
+"""
+Micro-benchmark suite for CitySense hot paths.
+
+Run with `python manage.py benchmark`; see apps.core.benchmarks.suite for
+the covered functions.
+"""
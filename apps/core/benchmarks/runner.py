@@ -0,0 +1,137 @@
+"""
+Benchmark timing, result files and baseline comparison.
+
+A benchmark is a name plus a context manager factory. Entering the
+context performs setup and yields the zero-argument callable to time;
+leaving it tears the setup down.
+"""
+
+from contextlib import contextmanager
+from django.db import transaction
+from statistics import median
+import json
+import platform
+import sys
+import time
+import timeit
+import django
+
+
+class Benchmark:
+    """
+    A named micro-benchmark.
+
+    Args:
+        name (str): Unique name, e.g. "heatmap.serialize[n=10000]"
+        fixture (callable): Returns a context manager yielding the callable to time
+    """
+
+    def __init__(self, name, fixture):
+        self.name = name
+        self.fixture = fixture
+
+    def run(self, repeat=5, min_time=0.2):
+        """
+        Time the benchmark.
+
+        The loop count is calibrated so one repeat takes at least
+        `min_time` seconds; the reported figures are per call.
+
+        Returns:
+            dict: median_s, min_s, loops and repeat
+        """
+        with self.fixture() as func:
+            timer = timeit.Timer(func)
+            loops = 1
+            while True:
+                elapsed = timer.timeit(loops)
+                if elapsed >= min_time or loops >= 1_000_000:
+                    break
+                loops *= 10 if elapsed < min_time / 10 else 2
+            times = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+        return {
+            "median_s": median(times),
+            "min_s": min(times),
+            "loops": loops,
+            "repeat": repeat,
+        }
+
+
+@contextmanager
+def rolled_back():
+    """Run database setup inside a transaction that is always rolled back."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def run_benchmarks(benchmarks, repeat=5, min_time=0.2, progress=None):
+    """
+    Run benchmarks and build the machine-readable result document.
+
+    Args:
+        benchmarks (list): Benchmark instances
+        progress (callable): Called with (name, result) after each benchmark
+
+    Returns:
+        dict: {"meta": {...}, "results": {name: result}}
+    """
+    results = {}
+    for bench in benchmarks:
+        results[bench.name] = bench.run(repeat=repeat, min_time=min_time)
+        if progress:
+            progress(bench.name, results[bench.name])
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "django": django.get_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(current, baseline, threshold):
+    """
+    Compare median timings against a baseline.
+
+    Args:
+        current (dict): Result document from run_benchmarks
+        baseline (dict): Previously stored result document
+        threshold (float): Allowed slowdown, e.g. 0.25 for 25%
+
+    Returns:
+        list: dicts with name, baseline_s, current_s, ratio and status
+        ("regression", "improvement", "ok" or "new")
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, result in current["results"].items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append({"name": name, "baseline_s": None, "current_s": result["median_s"],
+                         "ratio": None, "status": "new"})
+            continue
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"name": name, "baseline_s": base["median_s"], "current_s": result["median_s"],
+                     "ratio": round(ratio, 3), "status": status})
+    return rows
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_results(document, path):
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
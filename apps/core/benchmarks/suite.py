@@ -0,0 +1,216 @@
+"""
+Micro-benchmarks for CitySense hot paths.
+
+Covers city autocomplete matching, weather aggregation over recorded
+Open-Meteo payloads, AI response parsing, heatmap serialization, JSON
+encoding and cache serialization (stdlib vs apps.core.jsonlib) and
+feedback score recomputation.
+"""
+
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+import json
+import random
+
+from .runner import Benchmark, rolled_back
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+DEFAULT_HEATMAP_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_FEEDBACK_SIZES = (100, 1_000)
+
+CITY_QUERIES = ["ne", "new y", "lond", "san fran", "cairo", "tok", "rio de", "mumb"]
+
+
+@contextmanager
+def city_suggestions():
+    from apps.analysis.services import suggest_city_fuzzy
+
+    def run():
+        for query in CITY_QUERIES:
+            suggest_city_fuzzy(query)
+
+    yield run
+
+
+@contextmanager
+def weather_summary(cassette_dir):
+    from apps.ai_engine.services.cassettes import CassetteStore
+    from apps.ai_engine.services.weather import summarize_weather
+
+    payloads = [
+        (entry["response"], entry["request"]["latitude"], entry["request"]["longitude"])
+        for entry in CassetteStore(cassette_dir).entries("open_meteo")
+    ]
+    if not payloads:
+        raise ValueError(f"No recorded open_meteo payloads in {cassette_dir}")
+
+    def run():
+        for data, lat, lon in payloads:
+            summarize_weather(data, lat, lon)
+
+    yield run
+
+
+def _analysis_text():
+    return json.dumps({
+        "city_name": "Cairo",
+        "overview": "Cairo is the capital of Egypt and one of the largest cities in Africa. " * 3,
+        "historical_landmarks": ["Giza Pyramids", "Citadel of Saladin", "Khan el-Khalili"],
+        "top_attractions": ["Egyptian Museum", "Al-Azhar Park", "Cairo Tower"],
+        "cultural_notes": "A dense, lively city with a long history of trade and scholarship.",
+        "tourism_score": 88,
+        "safety_score": 6.5,
+        "noise_level": "High",
+        "rent_level": "Low",
+        "water_quality": "Average",
+        "ai_score": 71,
+        "summary": "Vibrant and affordable, but noisy and congested.",
+    })
+
+
+@contextmanager
+def ai_parse(variant):
+    from apps.ai_engine.services.parsing import parse_analysis_response
+
+    raw = _analysis_text()
+    if variant == "wrapped":
+        raw = f"Here is the analysis you asked for:\n```json\n{raw}\n```\nLet me know!"
+    elif variant == "truncated":
+        raw = raw[:-1] + ', "extra_notes": "The response was cut o'
+    yield partial(parse_analysis_response, raw)
+
+
+@contextmanager
+def heatmap_serialize(size, fmt="json"):
+    from apps.analysis.services import HEATMAP_FIELDS
+    from apps.analysis.views import heatmap_response
+
+    rng = random.Random(size)
+    rows = [
+        (rng.uniform(-60, 70), rng.uniform(-180, 180), rng.randint(0, 100))
+        for _ in range(size)
+    ]
+
+    def run():
+        # Streaming responses only encode while the body is read
+        return b"".join(heatmap_response(HEATMAP_FIELDS, rows, fmt))
+
+    yield run
+
+
+def _heatmap_points(size):
+    rng = random.Random(size)
+    return [
+        {"lat": rng.uniform(-60, 70), "lng": rng.uniform(-180, 180), "weight": rng.randint(0, 100)}
+        for _ in range(size)
+    ]
+
+
+@contextmanager
+def json_dumps(library, size):
+    from apps.core import jsonlib
+
+    points = _heatmap_points(size)
+    if library == "stdlib":
+        yield partial(json.dumps, points)
+    else:
+        yield partial(jsonlib.dumps, points)
+
+
+@contextmanager
+def cache_roundtrip(serializer_name, cassette_dir):
+    from apps.ai_engine.services.cassettes import CassetteStore
+    from apps.ai_engine.services.weather import summarize_weather
+    from apps.core.cache_backends import CompressedSerializer, JSONSerializer, PickleSerializer
+
+    serializer = {
+        "pickle": PickleSerializer, "json": JSONSerializer, "compressed": CompressedSerializer,
+    }[serializer_name]()
+    payloads = [
+        summarize_weather(entry["response"], entry["request"]["latitude"], entry["request"]["longitude"])
+        for entry in CassetteStore(cassette_dir).entries("open_meteo")
+    ]
+    payloads.append(_heatmap_points(200))
+
+    def run():
+        for payload in payloads:
+            serializer.loads(serializer.dumps(payload))
+
+    yield run
+
+
+@contextmanager
+def feedback_recompute(size):
+    from django.contrib.auth import get_user_model
+    from apps.analysis.models import Location, AnalysisResult
+    from apps.community.models import ReportFeedback
+    from apps.community.signals import update_report_score
+
+    User = get_user_model()
+    with rolled_back():
+        users = User.objects.bulk_create([
+            User(email=f"bench-feedback-{i}@citysense.local", username=f"bench-feedback-{i}")
+            for i in range(size)
+        ])
+        location = Location.objects.create(address="Benchmark City", latitude=0, longitude=0)
+        report = AnalysisResult.objects.create(
+            user=users[0], location=location, safety_score=5, noise_level="Medium",
+            rent_level="Medium", water_quality="Average", ai_summary="", ai_score=50,
+        )
+        rng = random.Random(size)
+        ReportFeedback.objects.bulk_create([
+            ReportFeedback(report=report, user=user, accuracy=rng.randint(1, 5),
+                           usefulness=rng.randint(1, 5), clarity=rng.randint(1, 5))
+            for user in users
+        ])
+        feedback = ReportFeedback.objects.filter(report=report).first()
+        yield partial(update_report_score, ReportFeedback, instance=feedback, created=True)
+
+
+def build_suite(cassette_dir=None, heatmap_sizes=DEFAULT_HEATMAP_SIZES,
+                feedback_sizes=DEFAULT_FEEDBACK_SIZES):
+    """
+    Build the list of benchmarks.
+
+    Args:
+        cassette_dir (str): Cassette store with open_meteo recordings
+            (defaults to the bundled fixtures)
+        heatmap_sizes (iterable): Point counts for heatmap serialization
+        feedback_sizes (iterable): Feedback rows per report for recomputation
+
+    Returns:
+        list: Benchmark instances
+    """
+    cassette_dir = cassette_dir or FIXTURES_DIR
+    suite = [
+        Benchmark("city_suggestions.fuzzy[8 queries]", city_suggestions),
+        Benchmark("weather.summarize[recorded]", partial(weather_summary, cassette_dir)),
+    ]
+    suite += [
+        Benchmark(f"ai.parse[{variant}]", partial(ai_parse, variant))
+        for variant in ("clean", "wrapped", "truncated")
+    ]
+    suite += [
+        Benchmark(f"heatmap.serialize[n={size}]", partial(heatmap_serialize, size))
+        for size in heatmap_sizes
+    ]
+    suite += [
+        Benchmark(f"heatmap.serialize[{fmt},n={size}]", partial(heatmap_serialize, size, fmt))
+        for fmt in ("columnar", "f32")
+        for size in heatmap_sizes
+    ]
+    suite += [
+        Benchmark(f"json.dumps[{library},n={size}]", partial(json_dumps, library, size))
+        for library in ("stdlib", "jsonlib")
+        for size in heatmap_sizes
+    ]
+    suite += [
+        Benchmark(f"cache.roundtrip[{name}]", partial(cache_roundtrip, name, cassette_dir))
+        for name in ("pickle", "json", "compressed")
+    ]
+    suite += [
+        Benchmark(f"feedback.recompute[n={size}]", partial(feedback_recompute, size))
+        for size in feedback_sizes
+    ]
+    return suite
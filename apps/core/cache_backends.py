@@ -0,0 +1,662 @@
+"""
+Cache serializers and the cache backends that use them.
+
+Serializers have the `dumps(value) -> bytes` / `loads(bytes) -> value`
+interface of Django's Redis serializer, so the same class can be set as
+OPTIONS["serializer"] for django.core.cache.backends.redis.RedisCache.
+Integers are passed through unchanged so Redis INCR keeps working.
+
+Backends:
+- SerializingLocMemCache: LocMemCache with a configurable serializer
+  (OPTIONS["SERIALIZER"], a class or dotted path) instead of pickle
+- SQLiteCache: a cache in one SQLite file, shared by every process on
+  the host, with atomic add() and incr()
+- TwoTierCache: a small in-process LRU in front of a shared cache alias
+"""
+
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache
+from django.utils.module_loading import import_string
+import itertools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from . import jsonlib
+
+logger = logging.getLogger(__name__)
+
+
+class PickleSerializer:
+    """Plain pickle, as Django's built-in backends use."""
+
+    protocol = pickle.HIGHEST_PROTOCOL
+
+    def dumps(self, obj):
+        if type(obj) is int:
+            return obj
+        return pickle.dumps(obj, self.protocol)
+
+    def loads(self, data):
+        if type(data) is int:
+            return data
+        # Redis hands integers back as their digits
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+
+class JSONSerializer(PickleSerializer):
+    """
+    JSON (via apps.core.jsonlib) with a pickle fallback.
+
+    Values made only of dicts, lists, strings, numbers, booleans and None
+    are stored as tagged JSON, which is smaller and faster to encode and
+    decode than pickle with orjson installed. Anything jsonlib's strict
+    mode refuses (datetimes, model instances, top-level tuples, non-str
+    dict keys...) is pickled so it round-trips unchanged.
+
+    Nested tuples and NaN aren't refused, which would mean walking every
+    value in Python. Instead one in CACHE_JSON_VERIFY_EVERY encodings
+    (default 50; 0 disables) is decoded and compared with the value, and
+    pickled with a warning if they differ, so code caching such values
+    shows up in the logs.
+    """
+
+    JSON_TAG = b"j"
+    PICKLE_TAG = b"p"
+
+    def __init__(self):
+        self.verify_every = getattr(settings, "CACHE_JSON_VERIFY_EVERY", 50)
+        self._encodings = itertools.count()
+
+    def dumps(self, obj):
+        if type(obj) is int:
+            return obj
+        try:
+            encoded = jsonlib.dumps(obj, default=None, strict=True)
+        except TypeError:
+            return self.PICKLE_TAG + pickle.dumps(obj, self.protocol)
+        if self.verify_every and next(self._encodings) % self.verify_every == 0:
+            if jsonlib.loads(encoded) != obj:
+                logger.warning(f"Cached {type(obj).__name__} changes as JSON (tuples or NaN?); pickling it")
+                return self.PICKLE_TAG + pickle.dumps(obj, self.protocol)
+        return self.JSON_TAG + encoded
+
+    def loads(self, data):
+        if type(data) is int:
+            return data
+        tag, payload = data[:1], memoryview(data)[1:]
+        if tag == self.JSON_TAG:
+            return jsonlib.loads(payload)
+        if tag == self.PICKLE_TAG:
+            return pickle.loads(payload)
+        return int(data)
+
+
+class CompressedSerializer(JSONSerializer):
+    """
+    JSONSerializer output, zlib-compressed when it is large enough.
+
+    Encodings of at least CACHE_COMPRESS_MIN_SIZE bytes (default 256) are
+    compressed at CACHE_COMPRESS_LEVEL (default 6) and tagged, unless
+    compression doesn't make them smaller. Smaller values are stored as
+    JSONSerializer would, so reading older entries keeps working.
+    """
+
+    ZLIB_TAG = b"z"
+
+    def __init__(self):
+        super().__init__()
+        self.min_size = getattr(settings, "CACHE_COMPRESS_MIN_SIZE", 256)
+        self.level = getattr(settings, "CACHE_COMPRESS_LEVEL", 6)
+
+    def dumps(self, obj):
+        encoded = super().dumps(obj)
+        if type(encoded) is int or len(encoded) < self.min_size:
+            return encoded
+        compressed = self.ZLIB_TAG + zlib.compress(encoded, self.level)
+        return compressed if len(compressed) < len(encoded) else encoded
+
+    def loads(self, data):
+        if type(data) is not int and data[:1] == self.ZLIB_TAG:
+            data = zlib.decompress(memoryview(data)[1:])
+        return super().loads(data)
+
+
+def get_serializer(params, default=PickleSerializer):
+    """Instantiate OPTIONS["SERIALIZER"] (a class or dotted path)."""
+    serializer = params.get("OPTIONS", {}).get("SERIALIZER", default)
+    if isinstance(serializer, str):
+        serializer = import_string(serializer)
+    return serializer()
+
+
+class SerializingLocMemCache(LocMemCache):
+    """
+    LocMemCache storing values encoded by a pluggable serializer.
+
+    OPTIONS:
+        SERIALIZER: Serializer class or dotted path (default PickleSerializer)
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.serializer = get_serializer(params)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded = self.serializer.dumps(value)
+        with self._lock:
+            if self._has_expired(key):
+                self._set(key, encoded, timeout)
+                return True
+            return False
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if self._has_expired(key):
+                self._delete(key)
+                return default
+            encoded = self._cache[key]
+            self._cache.move_to_end(key, last=False)
+        return self.serializer.loads(encoded)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded = self.serializer.dumps(value)
+        with self._lock:
+            self._set(key, encoded, timeout)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if self._has_expired(key):
+                self._delete(key)
+                raise ValueError("Key '%s' not found" % key)
+            new_value = self.serializer.loads(self._cache[key]) + delta
+            self._cache[key] = self.serializer.dumps(new_value)
+            self._cache.move_to_end(key, last=False)
+        return new_value
+
+
+# Paths whose schema has been created by this process
+_sqlite_initialized = set()
+_sqlite_init_lock = threading.Lock()
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in a single SQLite database file.
+
+    Every process opening the same LOCATION sees the same entries, so it
+    works as a shared cache for all workers on one host without running
+    a cache server. add() and incr() are atomic across processes. The
+    file uses WAL journaling so readers don't block the writer.
+
+    LOCATION: Path of the database file (created on first use)
+    OPTIONS:
+        SERIALIZER: As for SerializingLocMemCache (default CompressedSerializer)
+        MAX_ENTRIES, CULL_FREQUENCY: As for Django's built-in backends;
+            checked every CULL_EVERY writes
+    """
+
+    CULL_EVERY = 100
+    BUSY_TIMEOUT = 5
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        self.serializer = get_serializer(params, default=CompressedSerializer)
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        # Never reuse a connection inherited from a parent process (fork)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with _sqlite_init_lock:
+                if self.path not in _sqlite_initialized:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS cache_entries "
+                        "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+                    )
+                    connection.execute(
+                        "CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)"
+                    )
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+                    )
+                    _sqlite_initialized.add(self.path)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _write_transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write
+        # sequences can't interleave with other processes
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _after_write(self, connection):
+        self._writes += 1
+        if self._writes % self.CULL_EVERY == 0:
+            self._cull(connection)
+
+    def _cull(self, connection):
+        expired = connection.execute("DELETE FROM cache_entries WHERE expires <= ?", (time.time(),)).rowcount
+        self._add_stat(connection, "expired", expired)
+        count = connection.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        if count < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            evicted = connection.execute("DELETE FROM cache_entries").rowcount
+        else:
+            # Drop the entries closest to expiring; non-expiring ones last
+            evicted = connection.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count // self._cull_frequency,),
+            ).rowcount
+        self._add_stat(connection, "evictions", evicted)
+
+    @staticmethod
+    def _add_stat(connection, name, value):
+        if value:
+            connection.execute(
+                "INSERT INTO cache_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, value),
+            )
+
+    def stats(self):
+        """
+        Size and culling figures for the whole file.
+
+        Returns:
+            dict: entries and bytes of live entries, plus the number of
+                entries removed as expired and evicted to stay under
+                MAX_ENTRIES
+        """
+        connection = self._connection()
+        entries, size = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries "
+            "WHERE expires IS NULL OR expires > ?",
+            (time.time(),),
+        ).fetchone()
+        stats = {"entries": entries, "bytes": size, "max_entries": self._max_entries, "expired": 0, "evictions": 0}
+        stats.update(connection.execute("SELECT name, value FROM cache_stats"))
+        return stats
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        cursor = connection.execute(
+            "INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?",
+            (key, self.serializer.dumps(value), self.get_backend_timeout(timeout), time.time()),
+        )
+        self._after_write(connection)
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else self.serializer.loads(row[0])
+
+    def get_with_ttl(self, key, default=None, version=None):
+        """
+        Value and remaining lifetime of a key.
+
+        Returns:
+            tuple: (value or default, seconds left or None for entries
+                that don't expire)
+        """
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT value, expires FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return default, None
+        return self.serializer.loads(row[0]), None if row[1] is None else row[1] - now
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        placeholders = ",".join("?" * len(key_map))
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*key_map, time.time()),
+        )
+        return {key_map[key]: self.serializer.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)",
+            (key, self.serializer.dumps(value), self.get_backend_timeout(timeout)),
+        )
+        self._after_write(connection)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            "UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write_transaction() as connection:
+            row = connection.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            new_value = self.serializer.loads(row[0]) + delta
+            connection.execute(
+                "UPDATE cache_entries SET value = ? WHERE key = ?",
+                (self.serializer.dumps(new_value), key),
+            )
+        return new_value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries")
+        self._connection().execute("DELETE FROM cache_stats")
+
+    def close(self, **kwargs):
+        # Connections are kept per thread across requests
+        pass
+
+
+class RedisCache(DjangoRedisCache):
+    """
+    Django's Redis cache, plus get_with_ttl() so TwoTierCache can keep
+    local copies of Redis entries only as long as they live in Redis.
+    """
+
+    def get_with_ttl(self, key, default=None, version=None):
+        """As SQLiteCache.get_with_ttl, reading the value and its TTL in one round trip."""
+        key = self.make_and_validate_key(key, version=version)
+        value, ttl = self._cache.get_client(key).pipeline().get(key).pttl(key).execute()
+        if value is None:
+            return default, None
+        # PTTL is -1 for keys without an expiry
+        return self._cache._serializer.loads(value), None if ttl < 0 else ttl / 1000
+
+
+# Per-location namespace and invalidation log position last seen by this
+# process, shared by threads
+_two_tier_state = {}
+_two_tier_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    In-process LRU (L1) in front of a shared cache (L2).
+
+    Reads are served from L1 when possible and otherwise from the shared
+    cache. A value read from the shared cache is kept locally for up to
+    LOCAL_TIMEOUT seconds, and never past its expiry in the shared cache
+    when the shared cache can tell when that is (get_with_ttl; SQLiteCache
+    and RedisCache here). Entries that never expire there, such as
+    counters created by add() without a timeout and bumped by incr(), are
+    always read from the shared cache; with other shared backends,
+    integers are. get_many() doesn't copy values into L1.
+
+    Writes go to both tiers; add() and incr() are decided by the shared
+    cache so they stay atomic across processes. Entries are stored in the
+    shared cache under "<NAME>:<namespace>:<key>", so other users of the
+    shared cache keep their keys apart.
+
+    delete() and delete_many() append the deleted keys to an invalidation
+    log in the shared cache. Every process reads the entries added since
+    it last looked at most every SYNC_INTERVAL seconds and drops just
+    those keys from its L1; if it fell too far behind, or entries have
+    expired, it empties its L1 instead. clear() moves to a new namespace,
+    which empties every process's L1 and leaves the previous entries to
+    expire, without touching anything else in the shared cache.
+
+    set() doesn't invalidate: other processes may serve the value it
+    replaced from their L1 for up to LOCAL_TIMEOUT seconds. Use delete()
+    where that matters. (Logging every set() would make busy processes
+    fall behind the log and empty their L1 constantly.)
+
+    LOCATION: Name of the in-process L1 store
+    OPTIONS:
+        SHARED: Alias of the L2 cache in CACHES (default "shared")
+        NAME: Prefix of this cache's keys in the shared cache; the same
+            for every process (default "two-tier")
+        LOCAL_MAX_ENTRIES: L1 size (default 500)
+        LOCAL_TIMEOUT: Longest time a value is served from L1 (default 60)
+        SYNC_INTERVAL: Seconds between invalidation checks (default 1)
+    """
+
+    # Lifetime of an invalidation log entry; processes that didn't sync
+    # within it empty their L1
+    INVALIDATION_TIMEOUT = 300
+    # Beyond this many new log entries, emptying L1 is cheaper
+    MAX_INVALIDATIONS = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.location = location
+        self.shared_alias = options.get("SHARED", "shared")
+        self.name = options.get("NAME", "two-tier")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 60)
+        self.sync_interval = options.get("SYNC_INTERVAL", 1)
+        self.namespace_key = f"{self.name}:namespace"
+        self.log_length_key = f"{self.name}:invalidations"
+        self.local = SerializingLocMemCache(f"two-tier:{location}", {
+            "OPTIONS": {
+                "MAX_ENTRIES": options.get("LOCAL_MAX_ENTRIES", 500),
+                "SERIALIZER": JSONSerializer,
+            },
+        })
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    @property
+    def serializer(self):
+        # Values' stored form is the shared tier's
+        return getattr(self.shared, "serializer", None)
+
+    def _log_key(self, position):
+        return f"{self.name}:invalidations:{position}"
+
+    def _shared_key(self, key, namespace):
+        return f"{self.name}:{namespace}:{key}"
+
+    def _sync(self):
+        """Apply other processes' invalidations to L1; returns the current namespace."""
+        now = time.monotonic()
+        state = _two_tier_state.get(self.location)
+        if state and now - state["checked"] < self.sync_interval:
+            return state["namespace"]
+        current = self.shared.get_many([self.namespace_key, self.log_length_key])
+        namespace = current.get(self.namespace_key, 0)
+        length = current.get(self.log_length_key, 0)
+        with _two_tier_lock:
+            state = _two_tier_state.get(self.location)
+            if state and state["namespace"] != namespace:
+                self.local.clear()
+            elif state and state["length"] != length:
+                self._apply_invalidations(state["length"], length)
+            _two_tier_state[self.location] = {"namespace": namespace, "length": length, "checked": now}
+        return namespace
+
+    def _apply_invalidations(self, seen, length):
+        if not 0 < length - seen <= self.MAX_INVALIDATIONS:
+            self.local.clear()
+            return
+        entries = self.shared.get_many([self._log_key(i) for i in range(seen + 1, length + 1)])
+        if len(entries) < length - seen:
+            # Expired, evicted or not written yet
+            self.local.clear()
+            return
+        for keys, version in entries.values():
+            for key in keys:
+                self.local.delete(key, version)
+
+    def _shared_incr(self, key):
+        try:
+            return self.shared.incr(key)
+        except ValueError:
+            if self.shared.add(key, 1, None):
+                return 1
+            return self.shared.incr(key)
+
+    def _invalidate(self, keys, version):
+        position = self._shared_incr(self.log_length_key)
+        self.shared.set(self._log_key(position), [list(keys), version], self.INVALIDATION_TIMEOUT)
+
+    def stats(self):
+        """Size of this process's local tier and the shared tier's stats, if it has any."""
+        shared_stats = getattr(self.shared, "stats", None)
+        return {
+            "local": {"entries": len(self.local._cache), "max_entries": self.local._max_entries},
+            "shared": shared_stats() if shared_stats else None,
+        }
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self._sync()
+        added = self.shared.add(self._shared_key(key, namespace), value, timeout, version)
+        # Keys added without a timeout are counters or markers other
+        # processes change: keep them out of L1
+        if added and timeout is not None:
+            self.local.set(key, value, self._local_timeout(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        namespace = self._sync()
+        missing = object()
+        value = self.local.get(key, missing, version)
+        if value is not missing:
+            return value
+        shared_key = self._shared_key(key, namespace)
+        get_with_ttl = getattr(self.shared, "get_with_ttl", None)
+        if get_with_ttl is None:
+            value = self.shared.get(shared_key, missing, version)
+            if value is missing:
+                return default
+            # Expiry unknown: keep anything but counters for LOCAL_TIMEOUT
+            if not isinstance(value, int):
+                self.local.set(key, value, self.local_timeout, version)
+            return value
+        value, ttl = get_with_ttl(shared_key, missing, version)
+        if value is missing:
+            return default
+        if ttl is not None and ttl >= 1:
+            self.local.set(key, value, min(int(ttl), self.local_timeout), version)
+        return value
+
+    def get_many(self, keys, version=None):
+        namespace = self._sync()
+        found = self.local.get_many(keys, version)
+        rest = {self._shared_key(key, namespace): key for key in keys if key not in found}
+        if rest:
+            stored = self.shared.get_many(list(rest), version)
+            found.update((rest[shared_key], value) for shared_key, value in stored.items())
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self._sync()
+        self.shared.set(self._shared_key(key, namespace), value, timeout, version)
+        self.local.set(key, value, self._local_timeout(timeout), version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(self._shared_key(key, self._sync()), timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        namespace = self._sync()
+        # Counters are only read from the shared tier
+        self.local.delete(key, version)
+        return self.shared.incr(self._shared_key(key, namespace), delta, version)
+
+    def has_key(self, key, version=None):
+        namespace = self._sync()
+        if self.local.has_key(key, version):
+            return True
+        return self.shared.has_key(self._shared_key(key, namespace), version)
+
+    def delete(self, key, version=None):
+        namespace = self._sync()
+        self.local.delete(key, version)
+        deleted = self.shared.delete(self._shared_key(key, namespace), version)
+        self._invalidate([key], version)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return
+        namespace = self._sync()
+        for key in keys:
+            self.local.delete(key, version)
+        self.shared.delete_many([self._shared_key(key, namespace) for key in keys], version)
+        self._invalidate(keys, version)
+
+    def clear(self):
+        namespace = self._shared_incr(self.namespace_key)
+        with _two_tier_lock:
+            self.local.clear()
+            state = _two_tier_state.get(self.location)
+            if state:
+                state["namespace"] = namespace
@@ -0,0 +1,129 @@
+"""
+Fast JSON encoding with a standard library fallback.
+
+Uses orjson when it is installed and the stdlib json module otherwise.
+Both produce compact UTF-8 bytes (no spaces after separators) and write
+NaN and Infinity as null, so output doesn't depend on which library is
+present.
+
+Use `dumps`/`loads` for API payloads and `JsonResponse` in place of
+Django's for views. The cache serializers in apps.core.cache_backends
+use `dumps(..., strict=True)`, which refuses the values it can spot
+without walking the whole value, and check a sample of the rest by
+decoding them.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+import json
+import math
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# datetime/dataclass values are handed to `default` so they're encoded
+# the same way (DjangoJSONEncoder) whichever library is in use
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson else 0
+)
+# Strict mode leaves non-str keys to raise instead of stringifying them
+_ORJSON_STRICT_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS
+    if orjson else 0
+)
+
+_PLAIN_TYPES = (dict, list, str, int, float, bool, type(None))
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def backend():
+    """Name of the JSON library in use: "orjson" or "json"."""
+    return "orjson" if orjson is not None else "json"
+
+
+def django_default(obj):
+    """`default` hook encoding dates, decimals, UUIDs and lazy strings like Django."""
+    return _django_encoder.default(obj)
+
+
+def dumps(obj, default=django_default, strict=False):
+    """
+    Serialize to compact JSON bytes.
+
+    Args:
+        obj: Value to encode
+        default (callable): Hook for types JSON can't represent (None to
+            raise TypeError instead)
+        strict (bool): Also refuse values that wouldn't decode back the
+            same and are cheap to spot: a top-level value that isn't a
+            dict, list, str, number, bool or None (such as a tuple) or is
+            NaN/Infinity; with orjson, non-str dict keys and subclasses of
+            the JSON types anywhere; without it, NaN/Infinity anywhere.
+            Nested tuples are encoded as lists and, with orjson, nested
+            NaN as null.
+
+    Raises:
+        TypeError: If a value can't be encoded
+    """
+    if strict and (type(obj) not in _PLAIN_TYPES or type(obj) is float and not math.isfinite(obj)):
+        raise TypeError(f"Not JSON round-trippable: {type(obj).__name__} {obj!r:.40}")
+    if orjson is not None:
+        options = _ORJSON_STRICT_OPTIONS if strict else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=default, option=options)
+    try:
+        return _stdlib_dumps(obj, default)
+    except ValueError as e:
+        if "float" not in str(e):
+            raise
+        if strict:
+            raise TypeError("Non-finite float is not JSON round-trippable") from None
+        # Write NaN and Infinity as null, as orjson does
+        return _stdlib_dumps(_finite(obj), default)
+
+
+def loads(data):
+    """Deserialize JSON from bytes, bytearray, memoryview or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj, default):
+    return json.dumps(
+        obj, default=default, separators=(",", ":"), ensure_ascii=False, allow_nan=False
+    ).encode()
+
+
+def _finite(obj):
+    # Only called for values that contain NaN or Infinity
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+class JsonResponse(HttpResponse):
+    """
+    Drop-in replacement for django.http.JsonResponse using `dumps`.
+
+    Args:
+        data: Value to encode; must be a dict unless safe=False
+        safe (bool): Only allow dict payloads
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
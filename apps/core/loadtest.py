@@ -0,0 +1,266 @@
+"""
+End-to-end load-test harness for the analysis pipeline.
+
+Virtual users log in and then repeatedly:
+- type a city name into the autocomplete (one `city_suggestions` request
+  per keystroke from the second character on)
+- submit it to `analyze_view` and open the resulting `report_view`
+- load `heatmap_data` and `dashboard_view`
+
+Each request is timed per endpoint. Upstream APIs are expected to be
+stubbed, either by the in-process server started by `serve_in_process()`
+or by running the target with MOCK_UPSTREAMS_URL set.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.contrib.auth import get_user_model
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.urls import reverse
+from urllib.parse import urljoin
+import random
+import threading
+import time
+import requests
+import logging
+
+from .perf import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = ("login", "city_suggestions", "analyze", "report", "heatmap", "dashboard")
+HEATMAP_LAYERS = ("ai_score", "safety", "noise", "rent")
+DEFAULT_PASSWORD = "loadtest-pass-123"
+
+
+def load_test_cities(count=200, seed=None):
+    """Pick city names to type and analyze (ASCII, 4-20 characters)."""
+    from apps.analysis.services import ALL_CITIES
+
+    names = sorted({
+        c["name"] for c in ALL_CITIES
+        if c["name"].isascii() and 4 <= len(c["name"]) <= 20
+    })
+    return random.Random(seed).sample(names, min(count, len(names)))
+
+
+def ensure_load_test_users(count, password=DEFAULT_PASSWORD):
+    """
+    Create (or reuse) accounts for the virtual users.
+
+    Returns:
+        list: (email, password) tuples
+    """
+    User = get_user_model()
+    credentials = []
+    for i in range(count):
+        email = f"loadtest{i}@citysense.local"
+        user, created = User.objects.get_or_create(
+            email=email, defaults={"username": f"loadtest{i}"}
+        )
+        if created or not user.check_password(password):
+            user.set_password(password)
+            user.save()
+        credentials.append((email, password))
+    return credentials
+
+
+class VirtualUser:
+    """
+    One simulated browser session.
+
+    Args:
+        base_url (str): Server root, e.g. http://127.0.0.1:8000
+        email (str), password (str): Login credentials
+        recorder (LatencyRecorder): Shared timing collector
+        cities (list): City names to type and analyze
+        skip (set): Endpoint names to leave out of the scenario
+        think_time (float): Pause between steps in seconds
+        rng (random.Random): Source of randomness for this user
+    """
+
+    def __init__(self, base_url, email, password, recorder, cities,
+                 skip=(), think_time=0, rng=None):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.email = email
+        self.password = password
+        self.recorder = recorder
+        self.cities = cities
+        self.skip = set(skip)
+        self.think_time = think_time
+        self.rng = rng or random.Random()
+        self.session = requests.Session()
+
+    def _request(self, endpoint, method, path, expected=(200,), **kwargs):
+        kwargs.setdefault("timeout", 60)
+        kwargs.setdefault("allow_redirects", False)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, urljoin(self.base_url, path.lstrip("/")), **kwargs)
+        except requests.RequestException as e:
+            self.recorder.record(endpoint, time.perf_counter() - start, ok=False)
+            logger.debug(f"{endpoint} request failed: {e}")
+            return None
+        self.recorder.record(
+            endpoint,
+            time.perf_counter() - start,
+            ok=response.status_code in expected,
+            status=response.status_code,
+        )
+        return response
+
+    def _pause(self):
+        if self.think_time:
+            time.sleep(self.think_time)
+
+    def _csrf_post(self, endpoint, path, data, expected):
+        token = self.session.cookies.get("csrftoken", "")
+        return self._request(
+            endpoint, "POST", path, expected=expected,
+            data={**data, "csrfmiddlewaretoken": token},
+            headers={"Referer": urljoin(self.base_url, path.lstrip("/"))},
+        )
+
+    def login(self):
+        """Log in through the regular form. Returns True on success."""
+        path = reverse("users:login")
+        # Untimed GET to obtain the CSRF cookie
+        self.session.get(urljoin(self.base_url, path.lstrip("/")), timeout=60)
+        response = self._csrf_post(
+            "login", path, {"username": self.email, "password": self.password}, expected=(302,)
+        )
+        return response is not None and response.status_code == 302
+
+    def type_city(self, name):
+        path = reverse("analysis:city_suggestions")
+        for i in range(2, len(name) + 1):
+            self._request("city_suggestions", "GET", path, params={"q": name[:i]})
+
+    def analyze(self, address):
+        """Submit an analysis. Returns the report URL, or None on failure."""
+        path = reverse("analysis:analyze")
+        if "csrftoken" not in self.session.cookies:
+            self.session.get(urljoin(self.base_url, path.lstrip("/")), timeout=60)
+        response = self._csrf_post("analyze", path, {"address": address}, expected=(302,))
+        if response is not None and response.status_code == 302:
+            return response.headers.get("Location")
+        return None
+
+    def run_iteration(self):
+        city = self.rng.choice(self.cities)
+
+        if "city_suggestions" not in self.skip:
+            self.type_city(city)
+            self._pause()
+
+        report_url = None
+        if "analyze" not in self.skip:
+            report_url = self.analyze(city)
+            self._pause()
+
+        if report_url and "report" not in self.skip:
+            self._request("report", "GET", report_url)
+            self._pause()
+
+        if "heatmap" not in self.skip:
+            self._request(
+                "heatmap", "GET", reverse("analysis:heatmap-data"),
+                params={"layer": self.rng.choice(HEATMAP_LAYERS)},
+            )
+            self._pause()
+
+        if "dashboard" not in self.skip:
+            self._request("dashboard", "GET", reverse("dashboard:dashboard"))
+            self._pause()
+
+
+def run_load_test(base_url, credentials, concurrency=4, duration=30, iterations=None,
+                  think_time=0, skip=(), seed=None, cities=None):
+    """
+    Drive the scenario with `concurrency` parallel virtual users.
+
+    Args:
+        base_url (str): Server root URL
+        credentials (list): (email, password) pairs, reused round-robin
+        concurrency (int): Number of parallel virtual users
+        duration (float): Seconds to run (ignored if iterations is set)
+        iterations (int): Scenario iterations per virtual user
+        think_time (float): Pause between steps in seconds
+        skip (iterable): Endpoint names to leave out
+        seed (int): Seed for city and layer choices
+
+    Returns:
+        LatencyRecorder: Collected timings (already stopped)
+    """
+    recorder = LatencyRecorder()
+    cities = cities or load_test_cities(seed=seed)
+    deadline = None if iterations else time.monotonic() + duration
+
+    def worker(index):
+        email, password = credentials[index % len(credentials)]
+        user = VirtualUser(
+            base_url, email, password, recorder, cities,
+            skip=skip, think_time=think_time,
+            rng=random.Random(None if seed is None else seed + index),
+        )
+        if not user.login():
+            logger.error(f"Virtual user {index} could not log in as {email}")
+            return
+        done = 0
+        while (iterations and done < iterations) or (deadline and time.monotonic() < deadline):
+            user.run_iteration()
+            done += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(concurrency)]:
+            future.result()
+
+    recorder.stop()
+    return recorder
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_in_process(upstream_latency_ms=0):
+    """
+    Run the app and mock upstreams in background threads.
+
+    Session and CSRF cookies are allowed over plain HTTP for the duration,
+    and the Groq client is rebuilt so it points at the mock server.
+
+    Yields:
+        str: Base URL of the app server
+    """
+    from apps.ai_engine.mock_upstreams import start_mock_upstreams, UpstreamBehaviour, UPSTREAMS
+    from apps.ai_engine.services import groq_service
+
+    mocks = start_mock_upstreams(behaviours={
+        name: UpstreamBehaviour(latency_ms=upstream_latency_ms) for name in UPSTREAMS
+    })
+    overrides = override_settings(
+        MOCK_UPSTREAMS_URL=mocks.url,
+        SESSION_COOKIE_SECURE=False,
+        CSRF_COOKIE_SECURE=False,
+    )
+    overrides.enable()
+    groq_service._client = None
+
+    server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietRequestHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        mocks.shutdown()
+        mocks.server_close()
+        overrides.disable()
+        groq_service._client = None
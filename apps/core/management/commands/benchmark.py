@@ -0,0 +1,119 @@
+"""
+Run the micro-benchmark suite and compare it against a stored baseline.
+
+Examples:
+    python manage.py benchmark
+    python manage.py benchmark --only heatmap --threshold 0.1
+    python manage.py benchmark --save-baseline
+
+Results are written as JSON to --output. The command fails if any
+benchmark is slower than the baseline by more than --threshold.
+Database benchmarks run inside a transaction that is rolled back.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.benchmarks.runner import (
+    compare_to_baseline,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+from apps.core.benchmarks.suite import (
+    DEFAULT_FEEDBACK_SIZES,
+    DEFAULT_HEATMAP_SIZES,
+    build_suite,
+)
+from pathlib import Path
+import logging
+import os
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / "benchmarks" / "baseline.json"
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+class Command(BaseCommand):
+    help = "Run micro-benchmarks for hot functions and check for regressions against a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", action="append", default=[],
+                            help="Run benchmarks whose name contains this text (repeatable)")
+        parser.add_argument("--output", default="benchmark-results.json",
+                            help="Where to write the results JSON")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE),
+                            help="Baseline results JSON to compare against")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Allowed slowdown before failing (0.25 = 25%%)")
+        parser.add_argument("--save-baseline", action="store_true",
+                            help="Store these results as the new baseline")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--min-time", type=float, default=0.2,
+                            help="Minimum seconds per repeat when calibrating loops")
+        parser.add_argument("--cassettes", help="Cassette store with recorded open_meteo payloads")
+        parser.add_argument("--heatmap-sizes", type=int_list,
+                            default=list(DEFAULT_HEATMAP_SIZES))
+        parser.add_argument("--feedback-sizes", type=int_list,
+                            default=list(DEFAULT_FEEDBACK_SIZES))
+
+    def handle(self, *args, **options):
+        suite = build_suite(
+            cassette_dir=options["cassettes"],
+            heatmap_sizes=options["heatmap_sizes"],
+            feedback_sizes=options["feedback_sizes"],
+        )
+        if options["only"]:
+            suite = [b for b in suite if any(text in b.name for text in options["only"])]
+        if not suite:
+            raise CommandError("No benchmarks selected.")
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name:<40} {result['median_s'] * 1000:>12.4f} ms "
+                f"(min {result['min_s'] * 1000:.4f} ms, {result['loops']} loops)"
+            )
+
+        # Keep log output (and its cost) out of the measurements
+        logging.disable(logging.WARNING)
+        try:
+            document = run_benchmarks(
+                suite, repeat=options["repeat"], min_time=options["min_time"], progress=progress
+            )
+        finally:
+            logging.disable(logging.NOTSET)
+        save_results(document, options["output"])
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if options["save_baseline"]:
+            baseline = {"meta": document["meta"], "results": {}}
+            if os.path.exists(options["baseline"]):
+                baseline["results"] = load_results(options["baseline"]).get("results", {})
+            baseline["results"].update(document["results"])
+            save_results(baseline, options["baseline"])
+            self.stdout.write(self.style.SUCCESS(f"Baseline updated: {options['baseline']}"))
+            return
+
+        if not os.path.exists(options["baseline"]):
+            self.stdout.write(self.style.WARNING("No baseline found; run with --save-baseline to create one."))
+            return
+
+        rows = compare_to_baseline(document, load_results(options["baseline"]), options["threshold"])
+        self.stdout.write("")
+        self.stdout.write(f"{'benchmark':<40} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}  status")
+        for row in rows:
+            base = f"{row['baseline_s'] * 1000:.4f}" if row["baseline_s"] is not None else "-"
+            ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+            line = f"{row['name']:<40} {base:>12} {row['current_s'] * 1000:>12.4f} {ratio:>7}  {row['status']}"
+            if row["status"] == "regression":
+                line = self.style.ERROR(line)
+            elif row["status"] == "improvement":
+                line = self.style.SUCCESS(line)
+            self.stdout.write(line)
+
+        regressions = [row["name"] for row in rows if row["status"] == "regression"]
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) slower than baseline by more than "
+                f"{options['threshold']:.0%}: {', '.join(regressions)}"
+            )
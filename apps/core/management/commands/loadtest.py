@@ -0,0 +1,107 @@
+"""
+Load-test the analysis pipeline and report per-endpoint throughput.
+
+Examples:
+    # Self-contained: app server and mock upstreams run inside this process
+    python manage.py loadtest --concurrency 8 --duration 30
+
+    # Against a running server started with MOCK_UPSTREAMS_URL set
+    python manage.py loadtest --url http://127.0.0.1:8000 --concurrency 16
+
+Virtual user accounts are created in the configured database, and each
+analysis creates real AnalysisResult rows, so point this at a disposable
+database.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.loadtest import (
+    ENDPOINTS,
+    DEFAULT_PASSWORD,
+    ensure_load_test_users,
+    run_load_test,
+    serve_in_process,
+)
+from contextlib import nullcontext
+import json
+
+
+class Command(BaseCommand):
+    help = "Drive login, autocomplete, analysis, report, heatmap and dashboard traffic and report latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Target server; omit to serve the app in-process")
+        parser.add_argument("--concurrency", type=int, default=4, help="Parallel virtual users")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+        parser.add_argument("--iterations", type=int, help="Scenario iterations per virtual user (overrides --duration)")
+        parser.add_argument("--users", type=int, help="Distinct accounts to use (default: --concurrency)")
+        parser.add_argument("--email", help="Use this existing account for every virtual user")
+        parser.add_argument("--password", default=DEFAULT_PASSWORD)
+        parser.add_argument("--think-time", type=float, default=0, help="Pause between steps in milliseconds")
+        parser.add_argument("--upstream-latency", type=float, default=0,
+                            help="Mock upstream latency in milliseconds (in-process mode)")
+        parser.add_argument("--skip", action="append", choices=ENDPOINTS[1:], default=[],
+                            help="Leave an endpoint out of the scenario (repeatable)")
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        if options["email"]:
+            credentials = [(options["email"], options["password"])]
+        else:
+            credentials = ensure_load_test_users(
+                options["users"] or options["concurrency"], options["password"]
+            )
+
+        server = (
+            nullcontext(options["url"]) if options["url"]
+            else serve_in_process(options["upstream_latency"])
+        )
+        with server as base_url:
+            self.stdout.write(
+                f"Load testing {base_url} with {options['concurrency']} virtual users "
+                + (f"for {options['iterations']} iterations each"
+                   if options["iterations"] else f"for {options['duration']:g}s")
+            )
+            recorder = run_load_test(
+                base_url,
+                credentials,
+                concurrency=options["concurrency"],
+                duration=options["duration"],
+                iterations=options["iterations"],
+                think_time=options["think_time"] / 1000,
+                skip=options["skip"],
+                seed=options["seed"],
+            )
+
+        results = recorder.report()
+        self.print_table(results, recorder.elapsed)
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump({
+                    "target": options["url"] or "in-process",
+                    "concurrency": options["concurrency"],
+                    "elapsed_s": round(recorder.elapsed, 3),
+                    "endpoints": results,
+                }, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+
+        if not results:
+            raise CommandError("No requests completed; check that the virtual users can log in.")
+
+    def print_table(self, results, elapsed):
+        header = f"{'endpoint':<18}{'reqs':>8}{'req/s':>9}{'err%':>7}{'p50ms':>9}{'p90ms':>9}{'p99ms':>9}{'maxms':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        total = 0
+        for endpoint, r in results.items():
+            total += r["requests"]
+            self.stdout.write(
+                f"{endpoint:<18}{r['requests']:>8}{r['rps']:>9.1f}{r['error_rate'] * 100:>7.1f}"
+                f"{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}"
+            )
+        self.stdout.write("-" * len(header))
+        self.stdout.write(f"{'total':<18}{total:>8}{total / (elapsed or 1e-9):>9.1f}  in {elapsed:.1f}s")
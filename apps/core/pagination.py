@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination for newest-first lists.
+
+Pages are selected with `(created_at, id) < cursor` instead of
+OFFSET, so every page costs one index range scan whatever its depth,
+and no COUNT query is needed. The cursor is the (timestamp, id) of the
+last row shown, which also keeps pages stable while rows are added.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def encode_keyset_cursor(moment, pk):
+    """Encode a row's (timestamp, id) as an opaque cursor string."""
+    return f"{int(moment.timestamp() * 1_000_000)}-{pk}"
+
+
+def decode_keyset_cursor(value):
+    """
+    Decode a cursor produced by encode_keyset_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        micros, pk = value.split("-", 1)
+        return datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc), int(pk)
+    except (AttributeError, OverflowError, OSError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset.
+
+    Iterable and indexable like the list of its rows.
+
+    Attributes:
+        items (list): Rows on this page
+        cursor (str): Cursor this page started after (None for the first)
+        next_cursor (str): Cursor for the following page, None on the last
+    """
+
+    def __init__(self, items, cursor, next_cursor):
+        self.items = items
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+
+def keyset_paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, field="created_at"):
+    """
+    Newest-first page of `queryset` after `cursor`.
+
+    Orders by (field, pk) descending, so the index used for the query
+    should lead with `field` (after any equality filters).
+
+    Args:
+        queryset (QuerySet): Rows to paginate
+        cursor (str): next_cursor of the previous page, or None
+        page_size (int): Rows per page
+        field (str): Timestamp field to order by
+
+    Returns:
+        KeysetPage: The page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    queryset = queryset.order_by(f"-{field}", "-pk")
+    if cursor:
+        moment, pk = decode_keyset_cursor(cursor)
+        # (field, pk) < (moment, pk) written as a range the index can seek
+        # to, rather than an OR of two conditions
+        queryset = queryset.filter(**{f"{field}__lte": moment}).exclude(**{field: moment, "pk__gte": pk})
+
+    # One extra row tells whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    items = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = items[-1]
+        next_cursor = encode_keyset_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items, cursor, next_cursor)
@@ -0,0 +1,101 @@
+"""
+Timing statistics shared by the load-test and benchmark tools.
+"""
+
+from collections import defaultdict
+from statistics import mean
+import math
+import threading
+import time
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values (list): Values in ascending order
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize_latencies(latencies):
+    """
+    Summarize a list of durations in seconds.
+
+    Returns:
+        dict: count, mean, min, max, p50, p90, p95 and p99 in milliseconds
+    """
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    ms = lambda x: round(x * 1000, 3)
+    return {
+        "count": len(values),
+        "mean_ms": ms(mean(values)),
+        "min_ms": ms(values[0]),
+        "p50_ms": ms(percentile(values, 50)),
+        "p90_ms": ms(percentile(values, 90)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]),
+    }
+
+
+class LatencyRecorder:
+    """
+    Thread-safe collector of per-endpoint request timings and errors.
+    """
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def record(self, endpoint, seconds, ok=True, status=None):
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+            if not ok:
+                self._errors[endpoint] += 1
+            self._statuses[endpoint][status if status is not None else "error"] += 1
+
+    def stop(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def report(self):
+        """
+        Build the per-endpoint summary.
+
+        Returns:
+            dict: endpoint -> latency summary plus requests, errors,
+            error_rate, rps and status code counts
+        """
+        elapsed = self.elapsed or 1e-9
+        with self._lock:
+            endpoints = {}
+            for endpoint, latencies in sorted(self._latencies.items()):
+                summary = summarize_latencies(latencies)
+                errors = self._errors[endpoint]
+                summary.update({
+                    "requests": len(latencies),
+                    "errors": errors,
+                    "error_rate": round(errors / len(latencies), 4),
+                    "rps": round(len(latencies) / elapsed, 2),
+                    "statuses": {str(k): v for k, v in self._statuses[endpoint].items()},
+                })
+                endpoints[endpoint] = summary
+        return endpoints
@@ -0,0 +1,127 @@
+"""
+Streaming HTTP responses for large result sets.
+
+The body is produced chunk by chunk while the client reads it, so peak
+memory depends on the chunk size rather than on the number of rows.
+Pair these with `QuerySet.iterator(chunk_size=...)`, which uses
+server-side cursors on PostgreSQL.
+
+Streams can be gzip-compressed as they are produced (gzip_stream), for
+clients sending `Accept-Encoding: gzip`.
+"""
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from itertools import islice
+import csv
+import io
+import re
+
+from . import jsonlib
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def chunked(iterable, size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of up to `size` items from an iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_json_array(items, default=jsonlib.django_default, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode an iterable as a JSON array, one chunk of items at a time.
+
+    Produces the same bytes as jsonlib.dumps(list(items), default=default).
+
+    Yields:
+        bytes: Pieces of the JSON document
+    """
+    yield b"["
+    separator = b""
+    for chunk in chunked(items, chunk_size):
+        # Encode the chunk as a list and drop its brackets
+        yield separator + jsonlib.dumps(chunk, default=default)[1:-1]
+        separator = b","
+    yield b"]"
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    """
+    A JSON array response streamed from an iterable.
+
+    Args:
+        items (iterable): JSON-serializable items, consumed lazily
+        default (callable): Hook for non-JSON types (see jsonlib.dumps)
+        chunk_size (int): Items encoded per chunk
+    """
+
+    def __init__(self, items, default=jsonlib.django_default, chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(iter_json_array(items, default, chunk_size), **kwargs)
+
+
+def iter_csv(header, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode rows as UTF-8 CSV, one chunk of rows at a time.
+
+    Args:
+        header (sequence): Column names, written first
+        rows (iterable): Sequences of cell values, consumed lazily
+        chunk_size (int): Rows encoded per chunk
+
+    Yields:
+        bytes: Pieces of the CSV document
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for chunk in chunked(rows, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue().encode()
+
+
+def iter_jsonl(items, default=jsonlib.django_default, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode items as JSON Lines (one JSON document per line).
+
+    Yields:
+        bytes: Groups of up to `chunk_size` lines
+    """
+    for chunk in chunked(items, chunk_size):
+        yield b"".join(jsonlib.dumps(item, default=default) + b"\n" for item in chunk)
+
+
+_GZIP_RE = re.compile(r"\bgzip\b")
+
+
+def accepts_gzip(request):
+    """Whether the request's Accept-Encoding allows a gzip-encoded body."""
+    return bool(_GZIP_RE.search(request.headers.get("Accept-Encoding", "")))
+
+
+def gzip_stream(response):
+    """
+    Compress a streaming response's body on the fly.
+
+    Sets Content-Encoding and Vary like django.middleware.gzip does, but
+    compresses in the view so it doesn't depend on that middleware.
+
+    Args:
+        response (StreamingHttpResponse): Response to compress
+
+    Returns:
+        StreamingHttpResponse: The same response
+    """
+    response.streaming_content = compress_sequence(response.streaming_content)
+    response["Content-Encoding"] = "gzip"
+    del response["Content-Length"]
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
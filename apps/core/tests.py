@@ -5,10 +5,38 @@ Tests cover:
 - Home page view
 - Public access without authentication
 - Template rendering
+- Load-test timing statistics and harness
+- Benchmark runner and baseline comparison
+- Streaming JSON responses
+- JSON encoding layer and cache serializers
+- Shared SQLite cache and the two-tier cache
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, LiveServerTestCase, override_settings
 from django.urls import reverse
+from apps.core.perf import percentile, LatencyRecorder
+from apps.core.loadtest import ensure_load_test_users, run_load_test
+from apps.core.benchmarks.runner import Benchmark, compare_to_baseline
+from apps.core.benchmarks.suite import build_suite
+from apps.core.responses import StreamingJsonResponse, iter_json_array, iter_csv, iter_jsonl, gzip_stream
+from django.http import StreamingHttpResponse
+import gzip
+from apps.core import jsonlib
+from apps.core.cache_backends import (
+    CompressedSerializer, JSONSerializer, RedisCache, SerializingLocMemCache, SQLiteCache, TwoTierCache,
+)
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.safestring import SafeString
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import Mock, patch
+from contextlib import contextmanager
+import os
+import tempfile
+import time
+from apps.ai_engine.mock_upstreams import start_mock_upstreams
+from apps.ai_engine.services import groq_service
 
 
 class HomeViewTests(TestCase):
@@ -40,3 +68,428 @@ class HomeViewTests(TestCase):
         response = self.client.get(self.home_url)
         self.assertContains(response, "Welcome to CitySense")
 
+
+class PerfStatsTests(TestCase):
+    """Tests for latency statistics."""
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_recorder_report(self):
+        """Test per-endpoint counts and error rates."""
+        recorder = LatencyRecorder()
+        recorder.record("heatmap", 0.010, status=200)
+        recorder.record("heatmap", 0.030, ok=False, status=500)
+        recorder.stop()
+
+        report = recorder.report()["heatmap"]
+
+        self.assertEqual(report["requests"], 2)
+        self.assertEqual(report["errors"], 1)
+        self.assertEqual(report["error_rate"], 0.5)
+        self.assertEqual(report["statuses"], {"200": 1, "500": 1})
+
+
+class BenchmarkTests(TestCase):
+    """Tests for the micro-benchmark runner."""
+
+    def test_benchmark_run_reports_per_call_time(self):
+        """Test a benchmark runs its fixture and reports timings."""
+        calls = []
+
+        @contextmanager
+        def fixture():
+            yield lambda: calls.append(1)
+
+        result = Benchmark("noop", fixture).run(repeat=2, min_time=0.001)
+
+        self.assertEqual(result["repeat"], 2)
+        self.assertGreater(len(calls), result["loops"])
+        self.assertLessEqual(result["min_s"], result["median_s"])
+
+    def test_compare_to_baseline(self):
+        """Test regressions, improvements and new benchmarks are flagged."""
+        baseline = {"results": {
+            "a": {"median_s": 1.0}, "b": {"median_s": 1.0}, "c": {"median_s": 1.0},
+        }}
+        current = {"results": {
+            "a": {"median_s": 1.5}, "b": {"median_s": 0.5}, "c": {"median_s": 1.1},
+            "d": {"median_s": 1.0},
+        }}
+
+        statuses = {
+            row["name"]: row["status"]
+            for row in compare_to_baseline(current, baseline, threshold=0.25)
+        }
+
+        self.assertEqual(statuses, {"a": "regression", "b": "improvement", "c": "ok", "d": "new"})
+
+    def test_suite_benchmarks_run(self):
+        """Test every suite benchmark runs at small sizes."""
+        suite = build_suite(heatmap_sizes=[10], feedback_sizes=[3])
+        suite = [b for b in suite if not b.name.startswith("city_suggestions")]
+
+        for bench in suite:
+            with self.subTest(bench.name):
+                self.assertGreater(bench.run(repeat=1, min_time=0)["loops"], 0)
+
+
+class StreamingResponseTests(TestCase):
+    """Tests for chunked JSON streaming."""
+
+    def test_json_array_matches_stdlib(self):
+        """Test chunked output equals encoding the whole list at once."""
+        items = [{"lat": i / 3, "name": f"p{i}"} for i in range(7)]
+        for chunk_size in (1, 3, 7, 100):
+            with self.subTest(chunk_size=chunk_size):
+                body = b"".join(iter_json_array(iter(items), chunk_size=chunk_size))
+                self.assertEqual(body, jsonlib.dumps(items))
+        self.assertEqual(b"".join(iter_json_array([])), b"[]")
+
+    def test_items_are_consumed_lazily(self):
+        """Test the iterable is only read as the body is streamed."""
+        consumed = []
+
+        def items():
+            for i in range(5):
+                consumed.append(i)
+                yield i
+
+        response = StreamingJsonResponse(items(), chunk_size=2)
+        self.assertEqual(consumed, [])
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        next(chunks)
+        self.assertEqual(consumed, [0, 1])
+        self.assertEqual(b"".join(chunks), b",2,3,4]")
+
+    def test_csv_and_jsonl_streams(self):
+        """Test CSV and JSON Lines encoders produce complete documents chunk by chunk."""
+        rows = [(1, "Cairo, Egypt", 7.5), (2, 'Say "hi"', None)]
+        body = b"".join(iter_csv(("id", "address", "score"), iter(rows), chunk_size=1))
+        self.assertEqual(body, b'id,address,score\r\n1,"Cairo, Egypt",7.5\r\n2,"Say ""hi""",\r\n')
+        self.assertEqual(b"".join(iter_csv(("id",), [])), b"id\r\n")
+
+        items = [{"id": i} for i in range(3)]
+        chunks = list(iter_jsonl(items, chunk_size=2))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(b"".join(chunks), b'{"id":0}\n{"id":1}\n{"id":2}\n')
+
+    def test_gzip_stream(self):
+        """Test streamed bodies are gzip-encoded without being buffered first."""
+        response = gzip_stream(StreamingHttpResponse(iter([b"a" * 1000, b"b" * 1000])))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"a" * 1000 + b"b" * 1000)
+
+
+class JsonLayerTests(TestCase):
+    """Tests for the fast JSON layer and its stdlib fallback."""
+
+    def test_backends_produce_identical_output(self):
+        """Test orjson and stdlib paths encode the same bytes."""
+        value = {
+            "name": "Zürich", "score": 7.5, "ok": True, "none": None, "codes": [1, 2],
+            "when": datetime(2026, 1, 2, 3, 4, 5, 678901), "amount": Decimal("1.50"),
+        }
+        encoded = jsonlib.dumps(value)
+        with patch.object(jsonlib, "orjson", None):
+            self.assertEqual(jsonlib.dumps(value), encoded)
+            self.assertEqual(jsonlib.loads(memoryview(encoded)), jsonlib.loads(encoded))
+        self.assertEqual(jsonlib.loads(encoded)["when"], "2026-01-02T03:04:05.678")
+
+        value = {"scores": [1.5, float("nan")], "max": float("inf")}
+        encoded = jsonlib.dumps(value)
+        with patch.object(jsonlib, "orjson", None):
+            self.assertEqual(jsonlib.dumps(value), encoded)
+        self.assertEqual(encoded, b'{"scores":[1.5,null],"max":null}')
+
+    def test_strict_refuses_lossy_values(self):
+        """Test strict mode rejects values that plainly wouldn't round-trip."""
+        lossy = ({"when": datetime(2026, 1, 1)}, (1, 2), SafeString("x"), float("nan"))
+        for value in lossy:
+            for library in (jsonlib.orjson, None):
+                with self.subTest(value=value, library=library), patch.object(jsonlib, "orjson", library):
+                    with self.assertRaises(TypeError):
+                        jsonlib.dumps(value, default=None, strict=True)
+        if jsonlib.orjson is not None:
+            for value in ([SafeString("x")], {1: "a"}, {"nested": {None: 1}}):
+                with self.subTest(value=value), self.assertRaises(TypeError):
+                    jsonlib.dumps(value, default=None, strict=True)
+        with patch.object(jsonlib, "orjson", None), self.assertRaises(TypeError):
+            jsonlib.dumps([float("inf")], default=None, strict=True)
+
+    def test_json_response(self):
+        """Test the JsonResponse replacement enforces dict payloads by default."""
+        response = jsonlib.JsonResponse({"a": [1, 2]})
+        self.assertEqual(response.content, b'{"a":[1,2]}')
+        self.assertEqual(response["Content-Type"], "application/json")
+        with self.assertRaises(TypeError):
+            jsonlib.JsonResponse([1])
+
+    def test_json_cache_serializer_roundtrip(self):
+        """Test plain data is stored as JSON and other values are pickled."""
+        serializer = JSONSerializer()
+        plain = {"weather": {"temp": 21.5, "codes": [1, 2]}, "empty": {}}
+        self.assertEqual(serializer.dumps(plain)[:1], b"j")
+        self.assertEqual(serializer.loads(serializer.dumps(plain)), plain)
+
+        special = {"when": datetime(2026, 1, 1)}
+        self.assertEqual(serializer.dumps(special)[:1], b"p")
+        self.assertEqual(serializer.loads(serializer.dumps(special)), special)
+
+        for value in ({1: "a"}, (1, 2)):
+            with self.subTest(value=value):
+                self.assertEqual(serializer.dumps(value)[:1], b"p")
+                self.assertEqual(serializer.loads(serializer.dumps(value)), value)
+
+    def test_json_cache_serializer_verifies_samples(self):
+        """Test sampled encodings that change type as JSON are pickled instead."""
+        nested = ({"point": (1.5, 2.5)}, [float("-inf")])
+        with override_settings(CACHE_JSON_VERIFY_EVERY=1):
+            serializer = JSONSerializer()
+        for value in nested:
+            with self.subTest(value=value), self.assertLogs("apps.core.cache_backends", "WARNING"):
+                self.assertEqual(serializer.dumps(value)[:1], b"p")
+            self.assertEqual(serializer.loads(serializer.dumps(value)), value)
+
+        with override_settings(CACHE_JSON_VERIFY_EVERY=2):
+            serializer = JSONSerializer()
+        with self.assertLogs("apps.core.cache_backends", "WARNING"):
+            self.assertEqual(serializer.dumps(nested[0])[:1], b"p")
+        # Unsampled encodings aren't decoded
+        self.assertEqual(serializer.loads(serializer.dumps(nested[0])), {"point": [1.5, 2.5]})
+        nan = serializer.loads(serializer.dumps(float("nan")))
+        self.assertIsInstance(nan, float)
+        self.assertNotEqual(nan, nan)
+
+        self.assertEqual(serializer.dumps(5), 5)
+        self.assertEqual(serializer.loads(b"5"), 5)
+
+    def test_compressed_serializer(self):
+        """Test large values are compressed and decode transparently."""
+        serializer = CompressedSerializer()
+        large = {"cities": [{"name": f"City {i}", "lat": 1.5, "lon": 2.5} for i in range(50)]}
+        encoded = serializer.dumps(large)
+        self.assertEqual(encoded[:1], b"z")
+        self.assertLess(len(encoded), len(JSONSerializer().dumps(large)) / 2)
+        self.assertEqual(serializer.loads(encoded), large)
+
+        small = {"a": 1}
+        self.assertEqual(serializer.dumps(small), JSONSerializer().dumps(small))
+        self.assertEqual(serializer.loads(serializer.dumps(small)), small)
+        self.assertEqual(serializer.loads(serializer.dumps(7)), 7)
+
+        with self.settings(CACHE_COMPRESS_MIN_SIZE=1):
+            # Values compression would grow are left as they are
+            self.assertEqual(CompressedSerializer().dumps("abcdef")[:1], b"j")
+
+    def test_serializing_locmem_cache(self):
+        """Test the local-memory backend stores values via the serializer."""
+        cache = SerializingLocMemCache("test-serializing", {
+            "OPTIONS": {"SERIALIZER": "apps.core.cache_backends.JSONSerializer"},
+        })
+        cache.set("key", {"a": 1})
+        self.assertIsInstance(cache._cache[cache.make_key("key")], bytes)
+        self.assertEqual(cache.get("key"), {"a": 1})
+        self.assertTrue(cache.add("counter", 1))
+        self.assertFalse(cache.add("counter", 5))
+        self.assertEqual(cache.incr("counter", 2), 3)
+        self.assertEqual(cache.get("counter"), 3)
+
+
+class SharedCacheTests(TestCase):
+    """Tests for the SQLite shared cache and the two-tier cache."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite3")
+        caches_setting = {
+            "default": {
+                "BACKEND": "apps.core.cache_backends.TwoTierCache",
+                "LOCATION": f"test-l1-{id(self)}",
+                "OPTIONS": {"SHARED": "shared", "SYNC_INTERVAL": 0},
+            },
+            "shared": {"BACKEND": "apps.core.cache_backends.SQLiteCache", "LOCATION": self.path},
+        }
+        override = override_settings(CACHES=caches_setting)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_sqlite_cache_is_shared_between_instances(self):
+        """Test entries written by one instance are seen by another on the same file."""
+        first = SQLiteCache(self.path, {})
+        second = SQLiteCache(self.path, {})
+        first.set("weather", {"temp": 21.5})
+        self.assertEqual(second.get("weather"), {"temp": 21.5})
+        self.assertTrue(second.delete("weather"))
+        self.assertIsNone(first.get("weather"))
+
+    def test_sqlite_cache_add_and_incr(self):
+        """Test add() only writes missing or expired keys and incr() is atomic."""
+        cache = SQLiteCache(self.path, {})
+        self.assertTrue(cache.add("key", "first"))
+        self.assertFalse(cache.add("key", "second"))
+        self.assertEqual(cache.get("key"), "first")
+
+        cache.set("expiring", "old", timeout=1)
+        with patch("apps.core.cache_backends.time.time", return_value=time.time() + 5):
+            self.assertIsNone(cache.get("expiring"))
+            self.assertTrue(cache.add("expiring", "new"))
+
+        cache.set("counter", 1)
+        self.assertEqual(cache.incr("counter", 4), 5)
+        self.assertEqual(cache.get("counter"), 5)
+        with self.assertRaises(ValueError):
+            cache.incr("missing")
+
+    def test_sqlite_cache_culls_to_max_entries(self):
+        """Test culling keeps the number of entries bounded."""
+        cache = SQLiteCache(self.path, {"OPTIONS": {"MAX_ENTRIES": 10, "CULL_FREQUENCY": 2}})
+        for i in range(SQLiteCache.CULL_EVERY):
+            cache.set(f"key-{i}", i)
+        count = cache._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        self.assertLess(count, SQLiteCache.CULL_EVERY)
+
+    def _other_process(self):
+        # Another worker: its own L1 in front of the same shared cache
+        return TwoTierCache("test-l1-other", {"OPTIONS": {"SHARED": "shared", "SYNC_INTERVAL": 0}})
+
+    def test_two_tier_reads_through_to_shared(self):
+        """Test misses in the local tier are served from and copied out of the shared one."""
+        cache = caches["default"]
+        self._other_process().set("cities:abc", ["Cairo"], 300)
+        self.assertIsNone(cache.local.get("cities:abc"))
+        self.assertEqual(cache.get("cities:abc"), ["Cairo"])
+        self.assertEqual(cache.local.get("cities:abc"), ["Cairo"])
+        self.assertEqual(cache.get_many(["cities:abc", "missing"]), {"cities:abc": ["Cairo"]})
+        self.assertIsNone(cache.get("missing"))
+
+    def test_two_tier_local_copies_respect_shared_expiry(self):
+        """Test values aren't kept locally past their shared expiry, and counters not at all."""
+        cache = caches["default"]
+        other = self._other_process()
+        other.set("weather:1:2", {"temp": 20}, 5)
+        self.assertEqual(cache.get("weather:1:2"), {"temp": 20})
+        local_key = cache.local.make_key("weather:1:2")
+        self.assertLessEqual(cache.local._expire_info[local_key], time.time() + 5)
+        with patch("apps.core.cache_backends.time.time", return_value=time.time() + 10):
+            self.assertIsNone(cache.get("weather:1:2"))
+
+        self.assertTrue(cache.add("hits", 1, None))
+        self.assertEqual(other.get("hits"), 1)
+        cache.incr("hits", 2)
+        self.assertEqual(other.get("hits"), 3)
+        self.assertEqual(other.get_many(["hits"]), {"hits": 3})
+        self.assertIsNone(other.local.get("hits"))
+
+    def test_two_tier_copies_values_without_known_expiry(self):
+        """Test values from a shared cache without get_with_ttl are kept locally, counters aren't."""
+        shared = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"test-l2-{id(self)}"}
+        with override_settings(CACHES={**settings.CACHES, "shared": shared}):
+            cache = caches["default"]
+            other = self._other_process()
+            other.set("weather:1:2", {"temp": 20})
+            self.assertTrue(other.add("hits", 1, None))
+            self.assertEqual(cache.get("weather:1:2"), {"temp": 20})
+            self.assertEqual(cache.local.get("weather:1:2"), {"temp": 20})
+            self.assertEqual(cache.get("hits"), 1)
+            self.assertIsNone(cache.local.get("hits"))
+
+    def test_redis_cache_reads_ttl(self):
+        """Test RedisCache.get_with_ttl returns the value and its remaining lifetime."""
+        cache = RedisCache("redis://localhost:6379/0", {})
+        client = Mock()
+        cache.__dict__["_cache"] = client
+        client._serializer = CompressedSerializer()
+        pipeline = client.get_client.return_value.pipeline.return_value
+        pipeline.get.return_value.pttl.return_value.execute.return_value = [
+            client._serializer.dumps({"temp": 20}), 1500,
+        ]
+        self.assertEqual(cache.get_with_ttl("weather:1:2"), ({"temp": 20}, 1.5))
+        pipeline.get.return_value.pttl.return_value.execute.return_value = [
+            client._serializer.dumps(3), -1,
+        ]
+        self.assertEqual(cache.get_with_ttl("hits"), (3, None))
+        pipeline.get.return_value.pttl.return_value.execute.return_value = [None, -2]
+        self.assertEqual(cache.get_with_ttl("missing", "default"), ("default", None))
+
+    def test_two_tier_delete_invalidates_other_processes(self):
+        """Test delete() drops only the deleted keys from other processes' local tiers."""
+        cache = caches["default"]
+        other = self._other_process()
+        cache.set("weather:1:2", {"temp": 20})
+        cache.set("weather:3:4", {"temp": 25})
+        self.assertEqual(other.get("weather:1:2"), {"temp": 20})
+        self.assertEqual(other.get("weather:3:4"), {"temp": 25})
+
+        cache.delete("weather:1:2")
+        self.assertIsNone(other.get("weather:1:2"))
+        self.assertIsNone(other.local.get("weather:1:2"))
+        self.assertEqual(other.local.get("weather:3:4"), {"temp": 25})
+
+        cache.delete_many(["weather:3:4"])
+        self.assertIsNone(other.get("weather:3:4"))
+
+    def test_two_tier_clear_keeps_other_shared_entries(self):
+        """Test clear() drops this cache's entries everywhere but leaves other shared keys alone."""
+        cache = caches["default"]
+        other = self._other_process()
+        caches["shared"].set("report-views:epoch", 3, None)
+        cache.set("weather:1:2", {"temp": 20})
+        self.assertEqual(other.get("weather:1:2"), {"temp": 20})
+
+        cache.clear()
+        self.assertIsNone(cache.get("weather:1:2"))
+        self.assertIsNone(other.get("weather:1:2"))
+        self.assertIsNone(other.local.get("weather:1:2"))
+        self.assertEqual(caches["shared"].get("report-views:epoch"), 3)
+        cache.set("weather:1:2", {"temp": 22})
+        self.assertEqual(other.get("weather:1:2"), {"temp": 22})
+
+    def test_two_tier_falls_back_to_clearing_when_behind(self):
+        """Test a process that missed invalidation log entries empties its local tier."""
+        cache = caches["default"]
+        other = self._other_process()
+        cache.set("weather:1:2", {"temp": 20})
+        other.get("weather:1:2")
+        cache.delete("cities:abc")
+        caches["shared"].delete(cache._log_key(caches["shared"].get(cache.log_length_key)))
+        other._sync()
+        self.assertIsNone(other.local.get("weather:1:2"))
+        self.assertEqual(other.get("weather:1:2"), {"temp": 20})
+
+
+@override_settings(SESSION_COOKIE_SECURE=False, CSRF_COOKIE_SECURE=False)
+class LoadTestHarnessTests(LiveServerTestCase):
+    """Smoke test of the load-test scenario against a live server."""
+
+    def test_scenario_completes_without_errors(self):
+        """Test one iteration hits every endpoint successfully."""
+        mocks = start_mock_upstreams(seed=1)
+        self.addCleanup(mocks.server_close)
+        self.addCleanup(mocks.shutdown)
+        self.addCleanup(setattr, groq_service, "_client", None)
+        groq_service._client = None
+
+        credentials = ensure_load_test_users(1)
+        with override_settings(MOCK_UPSTREAMS_URL=mocks.url):
+            recorder = run_load_test(
+                self.live_server_url, credentials,
+                concurrency=1, iterations=1, seed=1, cities=["Springfield"],
+            )
+
+        report = recorder.report()
+        self.assertEqual(
+            set(report),
+            {"login", "city_suggestions", "analyze", "report", "heatmap", "dashboard"}
+        )
+        for endpoint, summary in report.items():
+            self.assertEqual(summary["errors"], 0, endpoint)
+        self.assertEqual(report["city_suggestions"]["requests"], len("Springfield") - 1)
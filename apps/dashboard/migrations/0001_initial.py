@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Max, Sum
+
+
+def backfill_user_stats(apps, schema_editor):
+    AnalysisResult = apps.get_model('analysis', 'AnalysisResult')
+    UserAnalysisStats = apps.get_model('dashboard', 'UserAnalysisStats')
+
+    rows = AnalysisResult.objects.order_by().values('user_id').annotate(
+        analysis_count=Count('id'),
+        ai_score_sum=Sum('ai_score', output_field=FloatField()),
+        safety_score_sum=Sum('safety_score'),
+        last_activity_at=Max('created_at'),
+    )
+    UserAnalysisStats.objects.bulk_create(
+        [UserAnalysisStats(**row) for row in rows.iterator()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('analysis', '0007_locationaggregate_updated_at_index'),
+        ('users', '0002_alter_profile_options_alter_user_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAnalysisStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analysis_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('analysis_count', models.PositiveIntegerField(default=0)),
+                ('ai_score_sum', models.FloatField(default=0)),
+                ('safety_score_sum', models.FloatField(default=0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'User Analysis Stats',
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
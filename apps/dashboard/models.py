@@ -1,3 +1,36 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class UserAnalysisStats(models.Model):
+    """
+    Running totals of a user's analysis results for the dashboard.
+
+    Kept up to date by the AnalysisResult signals in apps.dashboard.signals,
+    so the dashboard reads one row however many analyses the user has.
+    Sums are stored rather than means so new results can be added with a
+    single atomic UPDATE.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+        related_name="analysis_stats",
+    )
+    analysis_count = models.PositiveIntegerField(default=0)
+    ai_score_sum = models.FloatField(default=0)
+    safety_score_sum = models.FloatField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.analysis_count} analyses"
+
+    @property
+    def mean_ai_score(self):
+        return self.ai_score_sum / self.analysis_count if self.analysis_count else None
+
+    @property
+    def mean_safety_score(self):
+        return self.safety_score_sum / self.analysis_count if self.analysis_count else None
+
+    class Meta:
+        verbose_name_plural = "User Analysis Stats"
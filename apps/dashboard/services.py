@@ -0,0 +1,206 @@
+"""
+Per-user analysis statistics and trends for the dashboard.
+
+UserAnalysisStats rows are updated incrementally when analyses are
+created and recomputed when they are edited or deleted.
+
+Trends are weekly or monthly buckets of analysis counts and mean
+scores, for one user or the whole site. They are truncated and
+aggregated in the database, and each closed bucket (one that ended
+before the current one started) is cached without expiry, so only the
+current bucket and buckets missing from the cache are queried.
+"""
+
+from datetime import datetime, time, timedelta
+from django.db.models import Avg, Count, F, FloatField, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, TruncMonth, TruncWeek
+from django.utils import timezone
+from apps.ai_engine.cache import CacheNamespace
+from apps.analysis.models import AnalysisResult
+from .models import UserAnalysisStats
+
+# AnalysisResult fields that feed UserAnalysisStats
+STATS_FIELDS = {"user", "user_id", "ai_score", "safety_score", "created_at"}
+
+
+def _stats_totals():
+    """Aggregate expressions computing UserAnalysisStats columns from results."""
+    return {
+        "analysis_count": Count("id"),
+        "ai_score_sum": Coalesce(Sum("ai_score", output_field=FloatField()), 0.0),
+        "safety_score_sum": Coalesce(Sum("safety_score"), 0.0),
+        "last_activity_at": Max("created_at"),
+    }
+
+
+def record_result_added(result):
+    """
+    Add a newly created analysis to its user's stats.
+
+    Uses a single UPDATE with F() expressions, so concurrent analyses by
+    the same user don't lose increments. The stats row is created on the
+    user's first analysis.
+
+    Args:
+        result (AnalysisResult): The saved analysis
+    """
+    changes = {
+        "analysis_count": F("analysis_count") + 1,
+        "ai_score_sum": F("ai_score_sum") + result.ai_score,
+        "safety_score_sum": F("safety_score_sum") + result.safety_score,
+        # Greatest() is NULL on SQLite if either side is NULL
+        "last_activity_at": Coalesce(
+            Greatest(F("last_activity_at"), Value(result.created_at)), Value(result.created_at)
+        ),
+        "updated_at": timezone.now(),
+    }
+    rows = UserAnalysisStats.objects.filter(user_id=result.user_id)
+    if not rows.update(**changes):
+        UserAnalysisStats.objects.get_or_create(user_id=result.user_id)
+        rows.update(**changes)
+
+
+def refresh_user_stats(user_id, create=True):
+    """
+    Recompute a user's stats from their analyses.
+
+    Args:
+        user_id (int): User primary key
+        create (bool): Create the stats row if it doesn't exist. Off for
+            deletions, which may be part of deleting the user
+    """
+    totals = AnalysisResult.objects.filter(user_id=user_id).order_by().aggregate(**_stats_totals())
+    rows = UserAnalysisStats.objects.filter(user_id=user_id)
+    if not rows.update(**totals, updated_at=timezone.now()) and create and totals["analysis_count"]:
+        UserAnalysisStats.objects.update_or_create(user_id=user_id, defaults=totals)
+
+
+def get_user_stats(user):
+    """
+    A user's stats, or an unsaved empty row if they have no analyses yet.
+
+    Args:
+        user (User): The user
+
+    Returns:
+        UserAnalysisStats: Stats for the user
+    """
+    return UserAnalysisStats.objects.filter(user=user).first() or UserAnalysisStats(user=user)
+
+
+# ==============================
+# TRENDS
+# ==============================
+
+TREND_PERIODS = {"week": TruncWeek, "month": TruncMonth}
+TREND_BUCKETS = 12
+
+# Closed buckets don't change unless an old analysis is edited or
+# deleted, which invalidates them (see invalidate_trend_buckets)
+trends_cache = CacheNamespace("dashboard_trends")
+
+
+def bucket_start(moment, period):
+    """Start of the week (Monday) or month containing `moment`, in the current time zone."""
+    day = timezone.localtime(moment).date()
+    if period == "week":
+        day -= timedelta(days=day.weekday())
+    else:
+        day = day.replace(day=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def bucket_starts(period, count, now=None):
+    """
+    Starts of the last `count` buckets, oldest first; the last one is current.
+
+    Args:
+        period (str): "week" or "month"
+        count (int): Number of buckets
+        now (datetime): Defaults to the current time
+    """
+    start = bucket_start(now or timezone.now(), period)
+    starts = [start]
+    for _ in range(count - 1):
+        start = bucket_start(start - timedelta(days=1), period)
+        starts.append(start)
+    return starts[::-1]
+
+
+def _trend_scope(user_id):
+    return f"user-{user_id}" if user_id else "all"
+
+
+def _bucket(start, row=None):
+    row = row or {}
+    avg = lambda value: round(value, 2) if value is not None else None
+    return {
+        "start": start.date().isoformat(),
+        "count": row.get("count", 0),
+        "avg_ai_score": avg(row.get("avg_ai_score")),
+        "avg_safety_score": avg(row.get("avg_safety_score")),
+    }
+
+
+def analysis_trends(period="week", user=None, count=TREND_BUCKETS, now=None):
+    """
+    Analysis counts and mean scores per week or month.
+
+    Args:
+        period (str): "week" or "month"
+        user (User): Limit to one user's analyses (default: site-wide)
+        count (int): Number of buckets, including the current one
+        now (datetime): Defaults to the current time
+
+    Returns:
+        list: {"start", "count", "avg_ai_score", "avg_safety_score"} per
+            bucket, oldest first; empty buckets have a count of 0
+
+    Raises:
+        ValueError: If the period is unknown
+    """
+    if period not in TREND_PERIODS:
+        raise ValueError(f"Unknown trend period: {period}")
+    user_id = user.pk if user else None
+    scope = _trend_scope(user_id)
+    starts = bucket_starts(period, count, now)
+
+    parts = {(scope, period, start.date().isoformat()): start for start in starts[:-1]}
+    cached = trends_cache.get_many(list(parts))
+    buckets = {parts[key]: bucket for key, bucket in cached.items() if bucket is not None}
+    missing = [start for start in starts if start not in buckets]
+
+    # One grouped query from the oldest uncached bucket on
+    results = AnalysisResult.objects.filter(created_at__gte=missing[0])
+    if user_id:
+        results = results.filter(user_id=user_id)
+    rows = (
+        results.order_by()
+        .annotate(bucket=TREND_PERIODS[period]("created_at"))
+        .values("bucket")
+        .annotate(count=Count("id"), avg_ai_score=Avg("ai_score"), avg_safety_score=Avg("safety_score"))
+    )
+    by_day = {timezone.localtime(row["bucket"]).date(): row for row in rows}
+
+    for start in missing:
+        buckets[start] = _bucket(start, by_day.get(start.date()))
+        if start != starts[-1]:
+            trends_cache.set((scope, period, start.date().isoformat()), buckets[start])
+    return [buckets[start] for start in starts]
+
+
+def invalidate_trend_buckets(result):
+    """
+    Drop the cached buckets an analysis falls in, for its user and site-wide.
+
+    Args:
+        result (AnalysisResult): An edited or deleted analysis
+    """
+    now = timezone.now()
+    for period in TREND_PERIODS:
+        start = bucket_start(result.created_at, period)
+        if start >= bucket_start(now, period):
+            # The current bucket is never cached
+            continue
+        for user_id in (result.user_id, None):
+            trends_cache.invalidate(_trend_scope(user_id), period, start.date().isoformat())
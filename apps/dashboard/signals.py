@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.analysis.models import AnalysisResult
+from .services import STATS_FIELDS, invalidate_trend_buckets, record_result_added, refresh_user_stats
+
+
+@receiver(post_save, sender=AnalysisResult)
+def update_user_stats(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        record_result_added(instance)
+    elif update_fields is None or STATS_FIELDS.intersection(update_fields):
+        refresh_user_stats(instance.user_id)
+        invalidate_trend_buckets(instance)
+
+
+@receiver(post_delete, sender=AnalysisResult)
+def remove_from_user_stats(sender, instance, **kwargs):
+    refresh_user_stats(instance.user_id, create=False)
+    invalidate_trend_buckets(instance)
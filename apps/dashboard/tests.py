@@ -6,12 +6,22 @@ Tests cover:
 - Report statistics and aggregation
 - Map view
 - Authentication requirements
+- Incrementally maintained per-user statistics
+- Weekly and monthly trends
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from apps.analysis.models import Location, AnalysisResult
+from django.utils import timezone
+from datetime import timedelta
+from unittest.mock import patch
+from .models import UserAnalysisStats
+from .services import analysis_trends, bucket_starts, trends_cache
 
 User = get_user_model()
 
@@ -136,6 +146,167 @@ class DashboardViewTests(TestCase):
         self.assertEqual(len(response.context["latest_reports"]), 5)
 
 
+class UserAnalysisStatsTests(TestCase):
+    """Tests for the per-user stats behind the dashboard."""
+
+    def setUp(self):
+        """Set up a user and a location."""
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            username="testuser",
+            password="testpass123"
+        )
+        self.location = Location.objects.create(address="Test City", latitude=0.0, longitude=0.0)
+
+    def _add_result(self, ai_score, safety_score=5.0):
+        return AnalysisResult.objects.create(
+            user=self.user, location=self.location, safety_score=safety_score,
+            noise_level="Low", rent_level="Medium", water_quality="Good",
+            ai_summary="Test", ai_score=ai_score,
+        )
+
+    def test_stats_follow_creates_edits_and_deletes(self):
+        """Test stats are updated as results are added, changed and removed."""
+        first = self._add_result(80, 6.0)
+        second = self._add_result(60, 4.0)
+        stats = UserAnalysisStats.objects.get(user=self.user)
+        self.assertEqual(stats.analysis_count, 2)
+        self.assertEqual(stats.mean_ai_score, 70)
+        self.assertEqual(stats.safety_score_sum, 10.0)
+        self.assertEqual(stats.last_activity_at, second.created_at)
+
+        first.ai_score = 100
+        first.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.ai_score_sum, 160)
+
+        second.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.analysis_count, 1)
+        self.assertEqual(stats.last_activity_at, first.created_at)
+
+    def test_user_with_results_can_be_deleted(self):
+        """Test deleting a user cascades without recreating their stats."""
+        self._add_result(80)
+        self.user.delete()
+        self.assertFalse(UserAnalysisStats.objects.exists())
+
+    def test_dashboard_queries_dont_grow_with_history(self):
+        """Test the dashboard runs the same number of queries for 1 or 20 reports."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("dashboard:dashboard")
+        self._add_result(50)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for i in range(19):
+            self._add_result(i)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(response.context["reports_count"], 20)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "dashboard-trend-tests"},
+})
+class TrendTests(TestCase):
+    """Tests for the time-bucketed dashboard trends."""
+
+    def setUp(self):
+        """Set up two users and a location."""
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            username="testuser",
+            password="testpass123"
+        )
+        self.other = User.objects.create_user(
+            email="other@example.com",
+            username="otheruser",
+            password="testpass123"
+        )
+        self.location = Location.objects.create(address="Test City", latitude=0.0, longitude=0.0)
+
+    def _add_result(self, user, ai_score, weeks_ago=0):
+        result = AnalysisResult.objects.create(
+            user=user, location=self.location, safety_score=5.0,
+            noise_level="Low", rent_level="Medium", water_quality="Good",
+            ai_summary="Test", ai_score=ai_score,
+        )
+        if weeks_ago:
+            # created_at is auto_now_add, so backdate it with an UPDATE
+            created_at = timezone.now() - timedelta(weeks=weeks_ago)
+            AnalysisResult.objects.filter(pk=result.pk).update(created_at=created_at)
+            result.created_at = created_at
+        return result
+
+    def test_weekly_buckets_for_user_and_site(self):
+        """Test counts and means land in the right weeks for each scope."""
+        self._add_result(self.user, 80)
+        self._add_result(self.user, 60, weeks_ago=2)
+        self._add_result(self.other, 40, weeks_ago=2)
+
+        mine = analysis_trends("week", user=self.user, count=4)
+        site = analysis_trends("week", count=4)
+        self.assertEqual([b["count"] for b in mine], [0, 1, 0, 1])
+        self.assertEqual([b["count"] for b in site], [0, 2, 0, 1])
+        self.assertEqual(site[1]["avg_ai_score"], 50)
+        self.assertIsNone(site[0]["avg_ai_score"])
+        self.assertEqual(len(analysis_trends("month", count=3)), 3)
+
+    def test_closed_buckets_are_cached_until_invalidated(self):
+        """Test closed buckets aren't recomputed unless an analysis in them changes."""
+        old = self._add_result(self.user, 60, weeks_ago=1)
+        self.assertEqual(analysis_trends("week", count=2)[0]["count"], 1)
+
+        # Rows changed without signals don't show up in a cached closed bucket...
+        AnalysisResult.objects.filter(pk=old.pk).update(ai_score=10)
+        self.assertEqual(analysis_trends("week", count=2)[0]["avg_ai_score"], 60)
+
+        # ...but deleting an analysis invalidates its bucket
+        old.delete()
+        self.assertEqual(analysis_trends("week", count=2)[0]["count"], 0)
+
+        # The current bucket is always recomputed
+        self._add_result(self.user, 70)
+        self.assertEqual(analysis_trends("week", count=2)[-1]["count"], 1)
+
+    def test_closed_buckets_read_together_and_expire(self):
+        """Test cached buckets are fetched in one round trip and don't live forever."""
+        cache = caches["default"]
+        self._add_result(self.user, 60, weeks_ago=1)
+        analysis_trends("week", count=12)
+        self.assertTrue(cache._expire_info)
+        self.assertTrue(all(expiry is not None for expiry in cache._expire_info.values()))
+
+        with patch.object(trends_cache, "get") as get, \
+                patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            self.assertEqual(analysis_trends("week", count=12)[-2]["count"], 1)
+        get.assert_not_called()
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(len(get_many.call_args[0][0]), 11)
+
+    def test_bucket_starts(self):
+        """Test buckets start on Mondays and month starts, oldest first."""
+        weeks = bucket_starts("week", 3)
+        self.assertTrue(all(timezone.localtime(start).weekday() == 0 for start in weeks))
+        self.assertEqual(weeks[2] - weeks[1], timedelta(days=7))
+        months = bucket_starts("month", 13)
+        self.assertTrue(all(timezone.localtime(start).day == 1 for start in months))
+        self.assertEqual(len(set(months)), 13)
+
+    def test_dashboard_shows_trends(self):
+        """Test the dashboard renders the selected trend period."""
+        self._add_result(self.user, 80)
+        self.client.login(email="test@example.com", password="testpass123")
+        response = self.client.get(reverse("dashboard:dashboard"), {"trend": "month"})
+        self.assertEqual(response.context["trend_period"], "month")
+        mine, site = response.context["trends"][0]
+        self.assertEqual((mine["count"], site["count"]), (1, 1))
+
+
 class MapViewTests(TestCase):
     """Tests for the map view."""
 
@@ -7,6 +7,7 @@ User dashboard with analytics and recent reports.
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from apps.analysis.models import AnalysisResult
+from .services import TREND_PERIODS, analysis_trends, get_user_stats
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,17 +22,33 @@ def dashboard_view(request):
     - Total reports created
     - Average AI quality score
     - 5 most recent reports
+    - Weekly or monthly trends for the user and site-wide (?trend=week|month)
+
+    Totals come from the user's UserAnalysisStats row, so the cost
+    doesn't grow with the number of reports.
     """
-    reports = AnalysisResult.objects.filter(user=request.user)
+    stats = get_user_stats(request.user)
+    mean_ai_score = stats.mean_ai_score
+    trend_period = request.GET.get("trend", "week")
+    if trend_period not in TREND_PERIODS:
+        trend_period = "week"
 
     context = {
-        "reports_count": reports.count(),
-        "avg_ai_score": round(
-            sum(r.ai_score for r in reports) / reports.count(), 2
-        ) if reports else 0,
-        "latest_reports": reports.order_by("-created_at")[:5],
+        "reports_count": stats.analysis_count,
+        "avg_ai_score": round(mean_ai_score, 2) if mean_ai_score is not None else 0,
+        "last_activity_at": stats.last_activity_at,
+        "latest_reports": (
+            AnalysisResult.objects.filter(user=request.user)
+            .select_related("location")
+            .order_by("-created_at")[:5]
+        ),
+        "trend_period": trend_period,
+        "trend_periods": list(TREND_PERIODS),
+        # (user bucket, site-wide bucket) pairs, newest first
+        "trends": list(zip(
+            analysis_trends(trend_period, user=request.user), analysis_trends(trend_period)
+        ))[::-1],
     }
 
     logger.debug(f"Dashboard viewed by user: {request.user.id}")
     return render(request, "dashboard/dashboard.html", context)
-
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ReportsConfig(AppConfig):
@@ -7,4 +8,6 @@ class ReportsConfig(AppConfig):
 
 
     def ready(self):
-        import apps.reports.signals
\ No newline at end of file
+        import apps.reports.signals
+        from .search import sync_search_index_after_migrate
+        post_migrate.connect(sync_search_index_after_migrate, sender=self)
@@ -0,0 +1,44 @@
+"""
+Write report views counted in the cache to ReportAnalytics.
+
+Examples:
+    # Once, e.g. from cron every minute
+    python manage.py flush_report_views
+
+    # As a long-running process, every REPORT_VIEWS_FLUSH_INTERVAL seconds
+    python manage.py flush_report_views --interval
+
+Views recorded since the previous run are written on the run after
+next (see apps.reports.view_counts), so keep the interval well above
+the time a request takes.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.reports.view_counts import flush_views
+import time
+
+
+class Command(BaseCommand):
+    help = "Flush write-behind report view counts to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, nargs="?", const=-1,
+                            help="Keep running, flushing every INTERVAL seconds "
+                                 "(default REPORT_VIEWS_FLUSH_INTERVAL)")
+        parser.add_argument("--batch-size", type=int, help="Reports per UPDATE")
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        if interval == -1:
+            interval = getattr(settings, "REPORT_VIEWS_FLUSH_INTERVAL", 60)
+        if interval is not None and interval <= 0:
+            raise CommandError("--interval must be positive")
+
+        while True:
+            flushed = flush_views(options["batch_size"])
+            if options["verbosity"] > 1 or interval is None:
+                self.stdout.write(f"Flushed {flushed} report views")
+            if interval is None:
+                return
+            time.sleep(interval)
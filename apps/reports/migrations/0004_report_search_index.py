@@ -0,0 +1,113 @@
+# Full-text index over report summaries and location addresses.
+#
+# SQLite: an FTS5 table keyed by AnalysisResult id, kept in sync by triggers.
+# PostgreSQL: a tsvector column on analysis_analysisresult with a GIN
+# index, filled by triggers.
+# Other databases get no index, and apps.reports.search refuses to search.
+
+from django.db import migrations
+
+# The triggers and the initial contents are created by
+# apps.reports.search.sync_sqlite_search_index after every migrate,
+# because SQLite loses triggers when Django rebuilds a table to alter it
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE report_search USING fts5(
+        address, ai_summary, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS report_search_location_update",
+    "DROP TRIGGER IF EXISTS report_search_delete",
+    "DROP TRIGGER IF EXISTS report_search_update",
+    "DROP TRIGGER IF EXISTS report_search_insert",
+    "DROP TABLE IF EXISTS report_search",
+]
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE analysis_analysisresult ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION report_search_document(address text, summary text) RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(address, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(summary, '')), 'B')
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    """
+    CREATE FUNCTION report_search_result_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := report_search_document(
+            (SELECT address FROM analysis_location WHERE id = NEW.location_id), NEW.ai_summary
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER report_search_result BEFORE INSERT OR UPDATE OF ai_summary, location_id
+    ON analysis_analysisresult FOR EACH ROW EXECUTE FUNCTION report_search_result_trigger()
+    """,
+    """
+    CREATE FUNCTION report_search_location_trigger() RETURNS trigger AS $$
+    BEGIN
+        UPDATE analysis_analysisresult
+        SET search_vector = report_search_document(NEW.address, ai_summary)
+        WHERE location_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER report_search_location AFTER UPDATE OF address ON analysis_location
+    FOR EACH ROW WHEN (OLD.address IS DISTINCT FROM NEW.address)
+    EXECUTE FUNCTION report_search_location_trigger()
+    """,
+    """
+    UPDATE analysis_analysisresult r SET search_vector = report_search_document(l.address, r.ai_summary)
+    FROM analysis_location l WHERE l.id = r.location_id
+    """,
+    "CREATE INDEX analysis_analysisresult_search_gin ON analysis_analysisresult USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS analysis_analysisresult_search_gin",
+    "DROP TRIGGER IF EXISTS report_search_location ON analysis_location",
+    "DROP TRIGGER IF EXISTS report_search_result ON analysis_analysisresult",
+    "DROP FUNCTION IF EXISTS report_search_location_trigger()",
+    "DROP FUNCTION IF EXISTS report_search_result_trigger()",
+    "DROP FUNCTION IF EXISTS report_search_document(text, text)",
+    "ALTER TABLE analysis_analysisresult DROP COLUMN IF EXISTS search_vector",
+]
+
+STATEMENTS = {
+    "sqlite": (SQLITE_FORWARD, SQLITE_BACKWARD),
+    "postgresql": (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+}
+
+
+def _run(schema_editor, direction):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, 0)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0007_locationaggregate_updated_at_index'),
+        ('reports', '0003_alter_reportanalytics_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
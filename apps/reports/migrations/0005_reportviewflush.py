@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_report_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportViewFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_epoch', models.PositiveIntegerField(default=0)),
+                ('flushed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -37,3 +37,17 @@ class ReportAnalytics(models.Model):
 
     class Meta:
         verbose_name_plural = "Report Analytics"
+
+
+class ReportViewFlush(models.Model):
+    """
+    Last view count epoch written to ReportAnalytics.
+
+    A single row, updated in the same transaction as the epoch's counts
+    (see apps.reports.view_counts).
+    """
+    last_epoch = models.PositiveIntegerField(default=0)
+    flushed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Report views flushed through epoch {self.last_epoch}"
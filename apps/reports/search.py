@@ -0,0 +1,138 @@
+"""
+Full-text search over report summaries and location addresses.
+
+Backed by the index created in reports migration 0004:
+- SQLite: the FTS5 table `report_search`, keyed by AnalysisResult id
+- PostgreSQL: the `search_vector` tsvector column with a GIN index
+
+Both are kept current by database triggers, so every write path
+(ORM, bulk updates, raw SQL) is covered. Search never degrades to
+`icontains`: on other databases it raises SearchUnavailable.
+"""
+
+from django.db import connections, transaction
+from django.db.models.expressions import RawSQL
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+MAX_SEARCH_TERMS = 8
+
+# Created (again) after migrations by sync_sqlite_search_index: SQLite
+# drops a table's triggers when Django rebuilds it for a schema change
+SQLITE_TRIGGERS = {
+    "report_search_insert": """
+        CREATE TRIGGER IF NOT EXISTS report_search_insert AFTER INSERT ON analysis_analysisresult BEGIN
+            INSERT INTO report_search (rowid, address, ai_summary)
+            VALUES (new.id, (SELECT address FROM analysis_location WHERE id = new.location_id), new.ai_summary);
+        END
+    """,
+    "report_search_update": """
+        CREATE TRIGGER IF NOT EXISTS report_search_update
+        AFTER UPDATE OF ai_summary, location_id ON analysis_analysisresult BEGIN
+            UPDATE report_search
+            SET address = (SELECT address FROM analysis_location WHERE id = new.location_id),
+                ai_summary = new.ai_summary
+            WHERE rowid = new.id;
+        END
+    """,
+    "report_search_delete": """
+        CREATE TRIGGER IF NOT EXISTS report_search_delete AFTER DELETE ON analysis_analysisresult BEGIN
+            DELETE FROM report_search WHERE rowid = old.id;
+        END
+    """,
+    "report_search_location_update": """
+        CREATE TRIGGER IF NOT EXISTS report_search_location_update AFTER UPDATE OF address ON analysis_location BEGIN
+            UPDATE report_search SET address = new.address
+            WHERE rowid IN (SELECT id FROM analysis_analysisresult WHERE location_id = new.id);
+        END
+    """,
+}
+
+SQLITE_REBUILD = [
+    "DELETE FROM report_search",
+    """
+    INSERT INTO report_search (rowid, address, ai_summary)
+    SELECT r.id, l.address, r.ai_summary
+    FROM analysis_analysisresult r JOIN analysis_location l ON l.id = r.location_id
+    """,
+]
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database has no full-text index for reports."""
+
+
+def sync_sqlite_search_index(using="default"):
+    """
+    Install missing SQLite triggers and rebuild the index if any were missing.
+
+    Does nothing on other databases or before migration 0004 has run.
+
+    Args:
+        using (str): Database alias
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE name LIKE %s", ["report_search%"])
+        existing = {name for kind, name in cursor.fetchall()}
+        if "report_search" not in existing:
+            return
+        missing = set(SQLITE_TRIGGERS) - existing
+        if not missing:
+            return
+        logger.info(f"Rebuilding report search index (missing triggers: {', '.join(sorted(missing))})")
+        with transaction.atomic(using=using):
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            for sql in SQLITE_REBUILD:
+                cursor.execute(sql)
+
+
+def sync_search_index_after_migrate(sender, using, **kwargs):
+    """post_migrate receiver for sync_sqlite_search_index."""
+    sync_sqlite_search_index(using)
+
+
+def search_terms(query):
+    """Lowercased word tokens of a search query (at most MAX_SEARCH_TERMS)."""
+    return re.findall(r"\w+", query.lower())[:MAX_SEARCH_TERMS]
+
+
+def search_reports(queryset, query):
+    """
+    Restrict an AnalysisResult queryset to reports matching `query`.
+
+    Every word must match the address or summary, as a prefix of an
+    indexed word ("cai" matches "Cairo").
+
+    Args:
+        queryset (QuerySet): AnalysisResult rows to search within
+        query (str): User-entered search text
+
+    Returns:
+        QuerySet: The matching rows (ordering unchanged)
+
+    Raises:
+        SearchUnavailable: If the database has no full-text index
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        expression = " ".join(f'"{term}"*' for term in terms)
+        matches = RawSQL("SELECT rowid FROM report_search WHERE report_search MATCH %s", (expression,))
+    elif vendor == "postgresql":
+        expression = " & ".join(f"{term}:*" for term in terms)
+        matches = RawSQL(
+            "SELECT id FROM analysis_analysisresult WHERE search_vector @@ to_tsquery('simple', %s)",
+            (expression,),
+        )
+    else:
+        raise SearchUnavailable(f"Report search is not supported on {vendor}")
+    return queryset.filter(pk__in=matches)
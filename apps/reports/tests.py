@@ -6,12 +6,27 @@ Tests cover:
 - Filtering by user
 - Pagination
 - Authentication requirements
+- Full-text search
+- Streaming CSV/JSON Lines export
+- Write-behind view counting
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.core.cache import caches
+from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from apps.analysis.models import Location, AnalysisResult
+from .models import ReportAnalytics
+from .search import search_reports, sync_sqlite_search_index
+from .view_counts import EPOCH_KEY, apply_view_counts, flush_views, record_view
+import csv
+import gzip
+import io
+import json
+from unittest.mock import patch
 
 User = get_user_model()
 
@@ -134,3 +149,312 @@ class ReportsListViewTests(TestCase):
         reports = response.context["reports"]
         self.assertEqual(len(reports), 0)
 
+
+@override_settings(REPORTS_PAGE_SIZE=3)
+class ReportsPaginationTests(TestCase):
+    """Tests for keyset pagination of the reports list."""
+
+    def setUp(self):
+        """Create seven reports for one user."""
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            username="testuser",
+            password="testpass123"
+        )
+        location = Location.objects.create(address="Test City", latitude=0.0, longitude=0.0)
+        self.reports = [
+            AnalysisResult.objects.create(
+                user=self.user, location=location, safety_score=7.0, noise_level="Low",
+                rent_level="Medium", water_quality="Good", ai_summary="Summary", ai_score=50 + i,
+            )
+            for i in range(7)
+        ]
+        self.reports_url = reverse("reports:reports")
+        self.client.login(email="test@example.com", password="testpass123")
+
+    def test_pages_follow_cursor(self):
+        """Test following next cursors visits every report once, newest first."""
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(self.reports_url, {"cursor": cursor} if cursor else {})
+            page = response.context["reports"]
+            seen += [report.id for report in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+            self.assertContains(response, "Older reports")
+
+        self.assertEqual(seen, [report.id for report in reversed(self.reports)])
+
+    def test_list_columns_only(self):
+        """Test the page query skips ai_summary, joins the location and runs no COUNT."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.reports_url)
+        self.assertContains(response, "Test City")
+        sql = [query["sql"] for query in queries if "analysis_analysisresult" in query["sql"]]
+        self.assertEqual(len(sql), 1)
+        self.assertNotIn("ai_summary", sql[0])
+        self.assertNotIn("COUNT(", sql[0].upper())
+        self.assertIn("analysis_location", sql[0])
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Test a malformed cursor falls back to the newest reports."""
+        response = self.client.get(self.reports_url, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["reports"][0].id, self.reports[-1].id)
+
+
+class ReportSearchTests(TestCase):
+    """Tests for full-text search over reports."""
+
+    def setUp(self):
+        """Create reports in two cities for two users."""
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            username="testuser",
+            password="testpass123"
+        )
+        other = User.objects.create_user(
+            email="other@example.com",
+            username="otheruser",
+            password="testpass123"
+        )
+        self.cairo = Location.objects.create(address="Cairo, Egypt", latitude=30.0, longitude=31.2)
+        self.zurich = Location.objects.create(address="Zürich, Switzerland", latitude=47.4, longitude=8.5)
+        self.nile = self._add(self.user, self.cairo, "Lively riverside district near the Nile")
+        self.lake = self._add(self.user, self.zurich, "Quiet lakeside neighbourhood")
+        self._add(other, self.cairo, "Another user's Nile report")
+
+    def _add(self, user, location, summary):
+        return AnalysisResult.objects.create(
+            user=user, location=location, safety_score=7.0, noise_level="Low",
+            rent_level="Medium", water_quality="Good", ai_summary=summary, ai_score=70,
+        )
+
+    def _search(self, query):
+        reports = AnalysisResult.objects.filter(user=self.user)
+        return set(search_reports(reports, query).values_list("id", flat=True))
+
+    def test_matches_address_and_summary(self):
+        """Test words match addresses and summaries by prefix, ignoring accents."""
+        self.assertEqual(self._search("cai"), {self.nile.id})
+        self.assertEqual(self._search("lakeside"), {self.lake.id})
+        self.assertEqual(self._search("zurich quiet"), {self.lake.id})
+        self.assertEqual(self._search("cairo quiet"), set())
+        self.assertEqual(self._search("   "), set())
+
+    def test_index_follows_writes(self):
+        """Test edits to summaries and addresses and deletions reach the index."""
+        self.nile.ai_summary = "Busy market streets"
+        self.nile.save()
+        self.assertEqual(self._search("market"), {self.nile.id})
+        self.assertEqual(self._search("riverside"), set())
+
+        Location.objects.filter(pk=self.zurich.pk).update(address="Geneva, Switzerland")
+        self.assertEqual(self._search("geneva"), {self.lake.id})
+
+        self.lake.delete()
+        self.assertEqual(self._search("geneva"), set())
+
+    def test_search_uses_index(self):
+        """Test the query goes through the full-text index, not LIKE."""
+        sql = str(search_reports(AnalysisResult.objects.all(), "cairo").query)
+        self.assertIn("MATCH", sql)
+        self.assertNotIn("LIKE", sql)
+
+    def test_missing_triggers_are_restored(self):
+        """Test syncing reinstalls dropped triggers and rebuilds the index."""
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER report_search_insert")
+        added = self._add(self.user, self.cairo, "Added while the trigger was missing")
+        self.assertEqual(self._search("missing"), set())
+
+        sync_sqlite_search_index()
+        self.assertEqual(self._search("missing"), {added.id})
+
+    def test_reports_page_search(self):
+        """Test the reports page filters by the q parameter."""
+        self.client.login(email="test@example.com", password="testpass123")
+        response = self.client.get(reverse("reports:reports"), {"q": "nile"})
+        self.assertEqual([report.id for report in response.context["reports"]], [self.nile.id])
+        self.assertContains(response, 'value="nile"')
+
+
+class ReportExportTests(TestCase):
+    """Tests for the streaming report export."""
+
+    def setUp(self):
+        """Create reports for the user and another user."""
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            username="testuser",
+            password="testpass123"
+        )
+        other = User.objects.create_user(
+            email="other@example.com",
+            username="otheruser",
+            password="testpass123"
+        )
+        location = Location.objects.create(address="Cairo, Egypt", latitude=30.0, longitude=31.2)
+        for user, score in ((self.user, 70), (self.user, 80), (other, 10)):
+            AnalysisResult.objects.create(
+                user=user, location=location, safety_score=7.0, noise_level="Low",
+                rent_level="Medium", water_quality="Good", ai_summary="Busy, \"lively\" city",
+                ai_score=score, temperature=25.5,
+            )
+        self.export_url = reverse("reports:export")
+        self.client.login(email="test@example.com", password="testpass123")
+
+    def test_csv_export(self):
+        """Test the CSV export streams the user's reports newest first."""
+        response = self.client.get(self.export_url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment;", response["Content-Disposition"])
+
+        rows = list(csv.DictReader(io.StringIO(response.getvalue().decode())))
+        self.assertEqual([row["ai_score"] for row in rows], ["80", "70"])
+        self.assertEqual(rows[0]["address"], "Cairo, Egypt")
+        self.assertEqual(rows[0]["ai_summary"], 'Busy, "lively" city')
+        self.assertEqual(rows[0]["temperature"], "25.5")
+
+    def test_gzipped_jsonl_export(self):
+        """Test JSON Lines output is gzip-encoded when the client accepts it."""
+        response = self.client.get(self.export_url, {"format": "jsonl"}, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lines = gzip.decompress(response.getvalue()).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record["ai_score"] for record in records], [80, 70])
+        self.assertEqual(records[0]["latitude"], 30.0)
+        self.assertIn("avg_feedback_score", records[0])
+
+    def test_export_rejects_unknown_format(self):
+        """Test unknown formats are refused."""
+        response = self.client.get(self.export_url, {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES={
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "report-view-counts-default",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "report-view-counts-shared",
+    },
+})
+class ReportViewCountTests(TestCase):
+    """Tests for write-behind report view counting."""
+
+    def setUp(self):
+        """Create two reports and start from empty caches."""
+        for alias in ("default", "shared"):
+            caches[alias].clear()
+            self.addCleanup(caches[alias].clear)
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            username="testuser",
+            password="testpass123"
+        )
+        location = Location.objects.create(address="Cairo, Egypt", latitude=30.0, longitude=31.2)
+        self.reports = [
+            AnalysisResult.objects.create(
+                user=self.user, location=location, safety_score=7.0, noise_level="Low",
+                rent_level="Medium", water_quality="Good", ai_summary="", ai_score=score,
+            )
+            for score in (60, 70)
+        ]
+
+    def views(self, report):
+        return ReportAnalytics.objects.get(report=report).views
+
+    def test_report_view_counts_without_writing(self):
+        """Test viewing a report doesn't touch ReportAnalytics until a flush."""
+        self.client.login(email="test@example.com", password="testpass123")
+        url = reverse("analysis:report", args=[self.reports[0].pk])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([q for q in queries if "reports_reportanalytics" in q["sql"]])
+        self.client.get(url)
+
+        # The first flush closes the epoch the views are in, the next writes it
+        self.assertEqual(flush_views(), 0)
+        self.assertEqual(self.views(self.reports[0]), 0)
+        self.assertEqual(flush_views(), 2)
+        self.assertEqual(self.views(self.reports[0]), 2)
+        self.assertEqual(self.views(self.reports[1]), 0)
+
+    def test_flush_batches_and_is_not_repeated(self):
+        """Test counts are written in batched UPDATEs and only once."""
+        for _ in range(3):
+            record_view(self.reports[0].pk)
+        record_view(self.reports[1].pk)
+        flush_views()
+        record_view(self.reports[1].pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(flush_views(batch_size=1), 4)
+        updates = [q for q in queries if q["sql"].startswith('UPDATE "reports_reportanalytics"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual([self.views(r) for r in self.reports], [3, 1])
+
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(flush_views(), 0)
+        self.assertEqual([self.views(r) for r in self.reports], [3, 2])
+
+    def test_unflushed_epoch_survives_failed_flush(self):
+        """Test a flush that fails before committing is redone by the next one."""
+        record_view(self.reports[0].pk)
+        flush_views()
+        with self.assertRaises(RuntimeError):
+            with patch("apps.reports.view_counts.apply_view_counts", side_effect=RuntimeError):
+                flush_views()
+        self.assertEqual(self.views(self.reports[0]), 0)
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(self.views(self.reports[0]), 1)
+
+    def test_epoch_restarts_after_flushed(self):
+        """Test a lost epoch counter never restarts at an already flushed epoch."""
+        record_view(self.reports[0].pk)
+        flush_views()
+        flush_views()
+        caches["shared"].delete(EPOCH_KEY)
+        record_view(self.reports[0].pk)
+        flush_views()
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(self.views(self.reports[0]), 2)
+
+    def test_overlapping_flush_does_not_reapply_epoch(self):
+        """Test an epoch recorded as flushed in the database is never written again."""
+        with patch("apps.reports.view_counts._delete_epoch"):
+            record_view(self.reports[0].pk)
+            flush_views()
+            self.assertEqual(flush_views(), 1)
+            # A flush that started before the last one committed still
+            # sees epoch 1 as pending, and its counts are still cached
+            with patch("apps.reports.view_counts._last_flushed_epoch", return_value=0):
+                self.assertEqual(flush_views(), 0)
+        self.assertEqual(self.views(self.reports[0]), 1)
+
+        # Losing every cache key doesn't restart at a flushed epoch either
+        caches["shared"].clear()
+        record_view(self.reports[0].pk)
+        flush_views()
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(self.views(self.reports[0]), 2)
+
+    def test_apply_creates_missing_rows_and_skips_deleted_reports(self):
+        """Test counts create absent analytics rows and drop unknown reports."""
+        ReportAnalytics.objects.filter(report=self.reports[0]).delete()
+        self.assertEqual(apply_view_counts({self.reports[0].pk: 5, 999999: 3}), 1)
+        self.assertEqual(self.views(self.reports[0]), 5)
+        self.assertFalse(ReportAnalytics.objects.filter(report_id=999999).exists())
+
+    def test_flush_command(self):
+        """Test the management command flushes pending views."""
+        record_view(self.reports[0].pk)
+        out = io.StringIO()
+        call_command("flush_report_views", stdout=out)
+        call_command("flush_report_views", stdout=out)
+        self.assertIn("Flushed 1 report views", out.getvalue())
+        self.assertEqual(self.views(self.reports[0]), 1)
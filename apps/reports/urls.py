@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import reports_list_view
+from .views import reports_list_view, export_reports
 app_name = "reports"
 urlpatterns = [
     path("", reports_list_view, name="reports"),
+    path("export/", export_reports, name="export"),
 ]
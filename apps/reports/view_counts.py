@@ -0,0 +1,213 @@
+"""
+Write-behind view counting for reports.
+
+`record_view` counts a report view with an atomic incr() in the shared
+cache instead of an UPDATE on ReportAnalytics per page load;
+`flush_views` (run periodically by the flush_report_views command) adds
+the accumulated counts to ReportAnalytics.views in batched bulk UPDATEs.
+
+Counts are grouped in epochs. Views go to the current epoch and each
+flush starts a new one, then writes the epochs before the one it just
+closed, so a worker that read the epoch number just before the switch
+still has a full flush interval to finish its increment. Every report
+counted in an epoch is registered once in an append-only slot list (an
+incr()'d length plus one key per slot), which is how a flush finds the
+counters without scanning the cache.
+
+An epoch's UPDATEs run in one transaction that also records it as the
+last flushed epoch (ReportViewFlush), with that row locked. A flush
+that dies midway is redone by the next one, and a flush that outlives
+its cache lock and overlaps another can't write an epoch twice: counts
+live outside worker memory, survive restarts and are written exactly
+once. The cache keeps a copy of the marker so a lost epoch counter
+never restarts at an epoch that was already flushed.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from apps.analysis.models import AnalysisResult
+from apps.core.responses import chunked
+from .models import ReportAnalytics, ReportViewFlush
+import logging
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "report-views"
+EPOCH_KEY = f"{_KEY_PREFIX}:epoch"
+FLUSHED_KEY = f"{_KEY_PREFIX}:flushed"
+FLUSH_LOCK_KEY = f"{_KEY_PREFIX}:flush-lock"
+
+
+def _cache():
+    return caches["shared" if "shared" in settings.CACHES else "default"]
+
+
+def _count_key(epoch, report_id):
+    return f"{_KEY_PREFIX}:{epoch}:count:{report_id}"
+
+
+def _length_key(epoch):
+    return f"{_KEY_PREFIX}:{epoch}:slots"
+
+
+def _slot_key(epoch, slot):
+    return f"{_KEY_PREFIX}:{epoch}:slot:{slot}"
+
+
+def _incr(cache, key, delta=1):
+    # incr() on a missing key raises; create it without a timeout instead
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def current_epoch(cache=None):
+    """The epoch new views are counted in, starting one if there is none."""
+    cache = cache or _cache()
+    epoch = cache.get(EPOCH_KEY)
+    if epoch is None:
+        # Never reuse an epoch that was already flushed
+        flushed = cache.get(FLUSHED_KEY)
+        if flushed is None:
+            cache.add(FLUSHED_KEY, _last_flushed_epoch(), None)
+            flushed = cache.get(FLUSHED_KEY, 0)
+        cache.add(EPOCH_KEY, flushed + 1, None)
+        epoch = cache.get(EPOCH_KEY)
+    return epoch
+
+
+def record_view(report_id):
+    """
+    Count one view of a report.
+
+    Never raises: a cache failure loses the view rather than the page.
+
+    Args:
+        report_id (int): AnalysisResult primary key
+    """
+    cache = _cache()
+    try:
+        epoch = current_epoch(cache)
+        key = _count_key(epoch, report_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, None):
+                # First view of this report in the epoch: register it
+                slot = _incr(cache, _length_key(epoch))
+                cache.set(_slot_key(epoch, slot), report_id, None)
+            else:
+                cache.incr(key)
+    except Exception as e:
+        logger.warning(f"Could not record view of report {report_id}: {str(e)}")
+
+
+def apply_view_counts(counts):
+    """
+    Add view counts to ReportAnalytics in one UPDATE.
+
+    Creates missing analytics rows first; counts for deleted reports
+    are dropped.
+
+    Args:
+        counts (dict): {report_id: views to add}
+
+    Returns:
+        int: Number of analytics rows updated
+    """
+    counts = {report_id: n for report_id, n in counts.items() if n > 0}
+    if not counts:
+        return 0
+    with transaction.atomic():
+        existing = set(
+            ReportAnalytics.objects.filter(report_id__in=counts).values_list("report_id", flat=True)
+        )
+        missing = AnalysisResult.objects.filter(pk__in=set(counts) - existing).values_list("pk", flat=True)
+        ReportAnalytics.objects.bulk_create(
+            [ReportAnalytics(report_id=pk) for pk in missing], ignore_conflicts=True
+        )
+        delta = Case(
+            *(When(report_id=report_id, then=Value(n)) for report_id, n in counts.items()),
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
+        return ReportAnalytics.objects.filter(report_id__in=counts).update(views=F("views") + delta)
+
+
+def _last_flushed_epoch():
+    return ReportViewFlush.objects.values_list("last_epoch", flat=True).first() or 0
+
+
+def _flush_epoch(cache, epoch, batch_size):
+    """Write an epoch's counts unless another flush already did; returns views written."""
+    with transaction.atomic():
+        marker, _ = ReportViewFlush.objects.select_for_update().get_or_create(pk=1)
+        if marker.last_epoch >= epoch:
+            return 0
+        flushed = _apply_epoch(cache, epoch, batch_size)
+        marker.last_epoch = epoch
+        marker.save(update_fields=["last_epoch", "flushed_at"])
+    return flushed
+
+
+def _apply_epoch(cache, epoch, batch_size):
+    length = cache.get(_length_key(epoch), 0)
+    flushed = 0
+    for slots in chunked(range(1, length + 1), batch_size):
+        slot_keys = [_slot_key(epoch, slot) for slot in slots]
+        report_ids = cache.get_many(slot_keys).values()
+        count_keys = {_count_key(epoch, report_id): report_id for report_id in report_ids}
+        stored = cache.get_many(list(count_keys))
+        counts = {count_keys[key]: n for key, n in stored.items()}
+        apply_view_counts(counts)
+        flushed += sum(counts.values())
+    return flushed
+
+
+def _delete_epoch(cache, epoch, batch_size):
+    length = cache.get(_length_key(epoch), 0)
+    for slots in chunked(range(1, length + 1), batch_size):
+        slot_keys = [_slot_key(epoch, slot) for slot in slots]
+        report_ids = cache.get_many(slot_keys).values()
+        cache.delete_many(slot_keys + [_count_key(epoch, report_id) for report_id in report_ids])
+    cache.delete(_length_key(epoch))
+
+
+def flush_views(batch_size=None):
+    """
+    Write counted views to ReportAnalytics.
+
+    Starts a new epoch and flushes every unflushed epoch before the one
+    that was current. Only one flush runs at a time; others return 0.
+
+    Args:
+        batch_size (int): Reports per UPDATE (default
+            REPORT_VIEWS_FLUSH_BATCH_SIZE)
+
+    Returns:
+        int: Number of views written
+    """
+    batch_size = batch_size or getattr(settings, "REPORT_VIEWS_FLUSH_BATCH_SIZE", 500)
+    lock_timeout = getattr(settings, "REPORT_VIEWS_FLUSH_LOCK_TIMEOUT", 300)
+    cache = _cache()
+    if not cache.add(FLUSH_LOCK_KEY, 1, lock_timeout):
+        logger.info("Report view flush already running; skipping")
+        return 0
+    try:
+        closing = current_epoch(cache)
+        cache.incr(EPOCH_KEY)
+        flushed = 0
+        for epoch in range(_last_flushed_epoch() + 1, closing):
+            flushed += _flush_epoch(cache, epoch, batch_size)
+            cache.set(FLUSHED_KEY, epoch, None)
+            _delete_epoch(cache, epoch, batch_size)
+        if flushed:
+            logger.info(f"Flushed {flushed} report views")
+        return flushed
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
@@ -4,22 +4,125 @@ Reports application views.
 User report history and management.
 """
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
+from django.views.decorators.http import require_GET
 from apps.analysis.models import AnalysisResult
+from apps.core.pagination import keyset_paginate
+from apps.core.responses import accepts_gzip, gzip_stream, iter_csv, iter_jsonl
+from .search import SearchUnavailable, search_reports
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Export columns: output name -> AnalysisResult lookup
+EXPORT_FIELDS = {
+    "id": "id",
+    "created_at": "created_at",
+    "address": "location__address",
+    "latitude": "location__latitude",
+    "longitude": "location__longitude",
+    "ai_score": "ai_score",
+    "safety_score": "safety_score",
+    "noise_level": "noise_level",
+    "rent_level": "rent_level",
+    "water_quality": "water_quality",
+    "temperature": "temperature",
+    "windspeed": "windspeed",
+    "weather_code": "weather_code",
+    "avg_feedback_score": "avg_feedback_score",
+    "ai_summary": "ai_summary",
+}
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+EXPORT_CHUNK_SIZE = 2000
+
+# Columns the list template shows; the large ai_summary is left out
+REPORT_LIST_FIELDS = (
+    "id", "created_at", "ai_score", "temperature", "windspeed", "location__address",
+)
+
 
 @login_required
 def reports_list_view(request):
     """
     User's analysis reports history view.
     
-    Shows all reports created by the authenticated user,
-    ordered by most recent first.
+    Shows the authenticated user's reports, most recent first, one page
+    at a time.
+
+    Query params:
+    - q: Full-text search over the location address and AI summary
+    - cursor: Value from the previous page's "older reports" link
+    """
+    reports = (
+        AnalysisResult.objects.filter(user=request.user)
+        .select_related("location")
+        .only(*REPORT_LIST_FIELDS)
+    )
+    query = request.GET.get("q", "").strip()
+    search_error = None
+    if query:
+        try:
+            reports = search_reports(reports, query)
+        except SearchUnavailable as e:
+            logger.warning(str(e))
+            search_error = "Search is not available right now."
+
+    cursor = request.GET.get("cursor")
+    page_size = getattr(settings, "REPORTS_PAGE_SIZE", 20)
+    try:
+        page = keyset_paginate(reports, cursor, page_size)
+    except ValueError:
+        logger.warning(f"Invalid reports cursor from user {request.user.id}: {cursor!r}")
+        page = keyset_paginate(reports, None, page_size)
+
+    logger.debug(f"Reports list viewed by user: {request.user.id}, page size: {len(page)}")
+    return render(request, "reports/list.html", {
+        "reports": page,
+        "query": query,
+        "search_error": search_error,
+    })
+
+
+@login_required
+@require_GET
+def export_reports(request):
     """
-    reports = AnalysisResult.objects.filter(user=request.user).order_by("-created_at")
-    logger.debug(f"Reports list viewed by user: {request.user.id}, count: {reports.count()}")
-    return render(request, "reports/list.html", {"reports": reports})
\ No newline at end of file
+    Download the user's whole analysis history.
+
+    Rows are read with a chunked iterator and encoded while the response
+    is sent, so memory use doesn't depend on the number of reports. The
+    body is gzip-encoded on the fly when the client accepts it.
+
+    Query params:
+    - format: "csv" (default) or "jsonl"
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Unknown export format: {fmt}")
+
+    rows = (
+        AnalysisResult.objects.filter(user=request.user)
+        .order_by("-created_at", "-id")
+        .values_list(*EXPORT_FIELDS.values())
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    if fmt == "csv":
+        body = iter_csv(EXPORT_FIELDS, rows, EXPORT_CHUNK_SIZE)
+    else:
+        names = list(EXPORT_FIELDS)
+        body = iter_jsonl((dict(zip(names, row)) for row in rows), chunk_size=EXPORT_CHUNK_SIZE)
+
+    filename = f"citysense-reports-{timezone.localdate():%Y%m%d}.{fmt}"
+    response = StreamingHttpResponse(body, content_type=EXPORT_FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    logger.info(f"Reports export ({fmt}) started by user: {request.user.id}")
+    if accepts_gzip(request):
+        gzip_stream(response)
+    return response
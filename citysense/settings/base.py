@@ -1,11 +1,14 @@
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 import logging
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Ask Groq for a bare JSON object (disable for models without JSON mode)
+GROQ_JSON_MODE = os.getenv("GROQ_JSON_MODE", "true").lower() == "true"
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -105,24 +108,154 @@ FILE_UPLOAD_PERMISSIONS = 0o644
 # CACHING CONFIGURATION
 # ============================================================================
 
+# "default" keeps a small in-process copy (L1) of entries read from
+# "shared" (L2), which every worker process sees. Invalidations made by
+# one process reach the others within SYNC_INTERVAL seconds.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "citysense-cache",
+        "BACKEND": "apps.core.cache_backends.TwoTierCache",
+        "LOCATION": "citysense-l1",
         "OPTIONS": {
-            "MAX_ENTRIES": 1000
+            "SHARED": "shared",
+            "LOCAL_MAX_ENTRIES": 500,
+            "LOCAL_TIMEOUT": 60,
+            "SYNC_INTERVAL": 1,
         },
-        "KEY_PREFIX": "citysense",
         "TIMEOUT": 300,  # 5 minutes default
-    }
+    },
+    # Without REDIS_URL the shared tier is a SQLite file, which all
+    # workers on one host can open
+    "shared": {
+        "BACKEND": "apps.core.cache_backends.SQLiteCache",
+        "LOCATION": os.getenv("CACHE_SHARED_PATH", str(BASE_DIR / "cache.sqlite3")),
+        "OPTIONS": {
+            "MAX_ENTRIES": 20000,
+            # JSON (orjson when installed) for plain data, pickle otherwise;
+            # zlib-compressed from CACHE_COMPRESS_MIN_SIZE bytes on
+            "SERIALIZER": "apps.core.cache_backends.CompressedSerializer",
+        },
+        "KEY_PREFIX": "citysense",
+        "TIMEOUT": 300,
+    },
 }
 
+if os.getenv("REDIS_URL"):
+    CACHES["shared"] = {
+        "BACKEND": "apps.core.cache_backends.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+        "OPTIONS": {"serializer": "apps.core.cache_backends.CompressedSerializer"},
+        "KEY_PREFIX": "citysense",
+        "TIMEOUT": 300,
+    }
+
+# Test runs keep the shared tier in process memory, so they neither read
+# nor leave entries in the developer's cache file or Redis
+if sys.argv[1:2] == ["test"]:
+    CACHES["shared"] = {
+        "BACKEND": "apps.core.cache_backends.SerializingLocMemCache",
+        "LOCATION": "citysense-test-shared",
+        "OPTIONS": {
+            "MAX_ENTRIES": 20000,
+            "SERIALIZER": "apps.core.cache_backends.CompressedSerializer",
+        },
+        "KEY_PREFIX": "citysense",
+        "TIMEOUT": 300,
+    }
+
+# Cached values of at least this many bytes are stored zlib-compressed
+CACHE_COMPRESS_MIN_SIZE = 256
+CACHE_COMPRESS_LEVEL = 6
+
+# One in this many JSON cache encodings is decoded and checked to catch
+# values that change type as JSON (see JSONSerializer); 0 disables
+CACHE_JSON_VERIFY_EVERY = 50
+
 # Cache timeouts for specific data
 CACHE_TIMEOUTS = {
     "weather": 3600,  # 1 hour - weather changes slowly
     "city_suggestions": 86400,  # 24 hours - city data is static
+    # Closed trend buckets only change on edits, which invalidate them; the
+    # timeout keeps them from outliving their users and crowding out
+    # expiring entries when the shared cache culls
+    "dashboard_trends": 30 * 86400,  # 30 days
 }
 
+# How long failed lookups are remembered before the upstream is retried
+# (see apps.ai_engine.cache.CacheNamespace)
+CACHE_NEGATIVE_TIMEOUTS = {
+    "weather": 60,
+    "city_suggestions": 60,
+}
+
+# Timeouts are shortened by up to this fraction so entries written
+# together don't all expire at once
+CACHE_TTL_JITTER = 0.1
+
+# Longest time other callers wait for a value being computed
+CACHE_LOCK_TIMEOUT = 30
+
+# Cache hit/miss counters, pushed to the shared cache at most this often
+# (seconds). Shown at /admin/cache/; /admin/cache/metrics/ also accepts
+# "Authorization: Bearer <CACHE_METRICS_TOKEN>" for monitoring scrapers.
+CACHE_METRICS_ENABLED = True
+CACHE_METRICS_FLUSH_INTERVAL = 5
+# Value sizes are measured on one in this many stores (0 disables)
+CACHE_METRICS_SIZE_SAMPLE_EVERY = 20
+CACHE_METRICS_TOKEN = os.getenv("CACHE_METRICS_TOKEN", "")
+
+# ============================================================================
+# UPSTREAM SERVICES
+# ============================================================================
+
+# Base URLs of the external APIs used by apps.ai_engine
+UPSTREAM_URLS = {
+    "nominatim": os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org"),
+    "open_meteo": os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com"),
+    "groq": os.getenv("GROQ_BASE_URL", "https://api.groq.com"),
+}
+
+# Redirect all upstream traffic to the local stand-ins started with
+# `python manage.py run_mock_upstreams` (e.g. http://127.0.0.1:8765)
+MOCK_UPSTREAMS_URL = os.getenv("MOCK_UPSTREAMS_URL", "")
+
+# Record/replay of upstream responses: "off", "record", "replay" or
+# "auto" (replay when recorded, otherwise record)
+UPSTREAM_CASSETTE_MODE = os.getenv("UPSTREAM_CASSETTE_MODE", "off")
+UPSTREAM_CASSETTE_DIR = os.getenv("UPSTREAM_CASSETTE_DIR", str(BASE_DIR / "cassettes"))
+# Sleep for the recorded response time when replaying
+UPSTREAM_REPLAY_TIMING = os.getenv("UPSTREAM_REPLAY_TIMING", "false").lower() == "true"
+
+# ============================================================================
+# MAP LAYERS
+# ============================================================================
+
+# Heatmap delta cursors older than this (seconds) get a full snapshot
+HEATMAP_DELTA_MAX_AGE = 7 * 24 * 3600
+# Deltas with more changed locations than this are sent as a full snapshot
+HEATMAP_DELTA_MAX_CHANGES = 5000
+# Seconds browsers may reuse heatmap responses before revalidating (ETag)
+HEATMAP_CACHE_MAX_AGE = 60
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+# Reports per page in the history list (keyset pagination)
+REPORTS_PAGE_SIZE = 20
+
+# Report views are counted in the shared cache and written to
+# ReportAnalytics by `manage.py flush_report_views` (apps.reports.view_counts);
+# run it from cron or with --interval as a long-running process
+REPORT_VIEWS_FLUSH_INTERVAL = 60
+REPORT_VIEWS_FLUSH_BATCH_SIZE = 500
+REPORT_VIEWS_FLUSH_LOCK_TIMEOUT = 300
+
+# Report pages are cached by feedback version (ETag/304 and a rendered
+# fragment); bump REPORT_CACHE_VERSION when templates/analysis/report.html
+# changes so browsers and the fragment cache pick up the new markup
+REPORT_CACHE_VERSION = 1
+REPORT_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
 # ============================================================================
 # LOGGING CONFIGURATION (Free Plan optimized)
 # ============================================================================
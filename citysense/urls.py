@@ -23,6 +23,7 @@ from .error_handlers import custom_404, custom_500
 
 urlpatterns = [
     path("", include("apps.core.urls")),
+    path("admin/cache/", include("apps.ai_engine.urls")),
     path('admin/', admin.site.urls),
     path("users/", include("apps.users.urls")),
     path("analysis/", include("apps.analysis.urls")),
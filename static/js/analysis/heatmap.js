@@ -0,0 +1,141 @@
+/**
+ * Heatmap data client.
+ *
+ * Fetches /analysis/heatmap-data/ in the compact "f32" encoding (packed
+ * little-endian float32 values) and decodes it into the
+ * [[lat, lng, weight], ...] arrays Leaflet.heat expects. The "columnar"
+ * and plain JSON encodings are decoded too.
+ *
+ * HeatmapStore keeps each layer's points in localStorage and refreshes
+ * them from /analysis/heatmap-data/delta/, so returning visitors only
+ * download locations that changed since their last visit.
+ */
+(function () {
+    function decodeF32(buffer, fieldsHeader) {
+        const fields = (fieldsHeader || 'lat,lng,weight').split(',');
+        const stride = fields.length;
+        const view = new DataView(buffer);
+        const count = buffer.byteLength / (4 * stride);
+        const points = new Array(count);
+
+        for (let i = 0, offset = 0; i < count; i++) {
+            const point = new Array(stride);
+            for (let j = 0; j < stride; j++, offset += 4) {
+                point[j] = view.getFloat32(offset, true);
+            }
+            points[i] = point;
+        }
+        return { fields, points };
+    }
+
+    function decodeColumnar(columns) {
+        const fields = Object.keys(columns);
+        const length = fields.length ? columns[fields[0]].length : 0;
+        const points = new Array(length);
+
+        for (let i = 0; i < length; i++) {
+            points[i] = fields.map(name => columns[name][i]);
+        }
+        return { fields, points };
+    }
+
+    function decodeObjects(list) {
+        const fields = list.length && 'count' in list[0]
+            ? ['lat', 'lng', 'weight', 'count']
+            : ['lat', 'lng', 'weight'];
+        return { fields, points: list.map(p => fields.map(name => p[name])) };
+    }
+
+    /**
+     * Load heatmap points.
+     *
+     * @param {string} url   Heatmap endpoint URL
+     * @param {Object} params Query parameters (layer, bbox, zoom)
+     * @param {string} format "f32" (default), "columnar" or "json"
+     * @returns {Promise<{fields: string[], points: number[][]}>}
+     */
+    async function fetchHeatmap(url, params = {}, format = 'f32') {
+        const query = new URLSearchParams({ ...params, format });
+        const response = await fetch(`${url}?${query}`, { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error(`Heatmap request failed: ${response.status}`);
+        }
+
+        if (format === 'f32') {
+            return decodeF32(await response.arrayBuffer(), response.headers.get('X-Heatmap-Fields'));
+        }
+        const body = await response.json();
+        return Array.isArray(body) ? decodeObjects(body) : decodeColumnar(body);
+    }
+
+    class HeatmapStore {
+        /**
+         * @param {string} url Delta endpoint URL
+         * @param {string} layer Heatmap layer
+         */
+        constructor(url, layer = 'ai_score') {
+            this.url = url;
+            this.layer = layer;
+            this.storageKey = `citysense.heatmap.${layer}`;
+            this.cursor = null;
+            this.points = new Map();
+            this._load();
+        }
+
+        _load() {
+            try {
+                const saved = JSON.parse(localStorage.getItem(this.storageKey) || 'null');
+                if (saved) {
+                    this.cursor = saved.cursor;
+                    this.points = new Map(saved.points.map(row => [row[0], row]));
+                }
+            } catch (err) {
+                this.cursor = null;
+                this.points = new Map();
+            }
+        }
+
+        _save() {
+            try {
+                localStorage.setItem(this.storageKey, JSON.stringify({
+                    cursor: this.cursor,
+                    points: Array.from(this.points.values())
+                }));
+            } catch (err) {
+                // Storage full or disabled: keep the in-memory copy only
+            }
+        }
+
+        /**
+         * Fetch changes since the stored cursor and merge them.
+         *
+         * @returns {Promise<number[][]>} [[lat, lng, weight], ...] for every retained location
+         */
+        async refresh() {
+            const query = new URLSearchParams({ layer: this.layer });
+            if (this.cursor) {
+                query.set('since', this.cursor);
+            }
+            const response = await fetch(`${this.url}?${query}`, { credentials: 'same-origin' });
+            if (!response.ok) {
+                throw new Error(`Heatmap delta request failed: ${response.status}`);
+            }
+            const delta = await response.json();
+
+            if (delta.full) {
+                this.points.clear();
+            }
+            delta.removed.forEach(id => this.points.delete(id));
+            delta.points.forEach(row => this.points.set(row[0], row));
+            this.cursor = delta.cursor;
+            this._save();
+            return this.latLngs();
+        }
+
+        latLngs() {
+            return Array.from(this.points.values(), row => row.slice(1));
+        }
+    }
+
+    window.CitySenseHeatmap = { fetchHeatmap, decodeF32, decodeColumnar, decodeObjects, HeatmapStore };
+})();